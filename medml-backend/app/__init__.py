@@ -8,14 +8,27 @@ from app.config import config
 from .extensions import db, jwt, bcrypt, cors, limiter # <-- ADDED limiter
 from .api import api_bp
 from . import services
+from . import inference
+from . import report_jobs
+from .prediction_cache import prediction_cache
+from .recommendation_cache import recommendation_cache
+from .recommendation_client import recommendation_client
+from .report_cache import report_cache
+from .commands import register_commands
+from . import db_engine
 # from .db_seeder import seed_static_recommendations # <-- REMOVED
 
 def create_app(config_name='default'):
     app = Flask(__name__)
     app.config.from_object(config[config_name])
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        **db_engine.engine_options(app.config), **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}),
+    }
 
     # Extension initializations
     db.init_app(app)
+    # Pool sizing for server databases, WAL and the other pragmas for SQLite
+    db_engine.configure(app, db)
     jwt.init_app(app)
     bcrypt.init_app(app)
     # Configure CORS origins from env (comma-separated), default to "*" in dev
@@ -28,29 +41,22 @@ def create_app(config_name='default'):
     
     # --- Load ML Models ---
     with app.app_context():
-        # Enable SQLite foreign key enforcement
-        try:
-            from sqlalchemy import event
-            from sqlalchemy.engine import Engine
-
-            @event.listens_for(Engine, "connect")
-            def set_sqlite_pragma(dbapi_connection, connection_record):
-                try:
-                    cursor = dbapi_connection.cursor()
-                    cursor.execute("PRAGMA foreign_keys=ON")
-                    cursor.close()
-                except Exception:
-                    pass
-        except Exception:
-            pass
-
         services.load_models(app)
+        inference.init_app(app, config_name)
+        report_jobs.init_app(app)
+        report_cache.configure(app)
+        prediction_cache.configure(app, services.models)
+        recommendation_cache.configure(app)
+        recommendation_client.configure(app)
         # seed_static_recommendations() # <-- REMOVED
     # --- End ---
 
     # Register Blueprints
     app.register_blueprint(api_bp, url_prefix='/api/v1') # Updated to v1
 
+    # Register CLI commands (flask rescore, ...)
+    register_commands(app)
+
     # Import models to ensure they are registered
     from . import models
 
@@ -68,6 +74,14 @@ def create_app(config_name='default'):
         app.logger.info('MedML backend startup')
     # --- End Logging ---
 
+    # Startup report of the engine settings actually in effect
+    if not app.testing:
+        with app.app_context():
+            try:
+                app.logger.info(f"Database settings: {db_engine.effective_settings(db.engine)}")
+            except Exception as e:
+                app.logger.warning(f"Could not read database settings: {e}")
+
     # Global error handler for 500
     @app.errorhandler(500)
     def internal_server_error(e):
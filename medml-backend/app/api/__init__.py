@@ -13,5 +13,6 @@ from . import (
     dashboard, 
     consultations,
     reports,
+    ml_models,
     # errors # <-- This module can be added for global API error handling
 )
\ No newline at end of file
@@ -3,7 +3,8 @@ from flask import request, jsonify, abort, current_app
 from . import api_bp
 from app.models import User, Patient, TokenBlocklist
 from app.extensions import db, limiter
-from app.schemas import UserRegisterSchema, UserLoginSchema, PatientLoginSchema, PASSWORD_ERROR_MSG
+from app.schemas import UserRegisterSchema, UserLoginSchema, PatientLoginSchema, PatientDetailQuerySchema, PASSWORD_ERROR_MSG
+from app.streaming import patient_json_chunks
 from pydantic import ValidationError
 from flask_jwt_extended import (
     create_access_token, 
@@ -25,6 +26,7 @@ from .responses import (
     conflict,
     unprocessable_entity,
     server_error,
+    stream_json,
 )
 
 # Rate limiting to login endpoints
@@ -193,7 +195,14 @@ def logout():
 def get_me():
     """
     Returns the profile of the currently authenticated user (Admin or Patient).
+    A patient's profile is streamed and accepts `history_limit` like
+    GET /patients/<id>.
     """
+    try:
+        params = PatientDetailQuerySchema(history_limit=request.args.get('history_limit'))
+    except ValidationError as e:
+        return unprocessable_entity(messages=e.errors())
+
     try:
         jwt_identity = parse_jwt_identity()
         user_id = jwt_identity.get('id')
@@ -212,9 +221,11 @@ def get_me():
             if not patient:
                 return not_found("Patient not found")
             # Patient dashboard needs history and latest prediction
-            return ok(patient.to_dict(
+            return stream_json(patient_json_chunks(
+                patient,
+                history_limit=params.history_limit,
                 include_admin=True,
-                include_history=True, 
+                include_history=True,
                 include_latest_prediction=True,
                 include_notes=True
             ))
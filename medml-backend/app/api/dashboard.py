@@ -1,14 +1,15 @@
 # HealthCare App/medml-backend/app/api/dashboard.py
-from flask import jsonify, current_app
+from flask import jsonify, current_app, request
 from . import api_bp
-from app.models import Patient, RiskPrediction
-from app.extensions import db
+from app import rollups
 from app.extensions import limiter
+from app.dashboard_stats import read_stats
+from app.schemas import TimeseriesQuerySchema
 from app.api.decorators import admin_required
 from flask_jwt_extended import jwt_required
-from sqlalchemy import func, cast, Date
-from datetime import date
-from .responses import ok, server_error
+from pydantic import ValidationError
+from datetime import date, timedelta
+from .responses import ok, bad_request, unprocessable_entity, server_error
 
 @api_bp.route('/dashboard/stats', methods=['GET']) # Renamed route
 @jwt_required()
@@ -17,67 +18,68 @@ from .responses import ok, server_error
 def get_dashboard_stats(): # Renamed function
     """
     [Admin Only] Provides analytics for the admin dashboard.
-    Returns counts as per frontend api_client.
+    Returns counts as per frontend api_client, read from the precomputed
+    dashboard counters (see app/dashboard_stats.py). Risk counts are patients
+    whose latest prediction is Medium or High for that disease.
     """
     try:
-        # 1. Today's Registrations - Fixed timezone handling
-        today = date.today()
-        todays_registrations_count = db.session.query(func.count(Patient.id)).filter(
-            func.date(Patient.created_at) == today
-        ).scalar()
+        return ok(read_stats()) # Return flat JSON
 
-        # 2. Count by disease risk (Medium OR High)
-        diabetes_risk_count = db.session.query(func.count(RiskPrediction.id)).filter(
-            RiskPrediction.diabetes_risk_level.in_(['Medium', 'High'])
-        ).scalar()
-        
-        liver_risk_count = db.session.query(func.count(RiskPrediction.id)).filter(
-            RiskPrediction.liver_risk_level.in_(['Medium', 'High'])
-        ).scalar()
-        
-        heart_risk_count = db.session.query(func.count(RiskPrediction.id)).filter(
-            RiskPrediction.heart_risk_level.in_(['Medium', 'High'])
-        ).scalar()
-        
-        mental_health_risk_count = db.session.query(func.count(RiskPrediction.id)).filter(
-            RiskPrediction.mental_health_risk_level.in_(['Medium', 'High'])
-        ).scalar()
-        
-        # Total registered patients
-        total_patients_count = db.session.query(func.count(Patient.id)).scalar()
-        
-        # Additional stats for better analytics
-        # This week's registrations (last 7 days)
-        from datetime import timedelta
-        week_ago = today - timedelta(days=7)
-        this_week_registrations = db.session.query(func.count(Patient.id)).filter(
-            func.date(Patient.created_at) >= week_ago
-        ).scalar()
-        
-        # This month's registrations
-        month_start = today.replace(day=1)
-        this_month_registrations = db.session.query(func.count(Patient.id)).filter(
-            func.date(Patient.created_at) >= month_start
-        ).scalar()
-        
-        # Total assessments count
-        total_assessments = db.session.query(func.count(RiskPrediction.id)).scalar()
+    except Exception as e:
+        current_app.logger.error(f"Error fetching dashboard stats: {e}")
+        return server_error()
+
+
+# Default range per granularity when `start` is not given
+DEFAULT_TIMESERIES_DAYS = {'day': 30, 'week': 7 * 12, 'month': 365}
 
-        # --- UPDATED: Enhanced response with more analytics ---
-        stats_data = {
-            "today_registrations": todays_registrations_count,
-            "this_week_registrations": this_week_registrations,
-            "this_month_registrations": this_month_registrations,
-            "total_patients": total_patients_count,
-            "total_assessments": total_assessments,
-            "diabetes_risk_count": diabetes_risk_count,
-            "liver_risk_count": liver_risk_count,
-            "heart_risk_count": heart_risk_count,
-            "mental_health_risk_count": mental_health_risk_count
-        }
-        
-        return ok(stats_data) # Return flat JSON
 
+@api_bp.route('/dashboard/timeseries', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_dashboard_timeseries():
+    """
+    [Admin Only] Trend data for the admin dashboard, read from the daily
+    rollups (see app/rollups.py) rather than the patient and prediction
+    tables.
+
+    `metric` is registrations, predictions (new latest risk levels) or
+    transitions (latest level changed), bucketed by `granularity`
+    (day|week|month) between `start` and `end`. `group_by` and the filter
+    parameters take the dimensions listed in rollups.DIMENSIONS.
+    """
+    try:
+        params = TimeseriesQuerySchema(**request.args.to_dict())
+    except ValidationError as e:
+        return unprocessable_entity(messages=e.errors())
+
+    dimensions = rollups.DIMENSIONS[params.metric]
+    group_by = [name.strip() for name in (params.group_by or '').split(',') if name.strip()]
+    filters = {name: getattr(params, name) for name in rollups.DIMENSIONS['transitions']
+               if getattr(params, name) is not None}
+    unsupported = [name for name in [*group_by, *filters] if name not in dimensions]
+    if unsupported:
+        return bad_request(f"'{params.metric}' cannot be grouped or filtered by: {', '.join(unsupported)}")
+
+    end = params.end or date.today()
+    start = params.start or end - timedelta(days=DEFAULT_TIMESERIES_DAYS[params.granularity])
+    if start > end:
+        return bad_request("start must not be after end")
+    # Whole buckets, so the first week or month is not cut short
+    start = rollups.bucket_start(start, params.granularity)
+
+    try:
+        rollups.ensure_built()
+        series = rollups.timeseries(params.metric, params.granularity, start, end,
+                                    group_by=group_by, filters=filters)
+        return ok({
+            "metric": params.metric,
+            "granularity": params.granularity,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "group_by": group_by,
+            "series": series,
+        })
     except Exception as e:
-        current_app.logger.error(f"Error fetching dashboard stats: {e}")
-        return server_error()
\ No newline at end of file
+        current_app.logger.error(f"Error fetching dashboard timeseries: {e}")
+        return server_error()
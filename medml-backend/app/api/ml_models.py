@@ -0,0 +1,47 @@
+# HealthCare App/medml-backend/app/api/ml_models.py
+from flask import request, current_app
+from . import api_bp
+from app.services import models
+from app.prediction_cache import prediction_cache
+from app.api.decorators import admin_required, get_current_admin_id
+from flask_jwt_extended import jwt_required
+from .responses import ok, bad_request
+
+@api_bp.route('/models', methods=['GET'])
+@jwt_required()
+@admin_required
+def list_models():
+    """
+    [Admin Only] Lists the registered ML models with their manifest
+    version, checksum and load state in this worker.
+    """
+    return ok({
+        "model_version": models.version_stamp(),
+        "models": models.describe(),
+        "prediction_cache": prediction_cache.stats(),
+    })
+
+
+@api_bp.route('/models/reload', methods=['POST'])
+@jwt_required()
+@admin_required
+def reload_models():
+    """
+    [Admin Only] Re-reads models_store/manifest.json and hot-swaps any model
+    whose file, version or checksum changed. Pass {"keys": [...]} to force a
+    reload of specific models. Only affects the worker serving the request;
+    other workers pick up manifest changes on their next periodic check.
+    """
+    payload = request.get_json(silent=True) or {}
+    keys = payload.get('keys')
+    if keys is not None and (not isinstance(keys, list) or not all(isinstance(k, str) for k in keys)):
+        return bad_request("'keys' must be a list of model names.")
+
+    reloaded = models.reload(keys)
+    current_app.logger.info(f"Admin {get_current_admin_id()} reloaded models: {reloaded or 'none changed'}")
+    return ok({
+        "message": "Model registry reloaded.",
+        "reloaded": reloaded,
+        "model_version": models.version_stamp(),
+        "models": models.describe(),
+    })
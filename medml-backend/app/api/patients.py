@@ -1,14 +1,18 @@
 # HealthCare App/medml-backend/app/api/patients.py
 from flask import request, jsonify, current_app
 from . import api_bp
-from app.models import Patient, User, RiskPrediction
+from app.models import Patient, User, RiskPrediction, LATEST_RISK_LEVEL_COLUMNS
 from app.extensions import limiter, db
-from app.schemas import PatientCreateSchema, PatientUpdateSchema
+from app.schemas import PatientCreateSchema, PatientUpdateSchema, PatientListQuerySchema, PatientDetailQuerySchema
+from app.streaming import patient_json_chunks
 from app.api.decorators import admin_required, get_current_admin_id, parse_jwt_identity
 from pydantic import ValidationError
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import or_
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import joinedload, noload
+from datetime import datetime
+import base64
 from .responses import (
     ok,
     created,
@@ -19,6 +23,7 @@ from .responses import (
     conflict,
     unprocessable_entity,
     server_error,
+    stream_json,
 )
 
 @api_bp.route('/patients', methods=['POST'])
@@ -76,6 +81,80 @@ def create_patient():
         current_app.logger.error(f"Error creating patient: {e}")
         return server_error("An unexpected error occurred.")
 
+# Risk-level column on Patient per disease tab in the frontend
+DISEASE_RISK_LEVELS = LATEST_RISK_LEVEL_COLUMNS
+
+# Sort option -> risk level it filters on
+SORT_RISK_LEVELS = {
+    'high_risk': 'High',
+    'medium_risk': 'Medium',
+    'low_risk': 'Low',
+}
+
+
+# Top-level keys `fields=` may select (patient_id is always returned)
+PATIENT_LIST_FIELDS = (
+    'patient_id', 'name', 'age', 'gender', 'abha_id', 'height', 'weight', 'bmi',
+    'state_name', 'created_by_admin_id', 'created_at', 'created_by_admin', 'latest_prediction',
+)
+PREDICTION_FIELDS = (
+    'prediction_id', 'patient_id', 'model_version', 'predicted_at',
+    *(f'{disease}_risk_{part}' for disease in DISEASE_RISK_LEVELS for part in ('score', 'level')),
+)
+
+
+def encode_cursor(created_at, patient_id):
+    raw = f"{created_at.isoformat()}|{patient_id}".encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """Returns (created_at, patient_id) or raises ValueError."""
+    try:
+        created_at, patient_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|')
+        return datetime.fromisoformat(created_at), int(patient_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def parse_fields(fields):
+    """
+    Parses a `fields=` value into {top_level_key: None | set of sub-keys}.
+    None means no projection. Raises ValueError on unknown names.
+    """
+    if not fields:
+        return None
+    projection = {'patient_id': None}
+    for name in (f.strip() for f in fields.split(',')):
+        if not name:
+            continue
+        key, _, sub = name.partition('.')
+        if key not in PATIENT_LIST_FIELDS:
+            raise ValueError(f"Unknown field '{key}'")
+        if not sub:
+            # The whole value wins over any sub-keys
+            projection[key] = None
+        elif key != 'latest_prediction' or sub not in PREDICTION_FIELDS:
+            raise ValueError(f"Unknown field '{name}'")
+        elif key not in projection:
+            projection[key] = {sub}
+        elif projection[key] is not None:
+            projection[key].add(sub)
+    return projection
+
+
+def project(data, projection):
+    if projection is None:
+        return data
+    out = {}
+    for key, sub in projection.items():
+        value = data.get(key)
+        if sub is not None and isinstance(value, dict):
+            value = {k: value.get(k) for k in sub}
+        out[key] = value
+    return out
+
+
 @api_bp.route('/patients', methods=['GET'])
 @jwt_required()
 @admin_required
@@ -84,72 +163,114 @@ def get_patients():
     """
     [Admin Only] Gets a list of all patients, with filtering and sorting
     matching the frontend api_client.
+
+    Risk filters use the latest-prediction levels stored on each patient,
+    and the latest RiskPrediction is joined through its id in the same query.
+
+    Optional paging: `limit` returns one page ordered by (created_at, id)
+    descending plus a `next_cursor` to pass back as `cursor`; the first page
+    also carries the total match count in the X-Total-Count header.
+    `fields` trims each patient to the listed keys (see PATIENT_LIST_FIELDS).
     """
     try:
-        query = Patient.query
-        
+        params = PatientListQuerySchema(
+            limit=request.args.get('limit'),
+            cursor=request.args.get('cursor'),
+            fields=request.args.get('fields'),
+        )
+    except ValidationError as e:
+        return unprocessable_entity(messages=e.errors())
+    try:
+        projection = parse_fields(params.fields)
+        after = decode_cursor(params.cursor) if params.cursor else None
+    except ValueError as e:
+        return bad_request(str(e))
+
+    try:
+        query = (
+            db.session.query(Patient, RiskPrediction)
+            .outerjoin(RiskPrediction, RiskPrediction.id == Patient.latest_prediction_id)
+        )
+
         # Filter by disease category (e.g., 'diabetes')
         disease = request.args.get('disease')
-        
-        # Sort by 'recently_added', 'high_risk', 'medium_risk'
+
+        # Sort by 'recently_added', 'high_risk', 'medium_risk', 'low_risk'
         sort = request.args.get('sort', 'recently_added')
-        
+        level = SORT_RISK_LEVELS.get(sort)
+
         if disease:
-            query = query.join(RiskPrediction, Patient.id == RiskPrediction.patient_id)
-            if disease == 'diabetes':
-                disease_filter = RiskPrediction.diabetes_risk_level
-            elif disease == 'liver':
-                disease_filter = RiskPrediction.liver_risk_level
-            elif disease == 'heart':
-                disease_filter = RiskPrediction.heart_risk_level
-            elif disease == 'mental_health':
-                disease_filter = RiskPrediction.mental_health_risk_level
+            column_name = DISEASE_RISK_LEVELS.get(disease)
+            if column_name is None:
+                # Unknown disease: any patient that has been scored
+                query = query.filter(Patient.latest_prediction_id.isnot(None))
+            elif level:
+                query = query.filter(getattr(Patient, column_name) == level)
+            else:  # 'recently_added' or default
+                # Show all for that disease, sorted by recency
+                query = query.filter(getattr(Patient, column_name).in_(('High', 'Medium', 'Low')))
+        elif level:  # 'All Users' tab
+            query = query.filter(or_(*(
+                getattr(Patient, column_name) == level
+                for column_name in DISEASE_RISK_LEVELS.values()
+            )))
+
+        headers = {}
+        if params.limit is not None and after is None:
+            # Counting the bare patients table is much cheaper than the joined query
+            if disease or level:
+                total = query.order_by(None).count()
             else:
-                disease_filter = None
-
-            if disease_filter is not None:
-                if sort == 'high_risk':
-                    query = query.filter(disease_filter == 'High').order_by(Patient.created_at.desc())
-                elif sort == 'medium_risk':
-                    query = query.filter(disease_filter == 'Medium').order_by(Patient.created_at.desc())
-                elif sort == 'low_risk':
-                    query = query.filter(disease_filter == 'Low').order_by(Patient.created_at.desc())
-                else: # 'recently_added' or default
-                    # Show all for that disease, sorted by recency
-                    query = query.filter(or_(disease_filter == 'High', disease_filter == 'Medium', disease_filter == 'Low')).order_by(Patient.created_at.desc())
-            
-        else: # 'All Users' tab
-            if sort == 'high_risk':
-                query = query.join(RiskPrediction).filter(or_(
-                    RiskPrediction.diabetes_risk_level == 'High',
-                    RiskPrediction.liver_risk_level == 'High',
-                    RiskPrediction.heart_risk_level == 'High',
-                    RiskPrediction.mental_health_risk_level == 'High'
-                )).order_by(Patient.created_at.desc())
-            elif sort == 'medium_risk':
-                 query = query.join(RiskPrediction).filter(or_(
-                    RiskPrediction.diabetes_risk_level == 'Medium',
-                    RiskPrediction.liver_risk_level == 'Medium',
-                    RiskPrediction.heart_risk_level == 'Medium',
-                    RiskPrediction.mental_health_risk_level == 'Medium'
-                )).order_by(Patient.created_at.desc())
-            elif sort == 'low_risk':
-                query = query.join(RiskPrediction).filter(or_(
-                    RiskPrediction.diabetes_risk_level == 'Low',
-                    RiskPrediction.liver_risk_level == 'Low',
-                    RiskPrediction.heart_risk_level == 'Low',
-                    RiskPrediction.mental_health_risk_level == 'Low'
-                )).order_by(Patient.created_at.desc())
-            else: # 'recently_added'
-                query = query.order_by(Patient.created_at.desc())
-
-        patients = query.all()
-        
+                total = db.session.query(func.count(Patient.id)).scalar()
+            headers['X-Total-Count'] = str(total)
+
+        if after is not None:
+            created_at, patient_id = after
+            # Compare against the stored value of the cursor row so the
+            # database's own datetime format is used (SQLite keeps
+            # CURRENT_TIMESTAMP and bound datetimes in different text forms);
+            # the encoded timestamp only matters if that row was deleted.
+            boundary = func.coalesce(
+                select(Patient.created_at).where(Patient.id == patient_id).scalar_subquery(),
+                created_at,
+            )
+            query = query.filter(or_(
+                Patient.created_at < boundary,
+                and_(Patient.created_at == boundary, Patient.id < patient_id),
+            ))
+
+        if projection is None or 'created_by_admin' in projection:
+            query = query.options(joinedload(Patient.created_by_admin))
+        else:
+            query = query.options(noload(Patient.created_by_admin))
+
+        query = query.order_by(Patient.created_at.desc(), Patient.id.desc())
+        if params.limit is not None:
+            # One extra row tells us whether another page exists
+            rows = query.limit(params.limit + 1).all()
+        else:
+            rows = query.all()
+
+        next_cursor = None
+        if params.limit is not None and len(rows) > params.limit:
+            rows = rows[:params.limit]
+            last = rows[-1][0]
+            next_cursor = encode_cursor(last.created_at, last.id)
+
         # Return list, including latest prediction data for the dashboard view
-        patients_data = [p.to_dict(include_latest_prediction=True) for p in patients]
-        
-        return ok(patients_data)
-    
+        patients_data = []
+        for patient, latest in rows:
+            data = patient.to_dict(include_admin=projection is None or 'created_by_admin' in projection)
+            data['latest_prediction'] = latest.to_dict() if latest else None
+            patients_data.append(project(data, projection))
+
+        if params.limit is None:
+            return ok(patients_data)
+
+        body, status = ok({"data": patients_data, "next_cursor": next_cursor})
+        body.headers.update(headers)
+        return body, status
+
     except Exception as e:
         current_app.logger.error(f"Error fetching patients: {e}")
         return server_error(str(e))
@@ -161,6 +282,9 @@ def get_patient(patient_id):
     """
     [Admin/Patient] Gets detailed info for a single patient.
     Patient can only access their own.
+
+    The history is streamed section by section; `history_limit` keeps only
+    the newest N rows of each section.
     """
     # Check permissions
     jwt_identity = parse_jwt_identity()
@@ -170,12 +294,19 @@ def get_patient(patient_id):
     if user_role == 'patient' and user_id != patient_id:
         return forbidden("Patients can only access their own data")
 
+    try:
+        params = PatientDetailQuerySchema(history_limit=request.args.get('history_limit'))
+    except ValidationError as e:
+        return unprocessable_entity(messages=e.errors())
+
     patient = Patient.query.get_or_404(patient_id)
     
     # Return full details including all history and notes for Admin view
-    return ok(patient.to_dict(
+    return stream_json(patient_json_chunks(
+        patient,
+        history_limit=params.history_limit,
         include_admin=True,
-        include_history=True, 
+        include_history=True,
         include_latest_prediction=True,
         include_notes=True
     ))
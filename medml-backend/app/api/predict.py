@@ -1,17 +1,57 @@
 # HealthCare App/medml-backend/app/api/predict.py
-from flask import jsonify, current_app
+from flask import jsonify, current_app, request
 from . import api_bp
 from app.models import Patient, RiskPrediction
 from app.extensions import db
-from app.services import run_prediction
+from app.services import run_prediction, run_predictions, models
+from app.inference import InferenceError
+from app.prediction_cache import prediction_cache, fingerprint
+from app.rescoring import select_patient_ids, rescore_patients, NEUTRAL_FALLBACK_MODELS, NEUTRAL_SCORE
+from app.schemas import BulkPredictionSchema
 from app.api.decorators import admin_required, get_current_admin_id
 from flask_jwt_extended import jwt_required
-from .responses import ok, forbidden, not_found, bad_request
+from pydantic import ValidationError
+from .responses import ok, forbidden, not_found, bad_request, unprocessable_entity, server_error, service_unavailable
+
+def _score_patient(features):
+    """
+    Runs the four models on the feature dicts from `_run_and_save_prediction`,
+    concurrently when PARALLEL_SCORING is on. Heart and mental health fall
+    back to a neutral score if their model fails; pool saturation and
+    timeouts (InferenceError) fail the whole request instead.
+    """
+    if current_app.config.get('PARALLEL_SCORING'):
+        results = run_predictions(features, timeout=current_app.config.get('PREDICTION_MODEL_TIMEOUT_SECONDS'))
+    else:
+        results = {}
+        for model_key, data in features.items():
+            try:
+                results[model_key] = run_prediction(model_key, data)
+            except Exception as e:
+                results[model_key] = e
+
+    scores = {}
+    for model_key, result in results.items():
+        if not isinstance(result, Exception):
+            scores[model_key] = result
+            continue
+        if isinstance(result, InferenceError) or model_key not in NEUTRAL_FALLBACK_MODELS:
+            raise result
+        # Temporarily disable heart and mental health predictions until we fix the feature mapping
+        current_app.logger.warning(f"{model_key} prediction failed: {result}")
+        scores[model_key] = NEUTRAL_SCORE  # Default neutral score
+    return scores
+
 
 def _run_and_save_prediction(patient_id):
     """
     Internal helper to run all predictions for a patient (based on latest
     assessments) and save a new prediction record.
+
+    Scores are reused from the prediction cache when the latest assessments,
+    patient fields and model versions are unchanged since the last run. With
+    PREDICTION_CACHE_REUSE_ROWS, such a repeat returns the existing record
+    instead of saving a duplicate.
     """
     patient = Patient.query.get_or_404(patient_id)
     if not patient:
@@ -19,68 +59,55 @@ def _run_and_save_prediction(patient_id):
 
     # --- UPDATED: Get features from latest assessments ---
     try:
-        diabetes_data = patient.get_latest_diabetes_features()
-        liver_data = patient.get_latest_liver_features()
-        heart_data = patient.get_latest_heart_features()
-        mental_health_data = patient.get_latest_mental_health_features()
+        features = {
+            'diabetes': patient.get_latest_diabetes_features(),
+            'liver': patient.get_latest_liver_features(),
+            'heart': patient.get_latest_heart_features(),
+            'mental_health': patient.get_latest_mental_health_features(),
+        }
     except ValueError as e:
         current_app.logger.error(f"Missing assessment for patient {patient_id}: {e}")
         raise Exception(f"Cannot run prediction: {e}")
 
-    current_app.logger.info(f"Running all predictions for patient {patient_id}...")
+    # --- 1. Run Predictions (or reuse cached scores) ---
+    model_version = models.version_stamp()
+    cache_key = fingerprint(features, model_version)
+    cached = prediction_cache.get(cache_key)
 
-    # --- 1. Run Predictions ---
-    diabetes_score = run_prediction('diabetes', diabetes_data)
-    liver_score = run_prediction('liver', liver_data)
-    
-    # Temporarily disable heart and mental health predictions until we fix the feature mapping
-    try:
-        heart_score = run_prediction('heart', heart_data)
-    except Exception as e:
-        current_app.logger.warning(f"Heart prediction failed: {e}")
-        heart_score = 0.5  # Default neutral score
-        
-    try:
-        mental_health_score = run_prediction('mental_health', mental_health_data)
-    except Exception as e:
-        current_app.logger.warning(f"Mental health prediction failed: {e}")
-        mental_health_score = 0.5  # Default neutral score
+    if cached is not None:
+        if prediction_cache.reuse_rows and cached.prediction_id is not None:
+            if patient.latest_prediction_id == cached.prediction_id:
+                current_app.logger.info(f"Inputs unchanged for patient {patient_id}; reusing prediction {cached.prediction_id}")
+                return patient.latest_prediction
+        current_app.logger.info(f"Using cached scores for patient {patient_id}")
+        scores = cached.scores
+    else:
+        current_app.logger.info(f"Running all predictions for patient {patient_id}...")
+        scores = _score_patient(features)
 
     # --- 2. UPDATED: Always Create New Prediction Record (1:N) ---
     prediction = RiskPrediction(patient_id=patient_id)
     db.session.add(prediction)
-    
+
     # --- 3. Save All Scores and Levels ---
-    prediction.update_risk(
-        model_key='diabetes', 
-        score=diabetes_score,
-        model_version='1.0' # Placeholder
-    )
-    prediction.update_risk(
-        model_key='liver', 
-        score=liver_score,
-        model_version='1.0' # Placeholder
-    )
-    prediction.update_risk(
-        model_key='heart', 
-        score=heart_score,
-        model_version='1.0' # Placeholder
-    )
-    prediction.update_risk(
-        model_key='mental_health',
-        score=mental_health_score, 
-        model_version='1.0' # Placeholder
-    )
+    for model_key in ('diabetes', 'liver', 'heart', 'mental_health'):
+        prediction.update_risk(
+            model_key=model_key,
+            score=scores[model_key],
+            model_version=model_version
+        )
 
     try:
         db.session.commit()
         current_app.logger.info(f"Successfully saved new prediction {prediction.id} for patient {patient_id}")
-        return prediction
     except Exception as e:
         db.session.rollback()
         current_app.logger.error(f"Error saving predictions for patient {patient_id}: {e}")
         raise Exception(f"Database error saving predictions: {e}")
 
+    prediction_cache.put(cache_key, scores, prediction.id)
+    return prediction
+
 
 @api_bp.route('/patients/<int:patient_id>/predict', methods=['POST'])
 @jwt_required()
@@ -97,10 +124,40 @@ def trigger_all_predictions(patient_id):
             "message": "Risk prediction completed successfully.",
             "predictions": prediction.to_dict(),
         })
+    except InferenceError as e:
+        current_app.logger.warning(f"Prediction for patient {patient_id} not run: {e}")
+        return service_unavailable(str(e), retry_after=1)
     except Exception as e:
         current_app.logger.error(f"Prediction trigger failed for patient {patient_id}: {e}")
         return bad_request(str(e))
 
+@api_bp.route('/predictions/bulk', methods=['POST'])
+@jwt_required()
+@admin_required
+def trigger_bulk_predictions():
+    """
+    [Admin Only] Rescores many patients in one pass (e.g. after a model is
+    retrained). Accepts `patient_ids`, `state_name` and/or
+    `created_by_admin_id`; an empty body rescores every patient.
+    """
+    try:
+        data = BulkPredictionSchema(**(request.get_json(silent=True) or {}))
+    except ValidationError as e:
+        return unprocessable_entity(messages=e.errors())
+
+    try:
+        patient_ids = select_patient_ids(
+            patient_ids=data.patient_ids,
+            state_name=data.state_name,
+            created_by_admin_id=data.created_by_admin_id,
+        )
+        summary = rescore_patients(patient_ids, chunk_size=data.chunk_size)
+        current_app.logger.info(f"Admin {get_current_admin_id()} rescored {summary['rescored']} patients")
+        return ok({"message": "Bulk risk prediction completed.", **summary})
+    except Exception as e:
+        current_app.logger.error(f"Bulk prediction failed: {e}")
+        return server_error("Bulk prediction failed.")
+
 # --- ADDED: Endpoint for frontend client ---
 @api_bp.route('/patients/<int:patient_id>/predictions/latest', methods=['GET'])
 @jwt_required()
@@ -120,8 +177,7 @@ def get_latest_prediction(patient_id):
 
     patient = Patient.query.get_or_404(patient_id)
     
-    # Get the first item from the ordered 1:N relationship
-    latest_prediction = patient.risk_predictions.first()
+    latest_prediction = patient.latest_prediction
     
     if not latest_prediction:
         return not_found("No predictions found for this patient")
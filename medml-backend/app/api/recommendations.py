@@ -4,15 +4,21 @@ from . import api_bp
 from app.models import db, Patient
 from app.api.decorators import admin_required
 from flask_jwt_extended import jwt_required
-from app.services import get_gemini_recommendations
-from .responses import ok, forbidden, server_error
+from app.services import RECOMMENDATION_PROMPT_VERSION
+from app import recommendation_library
+from app.recommendation_cache import recommendation_cache, profile_key, RISK_DISEASES
+from app.recommendation_client import recommendation_client
+from app.api.decorators import get_current_admin_id
+from .responses import ok, bad_request, forbidden, server_error
 
 @api_bp.route('/patients/<int:patient_id>/recommendations', methods=['GET'])
 @jwt_required()
 def get_recommendations(patient_id):
     """
     [Admin/Patient] Fetches lifestyle recommendations based on *latest* risk.
-    Patient can only access their own.
+    Patient can only access their own. Served from the precomputed
+    recommendation library (see app/recommendation_library.py); Gemini is
+    never called on this path.
     """
     try:
         # 1. Check permissions
@@ -27,7 +33,7 @@ def get_recommendations(patient_id):
         patient = Patient.query.get_or_404(patient_id)
 
         # --- UPDATED: Get latest prediction from 1:N ---
-        risk_prediction = patient.risk_predictions.first()
+        risk_prediction = patient.latest_prediction
         
         if not risk_prediction:
             # No predictions yet, return empty
@@ -40,12 +46,66 @@ def get_recommendations(patient_id):
             'mental_health': risk_prediction.mental_health_risk_level
         }
         
-        # Call Gemini Service
-        recommendations_data = get_gemini_recommendations(risk_map)
+        recommendations_data = recommendation_library.lookup(risk_map)
         
         # Return the grouped-by-category dictionary
         return ok(recommendations_data)
 
     except Exception as e:
         current_app.logger.error(f"Error fetching recommendations: {e}")
-        return server_error(str(e))
\ No newline at end of file
+        return server_error(str(e))
+
+
+@api_bp.route('/recommendations/cache', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_recommendation_cache_stats():
+    """
+    [Admin Only] Hit/miss counts of this worker's recommendation cache.
+    """
+    return ok({"prompt_version": RECOMMENDATION_PROMPT_VERSION, "recommendation_cache": recommendation_cache.stats()})
+
+
+@api_bp.route('/recommendations/metrics', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_recommendation_metrics():
+    """
+    [Admin Only] This worker's Gemini client counters (calls, timeouts,
+    failures, circuit state, fallbacks, latency) and cache hit rates.
+    """
+    return ok({
+        "recommendation_client": recommendation_client.metrics(),
+        "recommendation_cache": recommendation_cache.stats(),
+    })
+
+
+@api_bp.route('/recommendations/cache', methods=['DELETE'])
+@jwt_required()
+@admin_required
+def invalidate_recommendation_cache():
+    """
+    [Admin Only] Drops cached recommendations so they are regenerated on the
+    next request. Pass {"risk_levels": {"diabetes": "High", ...}} to drop a
+    single risk profile; with no body every profile is dropped. Other
+    workers stop serving the dropped sets within
+    RECOMMENDATION_CACHE_LOCAL_SECONDS.
+    """
+    payload = request.get_json(silent=True) or {}
+    risk_levels = payload.get('risk_levels')
+    if risk_levels is not None and (
+        not isinstance(risk_levels, dict) or not set(risk_levels) <= set(RISK_DISEASES)
+    ):
+        return bad_request(f"'risk_levels' must map any of {', '.join(RISK_DISEASES)} to a risk level.")
+
+    try:
+        key = profile_key(risk_levels, RECOMMENDATION_PROMPT_VERSION) if risk_levels is not None else None
+        removed = recommendation_cache.invalidate(key)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error invalidating recommendation cache: {e}")
+        return server_error("Could not invalidate the recommendation cache.")
+
+    current_app.logger.info(f"Admin {get_current_admin_id()} invalidated {removed} cached recommendation set(s)")
+    return ok({"removed": removed}, message="Recommendation cache invalidated.")
@@ -1,4 +1,11 @@
-from flask import jsonify
+from flask import Response, stream_with_context
+
+from app.serialization import dumps
+
+
+def _json(body, status):
+    # Same bytes as jsonify (sorted keys, compact, trailing newline), encoded by orjson when available
+    return Response(dumps(body) + b'\n', status=status, mimetype='application/json'), status
 
 
 def ok(payload=None, message=None):
@@ -9,7 +16,7 @@ def ok(payload=None, message=None):
         body.update(payload)
     elif payload is not None:
         body["data"] = payload
-    return jsonify(body), 200
+    return _json(body, 200)
 
 
 def created(payload=None, message=None):
@@ -20,40 +27,64 @@ def created(payload=None, message=None):
         body.update(payload)
     elif payload is not None:
         body["data"] = payload
-    return jsonify(body), 201
+    return _json(body, 201)
+
+
+def accepted(payload=None, message=None, location=None):
+    body = {}
+    if message is not None:
+        body["message"] = message
+    if isinstance(payload, dict):
+        body.update(payload)
+    elif payload is not None:
+        body["data"] = payload
+    response, status = _json(body, 202)
+    if location is not None:
+        response.headers["Location"] = location
+    return response, status
+
+
+def stream_json(chunks, status=200):
+    """Streams an iterable of JSON byte chunks (see app/streaming.py)."""
+    return Response(stream_with_context(chunks), status=status, mimetype='application/json')
 
 
 def bad_request(message="Bad Request", extra=None):
     body = {"error": "Bad Request", "message": message}
     if isinstance(extra, dict):
         body.update(extra)
-    return jsonify(body), 400
+    return _json(body, 400)
 
 
 def unauthorized(message="Unauthorized"):
-    return jsonify({"error": "Unauthorized", "message": message}), 401
+    return _json({"error": "Unauthorized", "message": message}, 401)
 
 
 def forbidden(message="Forbidden"):
-    return jsonify({"error": "Forbidden", "message": message}), 403
+    return _json({"error": "Forbidden", "message": message}, 403)
 
 
 def not_found(message="Not Found"):
-    return jsonify({"error": "Not Found", "message": message}), 404
+    return _json({"error": "Not Found", "message": message}, 404)
 
 
 def conflict(message="Conflict"):
-    return jsonify({"error": "Conflict", "message": message}), 409
+    return _json({"error": "Conflict", "message": message}, 409)
 
 
 def unprocessable_entity(messages=None, message="Validation Failed"):
     body = {"error": "Validation Failed", "message": message}
     if messages is not None:
         body["messages"] = messages
-    return jsonify(body), 422
+    return _json(body, 422)
 
 
-def server_error(message="Internal server error"):
-    return jsonify({"error": "Internal server error", "message": message}), 500
+def service_unavailable(message="Service Unavailable", retry_after=None):
+    response, status = _json({"error": "Service Unavailable", "message": message}, 503)
+    if retry_after is not None:
+        response.headers["Retry-After"] = str(retry_after)
+    return response, status
 
 
+def server_error(message="Internal server error"):
+    return _json({"error": "Internal server error", "message": message}, 500)
@@ -0,0 +1,74 @@
+# HealthCare App/medml-backend/app/commands.py
+import click
+from app.dashboard_stats import reconcile
+from app import rollups
+from app.db_engine import effective_settings
+from app.extensions import db
+from app.recommendation_cache import recommendation_cache
+from app import recommendation_library
+from app.report_cache import report_cache
+from app.rescoring import DEFAULT_CHUNK_SIZE, select_patient_ids, rescore_patients
+
+
+def register_commands(app):
+    """Registers the `flask <command>` maintenance commands."""
+
+    @app.cli.command('rescore')
+    @click.option('--patient-id', 'patient_ids', type=int, multiple=True, help='Patient id to rescore (repeatable).')
+    @click.option('--state', 'state_name', default=None, help='Only rescore patients from this state.')
+    @click.option('--admin-id', 'created_by_admin_id', type=int, default=None, help='Only rescore patients created by this admin.')
+    @click.option('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, show_default=True, help='Patients scored and inserted per batch.')
+    def rescore(patient_ids, state_name, created_by_admin_id, chunk_size):
+        """Re-run all four risk models and store a new prediction per patient."""
+        ids = select_patient_ids(
+            patient_ids=patient_ids or None,
+            state_name=state_name,
+            created_by_admin_id=created_by_admin_id,
+        )
+        click.echo(f"Rescoring {len(ids)} patient(s)...")
+        summary = rescore_patients(ids, chunk_size=chunk_size)
+        click.echo(f"Saved {summary['rescored']} prediction(s); skipped {summary['skipped']} patient(s) with missing assessments.")
+
+    @app.cli.command('reconcile-stats')
+    def reconcile_stats():
+        """Recount the dashboard counters from the patient and prediction tables."""
+        drift = reconcile()
+        for key, (stored, recounted) in sorted(drift.items()):
+            click.echo(f"{key}: {stored} -> {recounted}")
+        click.echo(f"Dashboard counters reconciled; {len(drift)} corrected.")
+
+    @app.cli.command('rebuild-rollups')
+    def rebuild_rollups():
+        """Recompute the dashboard time-series rollups from the raw tables."""
+        rollups.rebuild()
+        click.echo("Dashboard rollups rebuilt.")
+
+    @app.cli.command('db-settings')
+    def db_settings():
+        """Show the effective database engine and SQLite pragma settings."""
+        for key, value in effective_settings(db.engine).items():
+            click.echo(f"{key}: {value}")
+
+    @app.cli.command('clear-recommendation-cache')
+    @click.option('--expired-only', is_flag=True, help='Only delete entries past their TTL.')
+    def clear_recommendation_cache(expired_only):
+        """Delete cached Gemini recommendations so they are regenerated."""
+        removed = recommendation_cache.purge_expired() if expired_only else recommendation_cache.invalidate()
+        db.session.commit()
+        click.echo(f"Removed {removed} cached recommendation set(s).")
+
+    @app.cli.command('clear-report-cache')
+    def clear_report_cache():
+        """Delete rendered report PDFs so they are rendered again."""
+        click.echo(f"Removed {report_cache.clear()} cached report(s).")
+
+    @app.cli.command('warm-recommendations')
+    @click.option('--generate', is_flag=True, help='Ask Gemini for every profile (curated set if a call fails).')
+    @click.option('--only-missing', is_flag=True, help='Skip risk profiles that already have a set.')
+    def warm_recommendations(generate, only_missing):
+        """Build the recommendation library for every risk-level combination."""
+        summary = recommendation_library.build(generate=generate, only_missing=only_missing)
+        click.echo(
+            f"Stored {summary['generated']} generated and {summary['curated']} curated set(s); "
+            f"skipped {summary['skipped']}, Gemini failed for {summary['failed']}."
+        )
@@ -1,5 +1,6 @@
 # HealthCare App/medml-backend/app/config.py
 import os
+import tempfile
 from datetime import timedelta
 
 # This is the 'app' directory
@@ -37,6 +38,20 @@ class Config:
         SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.abspath(db_path).replace('\\', '/')
     
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # --- Database engine (app/db_engine.py) ---
+    # Connection pool per process, for PostgreSQL/MySQL URLs
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT_SECONDS = int(os.environ.get('DB_POOL_TIMEOUT_SECONDS', 30))
+    DB_POOL_RECYCLE_SECONDS = int(os.environ.get('DB_POOL_RECYCLE_SECONDS', 1800))
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() != 'false'
+    # SQLite pragmas, applied to every connection (empty journal mode/synchronous keeps SQLite's default)
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 64 * 1024))
     
     # Base directory for the application
     BASE_DIR = BASE_DIR
@@ -53,6 +68,94 @@ class Config:
     if not GEMINI_API_KEY:
         print("Warning: GEMINI_API_KEY not set. Recommendation API will fail.")
         
+    # --- ML model registry (models_store/manifest.json) ---
+    MODEL_DIR = os.environ.get('MODEL_DIR') or os.path.join(BASE_DIR, 'models_store')
+    # Load every model at startup instead of on first use
+    MODEL_EAGER_LOAD = os.environ.get('MODEL_EAGER_LOAD', 'false').lower() == 'true'
+    # How often each worker checks the manifest for changes (0 disables hot reload)
+    MODEL_RELOAD_CHECK_SECONDS = float(os.environ.get('MODEL_RELOAD_CHECK_SECONDS', 30))
+    # Directory for memory-mapped tree models shared by all worker processes
+    # (unset: every process unpickles its own copy). Pair with MODEL_EAGER_LOAD
+    # and gunicorn --preload so the export happens once, before forking.
+    MODEL_SHARED_STORE = os.environ.get('MODEL_SHARED_STORE')
+    # Score boosted-tree models with the array-exported engine (app/tree_engine.py)
+    COMPILED_TREE_INFERENCE = os.environ.get('COMPILED_TREE_INFERENCE', 'true').lower() != 'false'
+
+    # --- Inference worker pool (app/inference.py) ---
+    # Score run_prediction calls in worker processes, micro-batched per model
+    INFERENCE_POOL_ENABLED = os.environ.get('INFERENCE_POOL_ENABLED', 'false').lower() == 'true'
+    INFERENCE_WORKERS = int(os.environ.get('INFERENCE_WORKERS', 2))
+    # How long the dispatcher keeps collecting after the first queued request
+    INFERENCE_BATCH_WINDOW_MS = float(os.environ.get('INFERENCE_BATCH_WINDOW_MS', 5))
+    INFERENCE_MAX_BATCH = int(os.environ.get('INFERENCE_MAX_BATCH', 256))
+    # Queued + running requests allowed before new ones are rejected with 503
+    INFERENCE_MAX_PENDING = int(os.environ.get('INFERENCE_MAX_PENDING', 512))
+    INFERENCE_TIMEOUT_SECONDS = float(os.environ.get('INFERENCE_TIMEOUT_SECONDS', 10))
+
+    # --- Per-request scoring ---
+    # Score the four models of a predict request concurrently on a thread pool.
+    # Defaults to on with the inference pool, where the four rows then share
+    # one micro-batch window instead of waiting for four in turn.
+    PARALLEL_SCORING = os.environ.get('PARALLEL_SCORING', str(INFERENCE_POOL_ENABLED)).lower() == 'true'
+    PARALLEL_SCORING_THREADS = int(os.environ.get('PARALLEL_SCORING_THREADS', 8))
+    # Longest a predict request waits for its models (0 disables the limit)
+    PREDICTION_MODEL_TIMEOUT_SECONDS = float(os.environ.get('PREDICTION_MODEL_TIMEOUT_SECONDS', 10))
+
+    # --- Prediction cache (app/prediction_cache.py) ---
+    # Max cached score sets per process (0 disables the cache)
+    PREDICTION_CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE', 1024))
+    # Return the existing RiskPrediction instead of saving an identical new one
+    PREDICTION_CACHE_REUSE_ROWS = os.environ.get('PREDICTION_CACHE_REUSE_ROWS', 'false').lower() == 'true'
+
+    # --- Recommendation cache (app/recommendation_cache.py) ---
+    # Generated recommendation sets kept in memory per process (0 disables the cache)
+    RECOMMENDATION_CACHE_SIZE = int(os.environ.get('RECOMMENDATION_CACHE_SIZE', 256))
+    # How long a generated set is served before it is regenerated (0 keeps it until invalidated)
+    RECOMMENDATION_CACHE_TTL_HOURS = float(os.environ.get('RECOMMENDATION_CACHE_TTL_HOURS', 168))
+    # How long a worker serves a set from memory before re-reading the shared table,
+    # i.e. how long an admin invalidation takes to reach the other workers
+    RECOMMENDATION_CACHE_LOCAL_SECONDS = float(os.environ.get('RECOMMENDATION_CACHE_LOCAL_SECONDS', 300))
+
+    # --- Gemini client (app/recommendation_client.py) ---
+    # Longest a caller waits for Gemini before serving stored recommendations
+    GEMINI_TIMEOUT_SECONDS = float(os.environ.get('GEMINI_TIMEOUT_SECONDS', 8))
+    # Concurrent Gemini calls per process; further calls fall back immediately
+    GEMINI_MAX_CONCURRENCY = int(os.environ.get('GEMINI_MAX_CONCURRENCY', 4))
+    # Consecutive failures that open the circuit, and how long it stays open
+    GEMINI_BREAKER_FAILURES = int(os.environ.get('GEMINI_BREAKER_FAILURES', 3))
+    GEMINI_BREAKER_RESET_SECONDS = float(os.environ.get('GEMINI_BREAKER_RESET_SECONDS', 60))
+    # Alternative API endpoint (e.g. a local fake server); switches the SDK to its REST transport
+    GEMINI_API_ENDPOINT = os.environ.get('GEMINI_API_ENDPOINT')
+
+    # --- Recommendation library (app/recommendation_library.py) ---
+    # Regenerate library sets with Gemini in the background when they are
+    # curated-only or older than the max age; requests never wait for it
+    RECOMMENDATION_LIBRARY_REFRESH = os.environ.get('RECOMMENDATION_LIBRARY_REFRESH', 'false').lower() == 'true'
+    RECOMMENDATION_LIBRARY_MAX_AGE_DAYS = float(os.environ.get('RECOMMENDATION_LIBRARY_MAX_AGE_DAYS', 30))
+
+    # --- Report jobs (app/report_jobs.py) ---
+    # Finished reports and job status files; shared by the web workers of a host
+    REPORT_DIR = os.environ.get('REPORT_DIR', os.path.join(BASE_DIR, 'reports'))
+    # PDF rendering processes per web worker (0 renders in the job thread)
+    REPORT_WORKERS = int(os.environ.get('REPORT_WORKERS', 2))
+    # Jobs loading data and fetching recommendations at once, per web worker
+    REPORT_JOB_THREADS = int(os.environ.get('REPORT_JOB_THREADS', 2))
+    # Queued or running jobs per web worker; further requests get 503
+    REPORT_MAX_PENDING = int(os.environ.get('REPORT_MAX_PENDING', 32))
+    REPORT_BATCH_MAX_PATIENTS = int(os.environ.get('REPORT_BATCH_MAX_PATIENTS', 1000))
+    # Finished reports are deleted after this long
+    REPORT_RETENTION_HOURS = float(os.environ.get('REPORT_RETENTION_HOURS', 24))
+
+    # --- Rendered report cache (app/report_cache.py) ---
+    # Rendered PDFs by patient version, prediction, sections and recommendations
+    REPORT_CACHE_DIR = os.environ.get('REPORT_CACHE_DIR', os.path.join(BASE_DIR, 'report_cache'))
+    # Size bound of the directory; the least recently served PDFs go first (0 disables)
+    REPORT_CACHE_MAX_MB = float(os.environ.get('REPORT_CACHE_MAX_MB', 256))
+
+    # --- Dashboard counters (app/dashboard_stats.py) ---
+    # How often each process recounts the counters from the raw tables (0 disables)
+    DASHBOARD_STATS_RECONCILE_MINUTES = int(os.environ.get('DASHBOARD_STATS_RECONCILE_MINUTES', 60))
+
     # --- ADDED: Risk Thresholds from SRD ---
     RISK_THRESHOLDS = {
         'low': 0.0,  # Example: 0.0 to 0.34
@@ -74,6 +177,10 @@ class TestingConfig(Config):
     SECRET_KEY = 'test-secret'
     JWT_SECRET_KEY = 'test-jwt-secret'
     GEMINI_API_KEY = 'test-gemini-key' # Use a dummy key for testing
+    DASHBOARD_STATS_RECONCILE_MINUTES = 0
+    REPORT_DIR = os.path.join(tempfile.gettempdir(), 'medml-test-reports')
+    REPORT_WORKERS = 0
+    REPORT_CACHE_MAX_MB = 0
 
 class ProductionConfig(Config):
     DEBUG = False
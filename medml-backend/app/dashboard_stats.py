@@ -0,0 +1,143 @@
+# HealthCare App/medml-backend/app/dashboard_stats.py
+"""
+Dashboard statistics served from the dashboard_counters table.
+
+Insert hooks in app/models.py keep the counters current. `reconcile`
+recounts everything from the raw tables and overwrites the counters, which
+repairs drift from deletes, raw SQL and rows written before the table
+existed. It runs on the first read of a never-reconciled table, from
+`flask reconcile-stats`, and every DASHBOARD_STATS_RECONCILE_MINUTES in a
+background thread of each process that serves the dashboard.
+"""
+import os
+import threading
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import func, or_, select
+
+from app.extensions import db
+from app.models import (
+    Patient, RiskPrediction, DashboardCounter, LATEST_RISK_LEVEL_COLUMNS,
+    TOTAL_PATIENTS_KEY, TOTAL_PREDICTIONS_KEY, bump_counters, elevated_risk_counts,
+    registrations_key, risk_count_key,
+)
+
+# Unix time of the last reconcile; its absence means the counters were never built
+RECONCILED_AT_KEY = 'reconciled_at'
+
+
+def recount(connection) -> Dict[str, int]:
+    """Computes every counter from the raw tables."""
+    counts = {
+        TOTAL_PATIENTS_KEY: connection.execute(select(func.count(Patient.id))).scalar(),
+        TOTAL_PREDICTIONS_KEY: connection.execute(select(func.count(RiskPrediction.id))).scalar(),
+    }
+    for disease, count in elevated_risk_counts(connection).items():
+        counts[risk_count_key(disease)] = count
+    day = func.date(Patient.created_at)
+    for registered_on, count in connection.execute(select(day, func.count(Patient.id)).group_by(day)):
+        if registered_on is not None:
+            counts[registrations_key(registered_on)] = count
+    return counts
+
+
+def reconcile() -> Dict[str, Tuple[int, int]]:
+    """
+    Overwrites the counters with a fresh recount and commits.
+    Returns {key: (stored, recounted)} for every counter that had drifted.
+    """
+    connection = db.session.connection()
+    expected = recount(connection)
+    stored = dict(db.session.query(DashboardCounter.key, DashboardCounter.value).all())
+    stored.pop(RECONCILED_AT_KEY, None)
+
+    drift = {}
+    for key in set(stored) | set(expected):
+        old, new = stored.get(key, 0), expected.get(key, 0)
+        if old != new:
+            drift[key] = (old, new)
+            bump_counters(connection, {key: new - old})
+    # Days that no longer have registrations
+    DashboardCounter.query.filter(DashboardCounter.key.in_(
+        [key for key in stored if key not in expected]
+    )).delete(synchronize_session=False)
+
+    db.session.merge(DashboardCounter(key=RECONCILED_AT_KEY, value=int(time.time())))
+    db.session.commit()
+    return drift
+
+
+def read_stats(today: Optional[date] = None) -> Dict[str, Any]:
+    """Builds the /dashboard/stats payload from the counters in one query."""
+    _ensure_reconciler(current_app._get_current_object())
+    today = today or date.today()
+    week_ago = today - timedelta(days=7)
+    month_start = today.replace(day=1)
+
+    def load():
+        return dict(
+            db.session.query(DashboardCounter.key, DashboardCounter.value)
+            .filter(or_(
+                ~DashboardCounter.key.like(registrations_key('%')),
+                DashboardCounter.key >= registrations_key(min(week_ago, month_start)),
+            ))
+            .all()
+        )
+
+    counters = load()
+    if RECONCILED_AT_KEY not in counters:
+        current_app.logger.info("Dashboard counters not built yet; recounting")
+        reconcile()
+        counters = load()
+
+    def registrations_since(start):
+        return sum(counters.get(registrations_key(start + timedelta(days=n)), 0)
+                   for n in range((today - start).days + 1))
+
+    stats = {
+        "today_registrations": counters.get(registrations_key(today), 0),
+        "this_week_registrations": registrations_since(week_ago),
+        "this_month_registrations": registrations_since(month_start),
+        "total_patients": counters.get(TOTAL_PATIENTS_KEY, 0),
+        "total_assessments": counters.get(TOTAL_PREDICTIONS_KEY, 0),
+    }
+    for disease in LATEST_RISK_LEVEL_COLUMNS:
+        stats[risk_count_key(disease)] = counters.get(risk_count_key(disease), 0)
+    return stats
+
+
+# --- Periodic reconciliation ---
+
+_reconciler_pid = None
+_reconciler_lock = threading.Lock()
+
+
+def _ensure_reconciler(app: Any):
+    """Starts the reconcile loop once per process (threads do not survive a fork)."""
+    global _reconciler_pid
+    minutes = app.config.get('DASHBOARD_STATS_RECONCILE_MINUTES', 0)
+    if not minutes or _reconciler_pid == os.getpid():
+        return
+    with _reconciler_lock:
+        if _reconciler_pid == os.getpid():
+            return
+        thread = threading.Thread(target=_reconcile_loop, args=(app, minutes * 60),
+                                  name='dashboard-stats-reconciler', daemon=True)
+        thread.start()
+        _reconciler_pid = os.getpid()
+
+
+def _reconcile_loop(app: Any, interval: float):
+    while True:
+        time.sleep(interval)
+        with app.app_context():
+            try:
+                drift = reconcile()
+                if drift:
+                    app.logger.warning(f"Dashboard counters drifted, corrected: {drift}")
+            except Exception as e:
+                db.session.rollback()
+                app.logger.error(f"Dashboard counter reconciliation failed: {e}")
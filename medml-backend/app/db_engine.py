@@ -0,0 +1,100 @@
+# HealthCare App/medml-backend/app/db_engine.py
+"""
+Database engine settings.
+
+Server databases (PostgreSQL, MySQL) get a per-process connection pool sized
+by the DB_POOL_* settings, and pre-ping so stale connections are dropped.
+
+SQLite gets pragmas on every new connection. WAL lets readers run
+alongside the single writer. synchronous=NORMAL fsyncs at checkpoints
+instead of on every commit. busy_timeout makes a writer wait for the lock
+instead of failing at once with "database is locked". mmap_size and
+cache_size keep hot pages in memory. foreign_keys=ON is applied here as
+well.
+"""
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+
+# Pragmas read back for the startup report
+SQLITE_REPORTED_PRAGMAS = ('journal_mode', 'synchronous', 'busy_timeout', 'mmap_size', 'cache_size', 'foreign_keys')
+
+
+def is_sqlite(uri: str) -> bool:
+    return make_url(uri).get_backend_name() == 'sqlite'
+
+
+def engine_options(config) -> Dict[str, Any]:
+    """create_engine() options for the configured database URL."""
+    if is_sqlite(config['SQLALCHEMY_DATABASE_URI']):
+        # SQLAlchemy picks the pool for SQLite (QueuePool for files, one
+        # connection per thread for :memory:); the pragmas do the tuning
+        return {}
+    return {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT_SECONDS'],
+        'pool_recycle': config['DB_POOL_RECYCLE_SECONDS'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+    }
+
+
+def sqlite_pragmas(config) -> List[Tuple[str, Any]]:
+    """PRAGMA statements run on each new SQLite connection, in order."""
+    pragmas = [
+        # First, so the pragmas below wait for a lock instead of failing
+        ('busy_timeout', config['SQLITE_BUSY_TIMEOUT_MS']),
+        ('foreign_keys', 'ON'),
+    ]
+    if config['SQLITE_JOURNAL_MODE']:
+        pragmas.append(('journal_mode', config['SQLITE_JOURNAL_MODE']))
+    if config['SQLITE_SYNCHRONOUS']:
+        pragmas.append(('synchronous', config['SQLITE_SYNCHRONOUS']))
+    pragmas.append(('mmap_size', config['SQLITE_MMAP_SIZE']))
+    # A negative cache_size is in KiB rather than pages
+    pragmas.append(('cache_size', -config['SQLITE_CACHE_SIZE_KB']))
+    return pragmas
+
+
+def install_sqlite_pragmas(engine, config):
+    """Runs sqlite_pragmas(config) on every connection the engine opens."""
+    pragmas = sqlite_pragmas(config)
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+def configure(app, db):
+    """Applies the settings to the app's engines. Call after db.init_app()."""
+    if not is_sqlite(app.config['SQLALCHEMY_DATABASE_URI']):
+        return
+    with app.app_context():
+        for engine in db.engines.values():
+            install_sqlite_pragmas(engine, app.config)
+
+
+def effective_settings(engine) -> Dict[str, Any]:
+    """The settings a live connection actually runs with."""
+    pool = engine.pool
+    settings: Dict[str, Any] = {
+        'url': engine.url.render_as_string(hide_password=True),
+        'dialect': engine.dialect.name,
+        'pool': type(pool).__name__,
+    }
+    if hasattr(pool, 'size'):
+        settings['pool_size'] = pool.size()
+    for attr, key in (('_max_overflow', 'max_overflow'), ('_pre_ping', 'pool_pre_ping'), ('_recycle', 'pool_recycle')):
+        if hasattr(pool, attr):
+            settings[key] = getattr(pool, attr)
+    if engine.dialect.name == 'sqlite':
+        with engine.connect() as connection:
+            for name in SQLITE_REPORTED_PRAGMAS:
+                settings[name] = connection.execute(text(f"PRAGMA {name}")).scalar()
+    return settings
@@ -1,43 +1,83 @@
 # HealthCare App/medml-backend/app/db_seeder.py
-from app.models import db, LifestyleRecommendation
+from app.models import db
 from flask import current_app
 
+# Curated guidance per (disease, risk level) as (category, text), most
+# important first. app/recommendation_library.py composes these into one
+# ranked set per risk profile.
+STATIC_RECOMMENDATIONS = {
+    # Diabetes
+    ('diabetes', 'Low'): [
+        ('Diet', 'Monitor blood sugar regularly. Maintain a balanced diet rich in fiber and whole grains.'),
+    ],
+    ('diabetes', 'Medium'): [
+        ('Exercise', 'Increase physical activity to at least 150 minutes per week and include strength training.'),
+        ('Diet', 'Cut down on sugary drinks, sweets and refined flour; choose whole grains, pulses and vegetables.'),
+    ],
+    ('diabetes', 'High'): [
+        ('Lifestyle', 'Urgent consult with endocrinologist; monitor glucose multiple times daily and follow prescribed plan.'),
+        ('Diet', 'Eat small, regular meals with controlled carbohydrate portions; avoid sugary drinks entirely.'),
+        ('Exercise', 'Walk for 15-30 minutes after meals on most days, as cleared by your doctor.'),
+    ],
+
+    # Liver
+    ('liver', 'Low'): [
+        ('Diet', 'Avoid alcohol and processed foods. Eat a balanced diet with plenty of fruits and vegetables.'),
+    ],
+    ('liver', 'Medium'): [
+        ('Lifestyle', 'Avoid alcohol completely. Limit fat, sugar, and salt. Consider liver function tests.'),
+        ('Exercise', 'Aim for gradual weight loss through regular moderate exercise if overweight.'),
+    ],
+    ('liver', 'High'): [
+        ('Diet', 'Strict dietary restrictions required. Avoid alcohol and fatty foods entirely; seek hepatologist advice.'),
+        ('Lifestyle', 'Do not take over-the-counter painkillers or herbal remedies without asking your doctor.'),
+    ],
+
+    # Heart
+    ('heart', 'Low'): [
+        ('Exercise', 'Regular aerobic exercise (e.g., brisk walking, cycling) and manage stress levels.'),
+    ],
+    ('heart', 'Medium'): [
+        ('Diet', 'Adopt a heart-healthy, low-sodium, low-saturated-fat diet; monitor BP and cholesterol.'),
+        ('Lifestyle', 'Stop smoking and limit alcohol; check blood pressure at least once a month.'),
+    ],
+    ('heart', 'High'): [
+        ('Lifestyle', 'Urgent cardiologist consultation; adhere to supervised exercise and medication as prescribed.'),
+        ('Diet', 'Keep salt under 5 g a day and avoid fried and packaged foods.'),
+        ('Sleep', 'Aim for 7-8 hours of sleep; report breathlessness or chest pain at night to your doctor.'),
+    ],
+
+    # Mental Health
+    ('mental_health', 'Low'): [
+        ('Sleep', 'Ensure 7-9 hours of quality sleep; practice daily mindfulness or meditation.'),
+    ],
+    ('mental_health', 'Medium'): [
+        ('Lifestyle', 'Establish a consistent routine and consider therapy or counseling sessions.'),
+        ('Exercise', 'Spend at least 30 minutes outdoors or active each day; physical activity helps mood.'),
+    ],
+    ('mental_health', 'High'): [
+        ('Lifestyle', 'Seek immediate professional help; contact support lines if in distress; follow treatment plan.'),
+        ('Sleep', 'Keep fixed sleep and wake times and avoid screens for an hour before bed.'),
+    ],
+}
+
+# Added to profiles with no Medium or High risk
+GENERAL_RECOMMENDATIONS = [
+    ('Lifestyle', 'Keep up your healthy habits and attend a routine health check-up once a year.'),
+    ('Exercise', 'Stay active for at least 30 minutes on most days of the week.'),
+]
+
+
 def seed_static_recommendations():
     """
-    Populates the LifestyleRecommendation table with static MVP data
-    if it is currently empty.
+    Fills the recommendation library with the curated sets for every risk
+    profile that has none yet (no Gemini calls).
     """
-    try:
-        if LifestyleRecommendation.query.first() is not None:
-            # Data already exists, do nothing
-            return
-
-        recommendations = [
-            # Diabetes
-            LifestyleRecommendation(disease_type='diabetes', risk_level='Low', category='Diet', recommendation_text='Monitor blood sugar regularly. Maintain a balanced diet rich in fiber and whole grains.'),
-            LifestyleRecommendation(disease_type='diabetes', risk_level='Medium', category='Exercise', recommendation_text='Increase physical activity to at least 150 minutes per week and include strength training.'),
-            LifestyleRecommendation(disease_type='diabetes', risk_level='High', category='Lifestyle', recommendation_text='Urgent consult with endocrinologist; monitor glucose multiple times daily and follow prescribed plan.'),
-            
-            # Liver
-            LifestyleRecommendation(disease_type='liver', risk_level='Low', category='Diet', recommendation_text='Avoid alcohol and processed foods. Eat a balanced diet with plenty of fruits and vegetables.'),
-            LifestyleRecommendation(disease_type='liver', risk_level='Medium', category='Lifestyle', recommendation_text='Avoid alcohol completely. Limit fat, sugar, and salt. Consider liver function tests.'),
-            LifestyleRecommendation(disease_type='liver', risk_level='High', category='Diet', recommendation_text='Strict dietary restrictions required. Avoid alcohol and fatty foods entirely; seek hepatologist advice.'),
-            
-            # Heart
-            LifestyleRecommendation(disease_type='heart', risk_level='Low', category='Exercise', recommendation_text='Regular aerobic exercise (e.g., brisk walking, cycling) and manage stress levels.'),
-            LifestyleRecommendation(disease_type='heart', risk_level='Medium', category='Diet', recommendation_text='Adopt a heart-healthy, low-sodium, low-saturated-fat diet; monitor BP and cholesterol.'),
-            LifestyleRecommendation(disease_type='heart', risk_level='High', category='Lifestyle', recommendation_text='Urgent cardiologist consultation; adhere to supervised exercise and medication as prescribed.'),
-            
-            # Mental Health
-            LifestyleRecommendation(disease_type='mental_health', risk_level='Low', category='Sleep', recommendation_text='Ensure 7-9 hours of quality sleep; practice daily mindfulness or meditation.'),
-            LifestyleRecommendation(disease_type='mental_health', risk_level='Medium', category='Lifestyle', recommendation_text='Establish a consistent routine and consider therapy or counseling sessions.'),
-            LifestyleRecommendation(disease_type='mental_health', risk_level='High', category='Lifestyle', recommendation_text='Seek immediate professional help; contact support lines if in distress; follow treatment plan.')
-        ]
-        
-        db.session.bulk_save_objects(recommendations)
-        db.session.commit()
-        current_app.logger.info("Successfully seeded static LifestyleRecommendations.")
+    from app.recommendation_library import build
 
+    try:
+        summary = build(generate=False, only_missing=True)
+        current_app.logger.info(f"Seeded recommendation library: {summary}")
     except Exception as e:
         db.session.rollback()
-        current_app.logger.error(f"Error seeding database: {e}")
\ No newline at end of file
+        current_app.logger.error(f"Error seeding database: {e}")
@@ -0,0 +1,260 @@
+# HealthCare App/medml-backend/app/features.py
+"""
+Declarative feature specs for the risk models.
+
+A spec is an ordered list of (feature_name, transform) pairs. Transforms read
+raw assessment fields (`Num`, `Flag`, `Male`) or other features by name, and
+may be nested. A spec is compiled once: all raw fields are pulled out of the
+input dicts in a single pass into one column block, then every transform runs
+as a NumPy operation over the whole block.
+"""
+import numpy as np
+from typing import Any, Callable, Dict, List, Sequence, Tuple, Union
+
+
+def to_float(value: Any, default: float = 0.0) -> float:
+    """Coerces a raw assessment value to float, using `default` for None/garbage."""
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return default
+
+
+class Transform:
+    """Base class for a single feature column computation."""
+
+    def inputs(self) -> Sequence[Union[str, 'Transform']]:
+        return ()
+
+    def compute(self, *columns: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+
+# --- Raw sources ---
+
+class Source(Transform):
+    """A column read straight from the input dicts."""
+
+    def __init__(self, key: str):
+        self.key = key
+
+    def convert(self, value: Any) -> float:
+        raise NotImplementedError
+
+
+class Num(Source):
+    """Numeric field; None or non-numeric values become `default`."""
+
+    def __init__(self, key: str, default: float = 0.0):
+        super().__init__(key)
+        self.default = default
+
+    def convert(self, value: Any) -> float:
+        return to_float(value, self.default)
+
+
+class Flag(Source):
+    """Boolean field as 0.0/1.0."""
+
+    def convert(self, value: Any) -> float:
+        return 1.0 if value else 0.0
+
+
+class Male(Source):
+    """Gender field: 'Male' -> 1.0, everything else -> 0.0."""
+
+    def __init__(self, key: str = 'gender'):
+        super().__init__(key)
+
+    def convert(self, value: Any) -> float:
+        return 1.0 if value == 'Male' else 0.0
+
+
+# --- Derived features ---
+
+class Bins(Transform):
+    """Bucket index of `feature` for the ascending `edges` (value < edges[0] -> 0)."""
+
+    def __init__(self, feature, edges: Sequence[float]):
+        self.feature = feature
+        self.edges = np.asarray(edges, dtype=np.float64)
+
+    def inputs(self):
+        return (self.feature,)
+
+    def compute(self, x):
+        return np.searchsorted(self.edges, x, side='right').astype(np.float64)
+
+
+class Ratio(Transform):
+    """numerator / denominator, `default` where the denominator is <= 0."""
+
+    def __init__(self, numerator, denominator, default: float = 0.0):
+        self.numerator = numerator
+        self.denominator = denominator
+        self.default = default
+
+    def inputs(self):
+        return (self.numerator, self.denominator)
+
+    def compute(self, num, den):
+        out = np.full_like(num, self.default)
+        np.divide(num, den, out=out, where=den > 0)
+        return out
+
+
+class Product(Transform):
+    def __init__(self, *features):
+        self.features = features
+
+    def inputs(self):
+        return self.features
+
+    def compute(self, *columns):
+        out = columns[0].copy()
+        for col in columns[1:]:
+            out *= col
+        return out
+
+
+class Sum(Transform):
+    def __init__(self, *features):
+        self.features = features
+
+    def inputs(self):
+        return self.features
+
+    def compute(self, *columns):
+        return np.sum(columns, axis=0)
+
+
+class Difference(Transform):
+    def __init__(self, minuend, subtrahend):
+        self.minuend = minuend
+        self.subtrahend = subtrahend
+
+    def inputs(self):
+        return (self.minuend, self.subtrahend)
+
+    def compute(self, a, b):
+        return a - b
+
+
+class Below(Transform):
+    """1.0 where `feature` < threshold."""
+
+    def __init__(self, feature, threshold: float):
+        self.feature = feature
+        self.threshold = threshold
+
+    def inputs(self):
+        return (self.feature,)
+
+    def compute(self, x):
+        return (x < self.threshold).astype(np.float64)
+
+
+class AnyAbove(Transform):
+    """1.0 where any of `features` is > threshold."""
+
+    def __init__(self, features: Sequence, threshold: float):
+        self.features = tuple(features)
+        self.threshold = threshold
+
+    def inputs(self):
+        return self.features
+
+    def compute(self, *columns):
+        return (np.stack(columns) > self.threshold).any(axis=0).astype(np.float64)
+
+
+class Coalesce(Transform):
+    """`primary` where it is not NaN, else `fallback`."""
+
+    def __init__(self, primary, fallback):
+        self.primary = primary
+        self.fallback = fallback
+
+    def inputs(self):
+        return (self.primary, self.fallback)
+
+    def compute(self, primary, fallback):
+        return np.where(np.isnan(primary), fallback, primary)
+
+
+class Apply(Transform):
+    """Escape hatch for one-off vectorized formulas: fn(*columns) -> column."""
+
+    def __init__(self, fn: Callable[..., np.ndarray], *features):
+        self.fn = fn
+        self.features = features
+
+    def inputs(self):
+        return self.features
+
+    def compute(self, *columns):
+        return np.asarray(self.fn(*columns), dtype=np.float64)
+
+
+# --- Spec ---
+
+class FeatureSpec:
+    """
+    Ordered model input definition. `transform(rows)` returns the
+    (len(rows) x len(names)) float64 matrix the model expects, with columns
+    in declaration order. Features may reference each other in any order.
+    """
+
+    def __init__(self, features: List[Tuple[str, Transform]]):
+        self.names = [name for name, _ in features]
+        self._transforms = dict(features)
+        if len(self._transforms) != len(self.names):
+            raise ValueError("Duplicate feature name in spec")
+        self._sources: List[Source] = []
+        self._source_index: Dict[int, int] = {}
+
+        for name, transform in features:
+            self._collect(transform, (name,))
+
+        self._converters = [(s.key, s.convert) for s in self._sources]
+
+    def _collect(self, node, path):
+        if isinstance(node, str):
+            if node not in self._transforms:
+                raise ValueError(f"Feature '{path[0]}' references unknown feature '{node}'")
+            if node in path:
+                raise ValueError(f"Circular feature reference: {' -> '.join(path + (node,))}")
+            self._collect(self._transforms[node], path + (node,))
+            return
+        if isinstance(node, Source):
+            if id(node) not in self._source_index:
+                self._source_index[id(node)] = len(self._sources)
+                self._sources.append(node)
+            return
+        for child in node.inputs():
+            self._collect(child, path)
+
+    def column_block(self, rows: List[Dict[str, Any]]) -> np.ndarray:
+        """Pulls every raw source field out of `rows` in one pass."""
+        converters = self._converters
+        block = np.array(
+            [[convert(row.get(key)) for key, convert in converters] for row in rows],
+            dtype=np.float64,
+        )
+        return block.reshape(len(rows), len(converters))
+
+    def _evaluate(self, node, block, computed):
+        if isinstance(node, str):
+            if node not in computed:
+                computed[node] = self._evaluate(self._transforms[node], block, computed)
+            return computed[node]
+        if isinstance(node, Source):
+            return block[:, self._source_index[id(node)]]
+        return node.compute(*(self._evaluate(child, block, computed) for child in node.inputs()))
+
+    def transform(self, rows: List[Dict[str, Any]]) -> np.ndarray:
+        block = self.column_block(rows)
+        computed: Dict[str, np.ndarray] = {}
+        return np.column_stack([self._evaluate(name, block, computed) for name in self.names])
@@ -0,0 +1,259 @@
+# HealthCare App/medml-backend/app/inference.py
+"""
+Micro-batching inference pool.
+
+With INFERENCE_POOL_ENABLED, `services.run_prediction` no longer evaluates
+models in the request thread. It hands the row to the InferenceService and
+waits for the score. A dispatcher thread drains the queue, keeps collecting
+for INFERENCE_BATCH_WINDOW_MS after the first request arrives, groups what
+it collected by model and sends each group to a worker process as one
+`run_prediction_batch` call.
+
+- Backpressure: at most INFERENCE_MAX_PENDING requests may be queued or
+  running; beyond that `submit` raises InferenceBusyError immediately.
+- Timeout: `predict` waits at most INFERENCE_TIMEOUT_SECONDS and then raises
+  InferenceTimeoutError (the row is dropped if it has not started yet).
+- A row that breaks its batch is retried on its own, so one bad input only
+  fails its own request.
+
+Worker processes are started with `spawn` on first use in each web worker,
+so gunicorn can fork before any pool exists.
+"""
+import atexit
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional
+
+
+class InferenceError(RuntimeError):
+    """Base class for failures of the pool itself (not of a model)."""
+
+
+class InferenceBusyError(InferenceError):
+    """Too many scoring requests are already pending."""
+
+
+class InferenceTimeoutError(InferenceError):
+    """A scoring request did not finish within the configured timeout."""
+
+
+# --- Worker process side ---
+
+_worker_app = None
+
+
+def _init_worker(config_name: str):
+    """Builds an app (and so loads the models) once per worker process."""
+    global _worker_app, service
+    from app import create_app
+    _worker_app = create_app(config_name)
+    # Workers score in-process; they never forward to a pool of their own
+    service = None
+
+
+def _score_in_worker(assessment_type: str, rows: List[Dict[str, Any]]) -> List[tuple]:
+    """
+    Scores one micro-batch. Returns (True, score) or (False, exception) per
+    row, aligned with `rows`.
+    """
+    from app.services import run_prediction_batch
+
+    with _worker_app.app_context():
+        try:
+            return [(True, float(s)) for s in run_prediction_batch(assessment_type, rows)]
+        except Exception as e:
+            if len(rows) == 1:
+                return [(False, e)]
+
+        results = []
+        for row in rows:
+            try:
+                results.append((True, float(run_prediction_batch(assessment_type, [row])[0])))
+            except Exception as e:
+                results.append((False, e))
+        return results
+
+
+# --- Web process side ---
+
+class _Pending:
+    __slots__ = ('assessment_type', 'row', 'future')
+
+    def __init__(self, assessment_type: str, row: Dict[str, Any]):
+        self.assessment_type = assessment_type
+        self.row = row
+        self.future = Future()
+
+
+class InferenceService:
+    """Queue + dispatcher thread + process pool for one web worker process."""
+
+    def __init__(self, config_name: str, workers: int = 2, window_ms: float = 5.0,
+                 max_batch: int = 256, max_pending: int = 512, timeout: float = 10.0,
+                 logger: Any = None):
+        self.config_name = config_name
+        self.workers = max(1, int(workers))
+        self.window = max(0.0, float(window_ms)) / 1000.0
+        self.max_batch = max(1, int(max_batch))
+        self.max_pending = max(1, int(max_pending))
+        self.timeout = float(timeout)
+        self.logger = logger
+        self._queue: Optional[queue.Queue] = None
+        self._slots: Optional[threading.BoundedSemaphore] = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    # --- Lifecycle ---
+
+    def _ensure_started(self):
+        # Re-create everything after a fork: threads and pools do not survive it
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue()
+            self._slots = threading.BoundedSemaphore(self.max_pending)
+            self._executor = self._new_executor()
+            self._thread = threading.Thread(target=self._dispatch_loop, name='inference-dispatcher', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+            atexit.register(self.shutdown)
+            if self.logger:
+                self.logger.info(f"Started inference pool with {self.workers} worker process(es)")
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(self.config_name,),
+        )
+
+    def shutdown(self):
+        if self._pid != os.getpid():
+            return
+        self._queue.put(None)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._pid = None
+
+    # --- Client API ---
+
+    def submit(self, assessment_type: str, row: Dict[str, Any]) -> Future:
+        """Queues one row for scoring. Raises InferenceBusyError when the pool is saturated."""
+        self._ensure_started()
+        if not self._slots.acquire(blocking=False):
+            raise InferenceBusyError("Prediction service is busy. Please retry shortly.")
+        pending = _Pending(assessment_type, row)
+        pending.future.add_done_callback(lambda _: self._slots.release())
+        self._queue.put(pending)
+        return pending.future
+
+    def predict(self, assessment_type: str, row: Dict[str, Any]) -> float:
+        future = self.submit(assessment_type, row)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise InferenceTimeoutError(f"{assessment_type} prediction timed out after {self.timeout:g}s")
+
+    # --- Dispatcher ---
+
+    def _collect(self) -> Optional[List[_Pending]]:
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _dispatch_loop(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+
+            groups: Dict[str, List[_Pending]] = {}
+            for pending in batch:
+                # Skips requests whose caller already timed out
+                if pending.future.set_running_or_notify_cancel():
+                    groups.setdefault(pending.assessment_type, []).append(pending)
+
+            for assessment_type, items in groups.items():
+                for start in range(0, len(items), self.max_batch):
+                    self._send(assessment_type, items[start:start + self.max_batch])
+
+    def _send(self, assessment_type: str, items: List[_Pending]):
+        executor = self._executor
+        try:
+            job = executor.submit(_score_in_worker, assessment_type, [p.row for p in items])
+        except Exception as e:
+            self._fail(items, e, executor)
+            return
+        job.add_done_callback(lambda done: self._deliver(items, done, executor))
+
+    def _deliver(self, items: List[_Pending], job: Future, executor: ProcessPoolExecutor):
+        try:
+            results = job.result()
+        except Exception as e:
+            self._fail(items, e, executor)
+            return
+        for pending, (success, value) in zip(items, results):
+            if success:
+                pending.future.set_result(value)
+            else:
+                pending.future.set_exception(value)
+
+    def _fail(self, items: List[_Pending], error: Exception, executor: ProcessPoolExecutor):
+        if isinstance(error, BrokenProcessPool):
+            # Every batch in flight on the broken pool lands here; only the first replaces it
+            with self._lock:
+                replace = self._executor is executor
+                if replace:
+                    self._executor = self._new_executor()
+            if replace:
+                if self.logger:
+                    self.logger.error(f"Inference worker died, restarting pool: {error}")
+                executor.shutdown(wait=False, cancel_futures=True)
+        for pending in items:
+            if not pending.future.done():
+                pending.future.set_exception(InferenceError(f"Prediction worker failed: {error}"))
+
+
+service: Optional[InferenceService] = None
+
+
+def init_app(app: Any, config_name: str):
+    """Creates the (not yet started) service when INFERENCE_POOL_ENABLED is set."""
+    global service
+    if not app.config.get('INFERENCE_POOL_ENABLED'):
+        service = None
+        return
+    service = InferenceService(
+        config_name,
+        workers=app.config.get('INFERENCE_WORKERS', 2),
+        window_ms=app.config.get('INFERENCE_BATCH_WINDOW_MS', 5),
+        max_batch=app.config.get('INFERENCE_MAX_BATCH', 256),
+        max_pending=app.config.get('INFERENCE_MAX_PENDING', 512),
+        timeout=app.config.get('INFERENCE_TIMEOUT_SECONDS', 10),
+        logger=app.logger,
+    )
@@ -0,0 +1,339 @@
+# HealthCare App/medml-backend/app/model_registry.py
+"""
+Versioned, lazily loaded ML models.
+
+The registry reads `manifest.json` in the models directory:
+
+    {"models": {"diabetes": {"file": "...pkl", "version": "1.0",
+                             "sha256": "...", "features": [...]}, ...}}
+
+A model is unpickled (and checksum-verified) on first use rather than at
+startup. When the manifest changes on disk, or an admin calls
+`POST /api/v1/models/reload`, entries whose file, version or checksum
+changed are loaded again and swapped in only once the new artifact has
+loaded successfully; in-flight requests keep the object they already hold.
+
+Every prediction is stamped with `version_stamp()`: the per-model versions
+joined with '/' in MODEL_KEYS order (diabetes/liver/heart/mental_health).
+
+With MODEL_SHARED_STORE set, boosted-tree models are exported once into that
+directory as `.npy` node arrays (one sub-directory per model, named after the
+pickle's checksum) and every process attaches to them as read-only memory
+maps instead of unpickling its own copy. Models that cannot be compiled are
+still unpickled per process.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+import joblib
+
+from app.tree_engine import TreeEnsemble, UnsupportedModelError, compile_model, probe_matrix, validate
+
+MODEL_KEYS = ('diabetes', 'liver', 'heart', 'mental_health')
+MANIFEST_NAME = 'manifest.json'
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ModelEntry:
+    """One manifest entry plus whatever has been loaded for it."""
+
+    def __init__(self, key: str, spec: Dict[str, Any]):
+        self.key = key
+        self.file = spec['file']
+        self.version = str(spec.get('version', '1.0'))
+        self.sha256 = spec.get('sha256')
+        self.features = list(spec.get('features') or [])
+        self.model = None
+        self.compiled = None
+        self.loaded_version = None
+        self.loaded_at = None
+        self.shared = False
+        self.error = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.model is not None or self.shared
+
+    def same_artifact(self, other: 'ModelEntry') -> bool:
+        return (self.file, self.version, self.sha256) == (other.file, other.version, other.sha256)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "key": self.key,
+            "file": self.file,
+            "version": self.version,
+            "sha256": self.sha256,
+            "loaded": self.loaded,
+            "loaded_version": self.loaded_version,
+            "loaded_at": self.loaded_at,
+            "compiled": self.compiled is not None,
+            "shared": self.shared,
+            "error": self.error,
+        }
+
+
+class ModelRegistry:
+    """
+    Dict-like access to the models (`registry.get('diabetes')`) backed by
+    the manifest. Safe to share between request threads.
+    """
+
+    def __init__(self, model_dir: str):
+        self.model_dir = model_dir
+        self.entries: Dict[str, ModelEntry] = {}
+        self.logger = logging.getLogger(__name__)
+        self.compile_trees = True
+        self.check_interval = 0.0
+        self.shared_store = None
+        self._manifest_mtime = None
+        self._last_check = 0.0
+        self._lock = threading.RLock()
+        self._reload_listeners = []
+
+    # --- Setup ---
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.model_dir, MANIFEST_NAME)
+
+    def configure(self, app: Any):
+        """Reads settings from the Flask config and loads the manifest."""
+        self.logger = app.logger
+        self.model_dir = app.config.get('MODEL_DIR') or self.model_dir
+        self.compile_trees = app.config.get('COMPILED_TREE_INFERENCE', True)
+        self.check_interval = float(app.config.get('MODEL_RELOAD_CHECK_SECONDS', 0) or 0)
+        self.shared_store = app.config.get('MODEL_SHARED_STORE') or None
+        with self._lock:
+            self.entries = self._read_manifest()
+        if app.config.get('MODEL_EAGER_LOAD'):
+            self.load_all()
+
+    def _read_manifest(self) -> Dict[str, ModelEntry]:
+        try:
+            self._manifest_mtime = os.path.getmtime(self.manifest_path)
+            with open(self.manifest_path) as fh:
+                manifest = json.load(fh)
+        except (OSError, ValueError) as e:
+            self.logger.error(f"Could not read model manifest {self.manifest_path}: {e}")
+            return dict(self.entries)
+        return {key: ModelEntry(key, spec) for key, spec in manifest.get('models', {}).items()}
+
+    # --- Loading ---
+
+    def _load(self, entry: ModelEntry) -> bool:
+        """Loads (or re-loads) one entry in place. Returns True on success."""
+        path = os.path.join(self.model_dir, entry.file)
+        if not os.path.exists(path):
+            entry.error = "file not found"
+            self.logger.warning(f"Model file not found at {path}. Predictions for '{entry.key}' will fail.")
+            return False
+        try:
+            actual = file_sha256(path) if (entry.sha256 or self.shared_store) else None
+            if entry.sha256 and actual != entry.sha256:
+                raise ValueError(f"checksum mismatch (manifest {entry.sha256[:12]}, file {actual[:12]})")
+            if self.shared_store and self.compile_trees and self._attach_shared(entry, actual):
+                return True
+            model = joblib.load(path)
+        except Exception as e:
+            entry.error = str(e)
+            self.logger.error(f"Error loading model {entry.file}: {e}")
+            return False
+
+        n_features = getattr(model, 'n_features_in_', None)
+        if entry.features and n_features is not None and n_features != len(entry.features):
+            self.logger.warning(
+                f"Model '{entry.key}' expects {n_features} features but the manifest lists {len(entry.features)}."
+            )
+
+        compiled = self._compile(entry.key, model) if self.compile_trees else None
+        if compiled is not None and self.shared_store:
+            self._export_shared(entry.key, compiled, actual)
+            if self._attach_shared(entry, actual):
+                # Drop the private copy so this process (and anything forked
+                # from it) scores from the shared arrays like every other worker
+                return True
+
+        # Swap in only after everything above succeeded
+        entry.model, entry.compiled, entry.shared = model, compiled, False
+        self._mark_loaded(entry)
+        self.logger.info(f"Loaded model '{entry.key}' version {entry.version} from {entry.file}")
+        return True
+
+    def _mark_loaded(self, entry: ModelEntry):
+        entry.loaded_version = entry.version
+        entry.loaded_at = time.time()
+        entry.error = None
+
+    def _compile(self, key: str, model: Any):
+        """
+        Exports boosted-tree models to a TreeEnsemble (app/tree_engine.py),
+        kept only if it reproduces predict_proba bit-for-bit on probe inputs.
+        """
+        try:
+            ensemble = compile_model(model)
+            diff = validate(ensemble, model, probe_matrix(ensemble, model.n_features_in_))
+        except UnsupportedModelError:
+            return None
+        except Exception as e:
+            self.logger.warning(f"Could not compile {key} model, using predict_proba: {e}")
+            return None
+        if diff is not None:
+            self.logger.warning(f"Compiled {key} model differs from predict_proba by {diff}; not using it.")
+            return None
+        self.logger.info(f"Compiled {key} model: {ensemble.n_trees} trees, {ensemble.n_nodes} nodes ({ensemble.source}).")
+        return ensemble
+
+    # --- Shared store ---
+
+    def _shared_path(self, key: str, sha256: str) -> str:
+        return os.path.join(self.shared_store, f"{key}-{sha256[:16]}")
+
+    def _attach_shared(self, entry: ModelEntry, sha256: str) -> bool:
+        """Memory-maps a previously exported ensemble for this exact pickle, if there is one."""
+        path = self._shared_path(entry.key, sha256)
+        if not os.path.isdir(path):
+            return False
+        try:
+            ensemble = TreeEnsemble.load(path, mmap=True)
+        except Exception as e:
+            self.logger.warning(f"Could not attach shared model {path}, unpickling instead: {e}")
+            return False
+        # The ensemble stands in for the model: it has the same predict_proba
+        entry.model, entry.compiled, entry.shared = None, ensemble, True
+        self._mark_loaded(entry)
+        self.logger.info(f"Attached shared model '{entry.key}' version {entry.version} from {path}")
+        return True
+
+    def _export_shared(self, key: str, ensemble: TreeEnsemble, sha256: str):
+        """
+        Writes a validated ensemble into the shared store. The arrays go to a
+        temporary directory first and are renamed into place, so concurrent
+        workers never see a partial export; if another process won the race
+        its copy is kept.
+        """
+        target = self._shared_path(key, sha256)
+        if os.path.isdir(target):
+            return
+        tmp = None
+        try:
+            os.makedirs(self.shared_store, exist_ok=True)
+            tmp = tempfile.mkdtemp(prefix=f".{key}-", dir=self.shared_store)
+            ensemble.save(tmp)
+            os.chmod(tmp, 0o755)
+            os.rename(tmp, target)
+            self.logger.info(f"Exported {key} model to shared store {target}")
+        except OSError as e:
+            if tmp:
+                shutil.rmtree(tmp, ignore_errors=True)
+            if not os.path.isdir(target):
+                self.logger.warning(f"Could not export {key} model to shared store: {e}")
+
+    def _ensure_loaded(self, key: str) -> Optional[ModelEntry]:
+        self._maybe_check_for_changes()
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if not entry.loaded and entry.error is None:
+            with self._lock:
+                # Another thread may have loaded it while we waited
+                if not entry.loaded and entry.error is None:
+                    self._load(entry)
+        return entry
+
+    def load_all(self):
+        for key in list(self.entries):
+            self._ensure_loaded(key)
+
+    # --- Dict-style access ---
+
+    def get(self, key: str, default: Any = None) -> Any:
+        entry = self._ensure_loaded(key)
+        if entry is None or not entry.loaded:
+            return default
+        # Shared entries are scored by the memory-mapped ensemble alone
+        return entry.model if entry.model is not None else entry.compiled
+
+    def __getitem__(self, key: str) -> Any:
+        return self.get(key)
+
+    def compiled(self, key: str):
+        entry = self._ensure_loaded(key)
+        return entry.compiled if entry is not None else None
+
+    # --- Versions ---
+
+    def version(self, key: str) -> Optional[str]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        return entry.loaded_version or entry.version
+
+    def version_stamp(self) -> str:
+        return '/'.join(self.version(key) or '-' for key in MODEL_KEYS)
+
+    def describe(self) -> List[Dict[str, Any]]:
+        return [entry.to_dict() for entry in self.entries.values()]
+
+    # --- Hot reload ---
+
+    def _maybe_check_for_changes(self):
+        if self.check_interval <= 0:
+            return
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+        try:
+            mtime = os.path.getmtime(self.manifest_path)
+        except OSError:
+            return
+        if mtime != self._manifest_mtime:
+            self.logger.info("Model manifest changed on disk; reloading.")
+            self.reload()
+
+    def on_reload(self, callback):
+        """Registers callback(changed_keys), called after a reload swaps any model."""
+        if callback not in self._reload_listeners:
+            self._reload_listeners.append(callback)
+
+    def reload(self, keys: Optional[Iterable[str]] = None) -> List[str]:
+        """
+        Re-reads the manifest and reloads changed entries (or exactly `keys`
+        when given). Models that were never loaded stay lazy. Returns the
+        keys whose artifact was swapped or invalidated.
+        """
+        forced = set(keys or ())
+        changed = []
+        with self._lock:
+            fresh = self._read_manifest()
+            for key, new in fresh.items():
+                old = self.entries.get(key)
+                if old is not None and old.same_artifact(new) and key not in forced:
+                    fresh[key] = old
+                    continue
+                if old is not None and old.loaded:
+                    # Keep serving the old model if the new one fails to load
+                    if not self._load(new):
+                        new.model, new.compiled, new.shared = old.model, old.compiled, old.shared
+                        new.loaded_version, new.loaded_at = old.loaded_version, old.loaded_at
+                        continue
+                changed.append(key)
+            self.entries = fresh
+        if changed:
+            for callback in self._reload_listeners:
+                callback(changed)
+        return changed
@@ -2,9 +2,12 @@
 from app.extensions import db, bcrypt
 from sqlalchemy.sql import func
 from sqlalchemy.ext.hybrid import hybrid_property
-from datetime import datetime
-from sqlalchemy import CheckConstraint
+from sqlalchemy.orm import declared_attr
+from datetime import date, datetime
+from sqlalchemy import CheckConstraint, case, event, select
+from sqlalchemy.dialects import postgresql, sqlite
 from flask import current_app
+from app.serialization import encode
 
 class User(db.Model):
     """
@@ -41,17 +44,12 @@ class User(db.Model):
     def check_password(self, password):
         return bcrypt.check_password_hash(self.password_hash, password)
 
+    serializer_fields = (
+        ('admin_id', 'id'), 'name', 'email', 'username', 'role', 'designation', 'contact_number', 'facility_name',
+    )
+
     def to_dict(self):
-        return {
-            "admin_id": self.id,
-            "name": self.name,
-            "email": self.email,
-            "username": self.username,
-            "role": self.role,
-            "designation": self.designation,
-            "contact_number": self.contact_number,
-            "facility_name": self.facility_name
-        }
+        return encode(self)
 
 class Patient(db.Model):
     """
@@ -82,6 +80,21 @@ class Patient(db.Model):
     mental_health_assessments = db.relationship('MentalHealthAssessment', back_populates='patient', lazy='dynamic', cascade="all, delete-orphan", order_by="MentalHealthAssessment.assessed_at.desc()")
     risk_predictions = db.relationship('RiskPrediction', back_populates='patient', lazy='dynamic', cascade="all, delete-orphan", order_by="RiskPrediction.predicted_at.desc()")
     
+    # --- Latest prediction, denormalized from risk_predictions ---
+    # Kept in step by sync_latest_predictions() whenever a RiskPrediction is
+    # inserted, so listings can filter and sort on these indexed columns.
+    latest_prediction_id = db.Column(db.Integer, nullable=True)
+    latest_diabetes_risk_level = db.Column(db.String(20), nullable=True, index=True)
+    latest_liver_risk_level = db.Column(db.String(20), nullable=True, index=True)
+    latest_heart_risk_level = db.Column(db.String(20), nullable=True, index=True)
+    latest_mental_health_risk_level = db.Column(db.String(20), nullable=True, index=True)
+    latest_prediction = db.relationship(
+        'RiskPrediction',
+        primaryjoin='foreign(Patient.latest_prediction_id) == RiskPrediction.id',
+        uselist=False,
+        viewonly=True,
+    )
+
     # 1:N relationship (Patient -> Consultations)
     consultations = db.relationship('Consultation', back_populates='patient', lazy='dynamic')
     
@@ -103,35 +116,34 @@ class Patient(db.Model):
             return round(self.weight / (height_m ** 2), 2)
         return None
 
-    def to_dict(self, include_admin=True, include_history=False, include_latest_prediction=False, include_notes=False):
-        data = {
-            "patient_id": self.id,
-            "name": self.name,
-            "age": self.age,
-            "gender": self.gender,
-            "abha_id": self.abha_id,
-            "height": self.height,
-            "weight": self.weight,
-            "bmi": self.bmi,
-            "state_name": self.state_name,
-            "created_by_admin_id": self.created_by_admin_id,
-            "created_at": self.created_at.isoformat(),
-        }
+    serializer_fields = (
+        ('patient_id', 'id'), 'name', 'age', 'gender', 'abha_id', 'height', 'weight', 'bmi',
+        'state_name', 'created_by_admin_id', 'created_at',
+    )
+
+    def to_dict(self, include_admin=True, include_history=False, include_latest_prediction=False, include_notes=False,
+                sections=None):
+        # `sections` holds collections already loaded by PatientRepository.load_full;
+        # anything missing from it is read through the relationship
+        def rows(name):
+            return sections[name] if sections and name in sections else getattr(self, name)
+
+        data = encode(self)
         if include_admin and self.created_by_admin:
             data['created_by_admin'] = self.created_by_admin.to_dict()
             
         if include_history:
-            data['diabetes_assessments'] = [a.to_dict() for a in self.diabetes_assessments]
-            data['liver_assessments'] = [a.to_dict() for a in self.liver_assessments]
-            data['heart_assessments'] = [a.to_dict() for a in self.heart_assessments]
-            data['mental_health_assessments'] = [a.to_dict() for a in self.mental_health_assessments]
-            data['risk_predictions'] = [p.to_dict() for p in self.risk_predictions]
+            data['diabetes_assessments'] = [a.to_dict() for a in rows('diabetes_assessments')]
+            data['liver_assessments'] = [a.to_dict() for a in rows('liver_assessments')]
+            data['heart_assessments'] = [a.to_dict() for a in rows('heart_assessments')]
+            data['mental_health_assessments'] = [a.to_dict() for a in rows('mental_health_assessments')]
+            data['risk_predictions'] = [p.to_dict() for p in rows('risk_predictions')]
         
         if include_latest_prediction:
-             data['latest_prediction'] = self.risk_predictions.first().to_dict() if self.risk_predictions.first() else None
+             data['latest_prediction'] = self.latest_prediction.to_dict() if self.latest_prediction else None
 
         if include_notes:
-            data['consultation_notes'] = [n.to_dict() for n in self.consultation_notes]
+            data['consultation_notes'] = [n.to_dict() for n in rows('consultation_notes')]
             
         return data
 
@@ -193,6 +205,11 @@ class BaseAssessment(db.Model):
     # Renamed from updated_by_user_id
     assessed_by_admin_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='SET NULL'), nullable=True)
 
+    @declared_attr
+    def __table_args__(cls):
+        # History reads: one patient's assessments, newest first
+        return (db.Index(f'ix_{cls.__tablename__}_patient_id_assessed_at', 'patient_id', 'assessed_at'),)
+
 class DiabetesAssessment(BaseAssessment):
     __tablename__ = 'diabetes_assessments'
     patient = db.relationship('Patient', back_populates='diabetes_assessments')
@@ -205,18 +222,13 @@ class DiabetesAssessment(BaseAssessment):
     insulin = db.Column(db.Float, nullable=False)
     diabetes_history = db.Column(db.Boolean, nullable=False, default=False)
     
+    serializer_fields = (
+        ('assessment_id', 'id'), 'patient_id', 'pregnancy', 'glucose', 'blood_pressure', 'skin_thickness',
+        'insulin', 'diabetes_history', 'assessed_at',
+    )
+
     def to_dict(self, include_patient_data=False):
-        data = {
-            "assessment_id": self.id,
-            "patient_id": self.patient_id,
-            "pregnancy": self.pregnancy,
-            "glucose": self.glucose,
-            "blood_pressure": self.blood_pressure,
-            "skin_thickness": self.skin_thickness,
-            "insulin": self.insulin,
-            "diabetes_history": self.diabetes_history,
-            "assessed_at": self.assessed_at.isoformat()
-        }
+        data = encode(self)
         if include_patient_data and self.patient:
              data.update(self.patient._get_common_features())
         return data
@@ -245,20 +257,15 @@ class LiverAssessment(BaseAssessment):
                 return round(self.albumin / globulin, 2)
         return None
 
+    serializer_fields = (
+        ('assessment_id', 'id'), 'patient_id', 'total_bilirubin', 'direct_bilirubin', 'alkaline_phosphatase',
+        'sgpt_alamine_aminotransferase', 'sgot_aspartate_aminotransferase', 'total_protein', 'albumin',
+        'ag_ratio',  # Add the computed ratio
+        'assessed_at',
+    )
+
     def to_dict(self, include_patient_data=False):
-        data = {
-            "assessment_id": self.id,
-            "patient_id": self.patient_id,
-            "total_bilirubin": self.total_bilirubin,
-            "direct_bilirubin": self.direct_bilirubin,
-            "alkaline_phosphatase": self.alkaline_phosphatase,
-            "sgpt_alamine_aminotransferase": self.sgpt_alamine_aminotransferase,
-            "sgot_aspartate_aminotransferase": self.sgot_aspartate_aminotransferase,
-            "total_protein": self.total_protein,
-            "albumin": self.albumin,
-            "ag_ratio": self.ag_ratio, # Add the computed ratio
-            "assessed_at": self.assessed_at.isoformat()
-        }
+        data = encode(self)
         if include_patient_data and self.patient:
              data.update(self.patient._get_common_features())
         return data
@@ -287,29 +294,15 @@ class HeartAssessment(BaseAssessment):
     stress_level = db.Column(db.Integer, nullable=True) # 1-10
     heart_attack_history = db.Column(db.Boolean, nullable=False, default=False)
 
+    serializer_fields = (
+        ('assessment_id', 'id'), 'patient_id', 'diabetes', 'hypertension', 'obesity', 'smoking',
+        'alcohol_consumption', 'physical_activity', 'diet_score', 'cholesterol_level', 'triglyceride_level',
+        'ldl_level', 'hdl_level', 'systolic_bp', 'diastolic_bp', 'air_pollution_exposure', 'family_history',
+        'stress_level', 'heart_attack_history', 'assessed_at',
+    )
+
     def to_dict(self, include_patient_data=False):
-        data = {
-            "assessment_id": self.id,
-            "patient_id": self.patient_id,
-            "diabetes": self.diabetes,
-            "hypertension": self.hypertension,
-            "obesity": self.obesity,
-            "smoking": self.smoking,
-            "alcohol_consumption": self.alcohol_consumption,
-            "physical_activity": self.physical_activity,
-            "diet_score": self.diet_score,
-            "cholesterol_level": self.cholesterol_level,
-            "triglyceride_level": self.triglyceride_level,
-            "ldl_level": self.ldl_level,
-            "hdl_level": self.hdl_level,
-            "systolic_bp": self.systolic_bp,
-            "diastolic_bp": self.diastolic_bp,
-            "air_pollution_exposure": self.air_pollution_exposure,
-            "family_history": self.family_history,
-            "stress_level": self.stress_level,
-            "heart_attack_history": self.heart_attack_history,
-            "assessed_at": self.assessed_at.isoformat()
-        }
+        data = encode(self)
         if include_patient_data and self.patient:
              data.update(self.patient._get_common_features())
         return data
@@ -326,18 +319,13 @@ class MentalHealthAssessment(BaseAssessment):
     anxiousness = db.Column(db.Boolean, nullable=False, default=False)
     sleepiness = db.Column(db.Boolean, nullable=False, default=False)
 
+    serializer_fields = (
+        ('assessment_id', 'id'), 'patient_id', 'phq_score', 'gad_score', 'depressiveness', 'suicidal',
+        'anxiousness', 'sleepiness', 'assessed_at',
+    )
+
     def to_dict(self, include_patient_data=False):
-        data = {
-            "assessment_id": self.id,
-            "patient_id": self.patient_id,
-            "phq_score": self.phq_score,
-            "gad_score": self.gad_score,
-            "depressiveness": self.depressiveness,
-            "suicidal": self.suicidal,
-            "anxiousness": self.anxiousness,
-            "sleepiness": self.sleepiness,
-            "assessed_at": self.assessed_at.isoformat()
-        }
+        data = encode(self)
         if include_patient_data and self.patient:
              data.update(self.patient._get_common_features())
         return data
@@ -347,24 +335,28 @@ class MentalHealthAssessment(BaseAssessment):
 
 class RiskPrediction(db.Model):
     __tablename__ = 'risk_predictions'
+    __table_args__ = (
+        db.Index('ix_risk_predictions_patient_id_predicted_at', 'patient_id', 'predicted_at'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     # UPDATED: Removed unique=True for 1:N
     patient_id = db.Column(db.Integer, db.ForeignKey('patients.id', ondelete='CASCADE'), nullable=False) 
     patient = db.relationship('Patient', back_populates='risk_predictions')
     
     diabetes_risk_score = db.Column(db.Float, nullable=True) # Renamed
-    diabetes_risk_level = db.Column(db.String(20), nullable=True) # Renamed
+    diabetes_risk_level = db.Column(db.String(20), nullable=True, index=True) # Renamed
     liver_risk_score = db.Column(db.Float, nullable=True) # Renamed
-    liver_risk_level = db.Column(db.String(20), nullable=True) # Renamed
+    liver_risk_level = db.Column(db.String(20), nullable=True, index=True) # Renamed
     heart_risk_score = db.Column(db.Float, nullable=True) # Renamed
-    heart_risk_level = db.Column(db.String(20), nullable=True) # Renamed
+    heart_risk_level = db.Column(db.String(20), nullable=True, index=True) # Renamed
     mental_health_risk_score = db.Column(db.Float, nullable=True) # Renamed
-    mental_health_risk_level = db.Column(db.String(20), nullable=True) # Renamed
+    mental_health_risk_level = db.Column(db.String(20), nullable=True, index=True) # Renamed
     
     model_version = db.Column(db.String(50), nullable=True, default='1.0')
     predicted_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
     
-    def _get_level(self, score):
+    @staticmethod
+    def level_for_score(score):
         """Categorizes score based on config thresholds."""
         thresholds = current_app.config.get('RISK_THRESHOLDS', {'medium': 0.35, 'high': 0.7})
         if score >= thresholds['high']:
@@ -373,6 +365,9 @@ class RiskPrediction(db.Model):
             return 'Medium'
         return 'Low'
 
+    def _get_level(self, score):
+        return self.level_for_score(score)
+
     def update_risk(self, model_key: str, score: float, model_version: str):
         """Helper to update a specific risk and its level."""
         level = self._get_level(score)
@@ -381,29 +376,259 @@ class RiskPrediction(db.Model):
         # Potentially update model version per-disease, or use a general one
         self.model_version = model_version
 
+    serializer_fields = (
+        ('prediction_id', 'id'), 'patient_id',
+        'diabetes_risk_score', 'diabetes_risk_level', 'liver_risk_score', 'liver_risk_level',
+        'heart_risk_score', 'heart_risk_level', 'mental_health_risk_score', 'mental_health_risk_level',
+        'model_version', 'predicted_at',
+    )
+
     def to_dict(self):
-        return {
-            "prediction_id": self.id,
-            "patient_id": self.patient_id,
-            "diabetes_risk_score": self.diabetes_risk_score,
-            "diabetes_risk_level": self.diabetes_risk_level,
-            "liver_risk_score": self.liver_risk_score,
-            "liver_risk_level": self.liver_risk_level,
-            "heart_risk_score": self.heart_risk_score,
-            "heart_risk_level": self.heart_risk_level,
-            "mental_health_risk_score": self.mental_health_risk_score,
-            "mental_health_risk_level": self.mental_health_risk_level,
-            "model_version": self.model_version,
-            "predicted_at": self.predicted_at.isoformat()
-        }
+        return encode(self)
+
+# Disease -> denormalized risk level column on Patient
+LATEST_RISK_LEVEL_COLUMNS = {
+    'diabetes': 'latest_diabetes_risk_level',
+    'liver': 'latest_liver_risk_level',
+    'heart': 'latest_heart_risk_level',
+    'mental_health': 'latest_mental_health_risk_level',
+}
+
+
+def sync_latest_predictions(connection, patient_ids=None, counter_deltas=None):
+    """
+    Points each patient in `patient_ids` (all patients if None) at their most
+    recent RiskPrediction and copies its four risk levels onto the patient
+    row. Runs on `connection`, so it joins the caller's transaction.
+
+    The dashboard risk counters and 'predictions' rollups are adjusted from
+    one read of the patient rows before the single UPDATE and one after it,
+    and written with one upsert per table. `counter_deltas` (e.g. the
+    caller's total_predictions bump) go into the same upsert.
+    """
+    patients, predictions, users = Patient.__table__, RiskPrediction.__table__, User.__table__
+
+    def latest(column):
+        # The column of the patient's most recent prediction; every value uses the same ordering
+        return (
+            select(column)
+            .where(predictions.c.patient_id == patients.c.id)
+            .order_by(predictions.c.predicted_at.desc(), predictions.c.id.desc())
+            .limit(1)
+            .scalar_subquery()
+        )
+
+    point = _with_ids(patients.update().values(
+        latest_prediction_id=latest(predictions.c.id),
+        **{column: latest(predictions.c[f'{disease}_risk_level'])
+           for disease, column in LATEST_RISK_LEVEL_COLUMNS.items()},
+        # A new prediction is not an edit of the patient; keeps onupdate from stamping updated_at
+        updated_at=patients.c.updated_at,
+    ), patient_ids)
+
+    before = {row[0]: tuple(row[1:]) for row in connection.execute(_with_ids(
+        select(patients.c.id, patients.c.latest_prediction_id,
+               *(patients.c[column] for column in LATEST_RISK_LEVEL_COLUMNS.values())),
+        patient_ids,
+    ))}
+    connection.execute(point)
+    after = connection.execute(_with_ids(
+        select(patients.c.id, patients.c.latest_prediction_id,
+               *(patients.c[column] for column in LATEST_RISK_LEVEL_COLUMNS.values()),
+               patients.c.state_name, users.c.facility_name, func.date(predictions.c.predicted_at))
+        .outerjoin(predictions, predictions.c.id == patients.c.latest_prediction_id)
+        .outerjoin(users, users.c.id == patients.c.created_by_admin_id),
+        patient_ids,
+    ))
+
+    counters = dict(counter_deltas or {})
+    rollups = {}
+    n_levels = len(LATEST_RISK_LEVEL_COLUMNS)
+    for patient_id, latest, *rest in after:
+        new_levels, (state_name, facility, day) = rest[:n_levels], rest[n_levels:]
+        old_latest, *old_levels = before.get(patient_id, (None,) * (n_levels + 1))
+        # A new latest prediction is counted in that day's rollups, per disease
+        repointed = latest is not None and latest != old_latest
+        for disease, old, new in zip(LATEST_RISK_LEVEL_COLUMNS, old_levels, new_levels):
+            key = risk_count_key(disease)
+            counters[key] = counters.get(key, 0) + (new in ELEVATED_RISK_LEVELS) - (old in ELEVATED_RISK_LEVELS)
+            if repointed:
+                key = rollup_key(day, ROLLUP_PREDICTIONS, state_name=state_name, facility=facility,
+                                 disease=disease, from_level=old, risk_level=new)
+                rollups[key] = rollups.get(key, 0) + 1
+
+    bump_counters(connection, counters)
+    bump_rollups(connection, rollups)
+
+
+def _with_ids(query, patient_ids):
+    return query if patient_ids is None else query.where(Patient.__table__.c.id.in_(list(patient_ids)))
+
+
+@event.listens_for(RiskPrediction, 'after_insert')
+def _sync_patient_latest_prediction(mapper, connection, target):
+    # Bulk inserts (rescoring) bypass mapper events and sync per chunk instead
+    sync_latest_predictions(connection, [target.patient_id], counter_deltas={TOTAL_PREDICTIONS_KEY: 1})
+
+
+# --- Dashboard counters ---
+
+class DashboardCounter(db.Model):
+    """
+    Precomputed dashboard figures. The insert hooks here keep them current
+    in the same transaction as the counted row; app/dashboard_stats.py
+    recounts them from the raw tables to fix any drift.
+    """
+    __tablename__ = 'dashboard_counters'
+    key = db.Column(db.String(64), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+
+TOTAL_PATIENTS_KEY = 'total_patients'
+TOTAL_PREDICTIONS_KEY = 'total_predictions'
+# Levels counted by the dashboard's per-disease risk figures
+ELEVATED_RISK_LEVELS = ('Medium', 'High')
+
+
+def risk_count_key(disease):
+    return f'{disease}_risk_count'
+
+
+def registrations_key(day):
+    """Counter of patients registered on `day` (a date or ISO date string)."""
+    return f'registrations:{day}'
+
+
+def elevated_risk_counts(connection, patient_ids=None):
+    """Per disease, how many of `patient_ids` (all if None) have an elevated latest risk."""
+    patients = Patient.__table__
+    query = select(*(
+        func.coalesce(func.sum(case((patients.c[column].in_(ELEVATED_RISK_LEVELS), 1), else_=0)), 0)
+        for column in LATEST_RISK_LEVEL_COLUMNS.values()
+    ))
+    if patient_ids is not None:
+        query = query.where(patients.c.id.in_(list(patient_ids)))
+    return dict(zip(LATEST_RISK_LEVEL_COLUMNS, connection.execute(query).one()))
+
+
+_UPSERT_DIALECTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+
+# Rows per multi-row upsert; keeps the bound parameters well under SQLite's limit
+UPSERT_CHUNK_ROWS = 500
+
+
+def _increment(connection, table, key_names, column, deltas):
+    """
+    Adds each delta to `column` of the row whose primary key (`key_names`)
+    is the delta's key tuple, creating missing rows. One multi-row upsert
+    per UPSERT_CHUNK_ROWS rows where the dialect supports it.
+    """
+    rows = [{**dict(zip(key_names, key)), column: delta} for key, delta in deltas.items() if delta]
+    if not rows:
+        return
+    upsert = _UPSERT_DIALECTS.get(connection.dialect.name)
+    if upsert is not None:
+        for start in range(0, len(rows), UPSERT_CHUNK_ROWS):
+            statement = upsert(table).values(rows[start:start + UPSERT_CHUNK_ROWS])
+            connection.execute(statement.on_conflict_do_update(
+                index_elements=[table.c[name] for name in key_names],
+                set_={column: table.c[column] + statement.excluded[column]},
+            ))
+        return
+    for row in rows:
+        match = [table.c[name] == row[name] for name in key_names]
+        if not connection.execute(table.update().where(*match).values({column: table.c[column] + row[column]})).rowcount:
+            connection.execute(table.insert().values(**row))
+
+
+def bump_counters(connection, deltas):
+    """Adds each delta to its counter on `connection`, creating missing rows."""
+    _increment(connection, DashboardCounter.__table__, ('key',), 'value', {(key,): delta for key, delta in deltas.items()})
+
+
+# --- Daily rollups (served by app/rollups.py) ---
+
+ROLLUP_REGISTRATIONS = 'registrations'
+ROLLUP_PREDICTIONS = 'predictions'
+
+
+class DailyRollup(db.Model):
+    """
+    Per-day counts for trend charts, keyed by every dimension they can be
+    filtered or grouped on. Missing dimensions are stored as '' so the key
+    stays unique.
+
+    - registrations: patients registered that day, by state and facility
+      (the registering admin's facility_name)
+    - predictions: patients whose latest prediction changed that day, per
+      disease, with the previous latest level (from_level, '' for a first
+      prediction) and the new one (risk_level)
+
+    Rows are bucketed with the values at insert time; later edits to a
+    patient's state or admin only show up after a rebuild.
+    """
+    __tablename__ = 'daily_rollups'
+    day = db.Column(db.Date, primary_key=True)
+    metric = db.Column(db.String(20), primary_key=True)
+    state_name = db.Column(db.String(100), primary_key=True, default='')
+    facility = db.Column(db.String(150), primary_key=True, default='')
+    disease = db.Column(db.String(20), primary_key=True, default='')
+    from_level = db.Column(db.String(20), primary_key=True, default='')
+    risk_level = db.Column(db.String(20), primary_key=True, default='')
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+ROLLUP_KEY_COLUMNS = ('day', 'metric', 'state_name', 'facility', 'disease', 'from_level', 'risk_level')
+
+
+def rollup_key(day, metric, **dimensions):
+    """The DailyRollup primary key tuple. `day` may be a date or an ISO date string."""
+    if not isinstance(day, date):
+        day = date.fromisoformat(str(day))
+    return (day, metric) + tuple(dimensions.get(name) or '' for name in ROLLUP_KEY_COLUMNS[2:])
+
+
+def bump_rollups(connection, deltas):
+    """Adds each delta to the DailyRollup row of its rollup_key, creating missing rows."""
+    _increment(connection, DailyRollup.__table__, ROLLUP_KEY_COLUMNS, 'count', deltas)
+
+
+def bump_rollup(connection, day, metric, delta=1, **dimensions):
+    """Adds `delta` to one DailyRollup row. `day` may be a date or an ISO date string."""
+    bump_rollups(connection, {rollup_key(day, metric, **dimensions): delta})
+
+
+@event.listens_for(Patient, 'after_insert')
+def _count_patient_registration(mapper, connection, target):
+    # Bucket by the stored created_at so counters agree with a recount
+    patients, users = Patient.__table__, User.__table__
+    day, facility = connection.execute(
+        select(func.date(patients.c.created_at), users.c.facility_name)
+        .outerjoin(users, users.c.id == patients.c.created_by_admin_id)
+        .where(patients.c.id == target.id)
+    ).one()
+    bump_counters(connection, {TOTAL_PATIENTS_KEY: 1, registrations_key(day): 1})
+    bump_rollup(connection, day, ROLLUP_REGISTRATIONS, state_name=target.state_name, facility=facility)
+
 
 class LifestyleRecommendation(db.Model):
     """
     Personalized health guidance based on risk levels.
+
+    Rows with a profile_key and no patient form the recommendation library:
+    one ranked set per combination of the four risk levels, served by
+    app/recommendation_library.py.
     """
     __tablename__ = 'lifestyle_recommendations'
+    __table_args__ = (
+        # One row per rank of a library set; patient rows have no profile_key
+        db.Index('ix_lifestyle_recommendations_profile_key_priority', 'profile_key', 'priority', unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
-    patient_id = db.Column(db.Integer, db.ForeignKey('patients.id', ondelete='CASCADE'), nullable=False)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patients.id', ondelete='CASCADE'), nullable=True) # NULL for library rows
+    profile_key = db.Column(db.String(160), nullable=True) # e.g. 'diabetes=High,heart=Low,liver=Low,mental_health=Medium'
+    source = db.Column(db.String(20), nullable=True) # 'curated' or 'generated'
     disease_type = db.Column(db.String(50), nullable=False) # Diabetes/Liver/Heart/MentalHealth/General
     risk_level = db.Column(db.String(20), nullable=False) # Low/Medium/High
     category = db.Column(db.String(50), nullable=False) # Diet/Exercise/Sleep/Lifestyle
@@ -415,18 +640,27 @@ class LifestyleRecommendation(db.Model):
     # Relationship
     patient = db.relationship('Patient', backref='lifestyle_recommendations')
     
+    serializer_fields = (
+        ('recommendation_id', 'id'), 'patient_id', 'disease_type', 'risk_level', 'category',
+        'recommendation_text', 'priority', 'created_at', 'is_active',
+    )
+
     def to_dict(self):
-        return {
-            "recommendation_id": self.id,
-            "patient_id": self.patient_id,
-            "disease_type": self.disease_type,
-            "risk_level": self.risk_level,
-            "category": self.category,
-            "recommendation_text": self.recommendation_text,
-            "priority": self.priority,
-            "created_at": self.created_at.isoformat(),
-            "is_active": self.is_active
-        }
+        return encode(self)
+
+
+class RecommendationCacheEntry(db.Model):
+    """
+    Generated recommendations for one risk profile and prompt version,
+    shared by every worker (see app/recommendation_cache.py). Times are
+    unix seconds; a NULL expires_at never expires.
+    """
+    __tablename__ = 'recommendation_cache'
+    key = db.Column(db.String(160), primary_key=True)
+    payload = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.Float, nullable=False)
+    expires_at = db.Column(db.Float, nullable=True)
+
 
 class Consultation(db.Model):
     """
@@ -447,18 +681,13 @@ class Consultation(db.Model):
     patient = db.relationship('Patient', back_populates='consultations')
     booked_by_admin = db.relationship('User', back_populates='booked_consultations')
 
+    serializer_fields = (
+        'id', 'patient_id', 'admin_id', 'disease', 'consultation_type', 'consultation_datetime',
+        'notes', 'status', 'created_at',
+    )
+
     def to_dict(self):
-        return {
-            "id": self.id,
-            "patient_id": self.patient_id,
-            "admin_id": self.admin_id,
-            "disease": self.disease,
-            "consultation_type": self.consultation_type,
-            "consultation_datetime": self.consultation_datetime.isoformat(),
-            "notes": self.notes,
-            "status": self.status,
-            "created_at": self.created_at.isoformat()
-        }
+        return encode(self)
 
 # --- ADDED: ConsultationNote Table ---
 class ConsultationNote(db.Model):
@@ -466,6 +695,9 @@ class ConsultationNote(db.Model):
     Represents notes added by an Admin for a Patient ("Notes for Doctor").
     """
     __tablename__ = 'consultation_notes'
+    __table_args__ = (
+        db.Index('ix_consultation_notes_patient_id_created_at', 'patient_id', 'created_at'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     patient_id = db.Column(db.Integer, db.ForeignKey('patients.id', ondelete='CASCADE'), nullable=False)
     admin_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='SET NULL'), nullable=True)
@@ -475,14 +707,10 @@ class ConsultationNote(db.Model):
     patient = db.relationship('Patient', back_populates='consultation_notes')
     admin = db.relationship('User', back_populates='consultation_notes')
     
+    serializer_fields = (('note_id', 'id'), 'patient_id', 'admin_id', 'notes', 'created_at')
+
     def to_dict(self):
-        return {
-            "note_id": self.id,
-            "patient_id": self.patient_id,
-            "admin_id": self.admin_id,
-            "notes": self.notes,
-            "created_at": self.created_at.isoformat()
-        }
+        return encode(self)
 
 # --- Token Blocklist for JWT revocation ---
 class TokenBlocklist(db.Model):
@@ -0,0 +1,93 @@
+# HealthCare App/medml-backend/app/prediction_cache.py
+"""
+In-process LRU cache of risk scores, keyed by an assessment fingerprint.
+
+The fingerprint is a sha256 over the exact feature dicts handed to the four
+models (assessment ids and values plus the patient's age, gender and BMI)
+and the model version stamp, so any edited assessment, changed patient
+field or new model produces a different key. The whole cache is also
+dropped whenever the model registry reloads an artifact.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+def fingerprint(features_by_model: Dict[str, Dict[str, Any]], model_version: str) -> str:
+    payload = json.dumps(
+        {"model_version": model_version, "features": features_by_model},
+        sort_keys=True, default=str, separators=(',', ':'),
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class CachedPrediction:
+    __slots__ = ('scores', 'prediction_id')
+
+    def __init__(self, scores: Dict[str, float], prediction_id: Optional[int]):
+        self.scores = dict(scores)
+        self.prediction_id = prediction_id
+
+
+class PredictionCache:
+    """Bounded, thread-safe LRU map of fingerprint -> CachedPrediction."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self.enabled = max_entries > 0
+        self.reuse_rows = False
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[str, CachedPrediction]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def configure(self, app: Any, registry: Any = None):
+        self.max_entries = int(app.config.get('PREDICTION_CACHE_SIZE', 1024))
+        self.enabled = self.max_entries > 0
+        self.reuse_rows = bool(app.config.get('PREDICTION_CACHE_REUSE_ROWS', False))
+        self.clear()
+        if registry is not None:
+            registry.on_reload(self._on_models_reloaded)
+
+    def _on_models_reloaded(self, keys):
+        self.clear()
+
+    def get(self, key: str) -> Optional[CachedPrediction]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, scores: Dict[str, float], prediction_id: Optional[int] = None):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = CachedPrediction(scores, prediction_id)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+prediction_cache = PredictionCache()
@@ -0,0 +1,180 @@
+# HealthCare App/medml-backend/app/recommendation_cache.py
+"""
+Cache of generated lifestyle recommendations, keyed by risk profile.
+
+A generated set depends only on the four latest risk levels and the prompt
+that produced it. The key is therefore the normalized levels plus
+RECOMMENDATION_PROMPT_VERSION, which is bumped whenever the prompt changes.
+
+There are two tiers. Each process keeps a bounded LRU of recent profiles in
+front of the recommendation_cache table, which all workers share.
+- A set expires RECOMMENDATION_CACHE_TTL_HOURS after it was generated.
+- A worker re-reads the table at least every
+  RECOMMENDATION_CACHE_LOCAL_SECONDS. An admin invalidation therefore
+  reaches the other workers within that time.
+Failed generations are never cached.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from flask import current_app
+from sqlalchemy import delete, insert, select
+
+from app.extensions import db
+from app.models import RecommendationCacheEntry
+
+RISK_DISEASES = ('diabetes', 'liver', 'heart', 'mental_health')
+
+
+def normalize_profile(risk_map: Dict[str, Any]) -> Dict[str, Optional[str]]:
+    """
+    Maps a risk map to {disease: 'Low'|'Medium'|'High'|None}, accepting
+    'diabetes_risk_level'-style keys and any letter case.
+    """
+    profile = {disease: None for disease in RISK_DISEASES}
+    for disease, level in (risk_map or {}).items():
+        disease = disease.replace('_risk_level', '')
+        profile[disease] = str(level).strip().capitalize() if level else None
+    return profile
+
+
+def levels_key(risk_map: Dict[str, Any]) -> str:
+    """e.g. 'diabetes=High,heart=Low,liver=-,mental_health=Medium'"""
+    profile = normalize_profile(risk_map)
+    return ','.join(f"{disease}={profile[disease] or '-'}" for disease in sorted(profile))
+
+
+def profile_key(risk_map: Dict[str, Any], prompt_version: str) -> str:
+    """e.g. 'v1:diabetes=High,heart=Low,liver=-,mental_health=Medium'"""
+    return f"{prompt_version}:{levels_key(risk_map)}"
+
+
+class _LocalEntry:
+    __slots__ = ('value', 'fresh_until')
+
+    def __init__(self, value: Dict[str, Any], fresh_until: float):
+        self.value = value
+        self.fresh_until = fresh_until
+
+
+class RecommendationCache:
+    """Thread-safe LRU of profile key -> recommendations, backed by RecommendationCacheEntry."""
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 7 * 24 * 3600, local_seconds: float = 300):
+        self.max_entries = max_entries
+        self.enabled = max_entries > 0
+        self.ttl_seconds = ttl_seconds
+        self.local_seconds = local_seconds
+        self.hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[str, _LocalEntry]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def configure(self, app: Any):
+        self.max_entries = int(app.config.get('RECOMMENDATION_CACHE_SIZE', 256))
+        self.enabled = self.max_entries > 0
+        self.ttl_seconds = float(app.config.get('RECOMMENDATION_CACHE_TTL_HOURS', 168)) * 3600
+        self.local_seconds = float(app.config.get('RECOMMENDATION_CACHE_LOCAL_SECONDS', 300))
+        self.clear()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.fresh_until > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.value
+
+        row = db.session.execute(
+            select(RecommendationCacheEntry.payload, RecommendationCacheEntry.expires_at)
+            .where(RecommendationCacheEntry.key == key)
+        ).first()
+        if row is None or (row.expires_at is not None and row.expires_at <= now):
+            with self._lock:
+                self._entries.pop(key, None)
+                self.misses += 1
+            return None
+
+        value = json.loads(row.payload)
+        self._remember(key, value, now, row.expires_at)
+        with self._lock:
+            self.db_hits += 1
+        return value
+
+    def put(self, key: str, value: Dict[str, Any]):
+        if not self.enabled:
+            return
+        now = time.time()
+        expires_at = now + self.ttl_seconds if self.ttl_seconds > 0 else None
+        self._remember(key, value, now, expires_at)
+        table = RecommendationCacheEntry.__table__
+        try:
+            # Own connection and transaction, so the caller's session is left alone
+            with db.engine.begin() as connection:
+                connection.execute(delete(table).where(table.c.key == key))
+                connection.execute(insert(table).values(
+                    key=key, payload=json.dumps(value), created_at=now, expires_at=expires_at,
+                ))
+        except Exception as e:
+            # Still cached in this process; other workers will generate their own
+            current_app.logger.warning(f"Could not store recommendations for {key}: {e}")
+
+    def _remember(self, key: str, value: Dict[str, Any], now: float, expires_at: Optional[float]):
+        fresh_until = now + self.local_seconds
+        if expires_at is not None:
+            fresh_until = min(fresh_until, expires_at)
+        with self._lock:
+            self._entries[key] = _LocalEntry(value, fresh_until)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Optional[str] = None) -> int:
+        """
+        Drops one profile key, or every entry when `key` is None, from this
+        process and the shared table. Returns the number of table rows removed.
+        The caller commits.
+        """
+        query = delete(RecommendationCacheEntry)
+        if key is not None:
+            query = query.where(RecommendationCacheEntry.key == key)
+        removed = db.session.execute(query).rowcount
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+        return removed
+
+    def purge_expired(self) -> int:
+        """Deletes expired rows from the shared table. The caller commits."""
+        return db.session.execute(
+            delete(RecommendationCacheEntry).where(RecommendationCacheEntry.expires_at <= time.time())
+        ).rowcount
+
+    def clear(self):
+        """Empties this process's LRU only."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_hours": self.ttl_seconds / 3600,
+                "hits": self.hits,
+                "db_hits": self.db_hits,
+                "misses": self.misses,
+            }
+
+
+recommendation_cache = RecommendationCache()
@@ -0,0 +1,183 @@
+# HealthCare App/medml-backend/app/recommendation_client.py
+"""
+Guarded calls to the Gemini recommendation API.
+
+`RecommendationClient.call` runs a call on a small thread pool and waits
+at most GEMINI_TIMEOUT_SECONDS, so a slow upstream cannot hold a request
+thread. It raises RecommendationUnavailableError when:
+- the call times out or fails,
+- all GEMINI_MAX_CONCURRENCY slots are busy, or
+- the circuit is open.
+
+The circuit opens after GEMINI_BREAKER_FAILURES consecutive failures and
+rejects calls immediately for GEMINI_BREAKER_RESET_SECONDS. After that one
+trial call goes through: success closes the circuit and failure re-opens
+it. Callers fall back to the stored recommendation library (see
+services.get_gemini_recommendations).
+
+Counters and latencies are exposed through `metrics()` at
+GET /api/v1/recommendations/metrics.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Optional
+
+from flask import current_app
+
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half_open'
+
+
+class RecommendationUnavailableError(Exception):
+    """The call was rejected, timed out or failed; serve a fallback instead."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a single half-open trial call."""
+
+    def __init__(self, failure_threshold: int = 3, reset_seconds: float = 60, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self.state = STATE_CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == STATE_OPEN and self.clock() - self.opened_at >= self.reset_seconds:
+                self.state = STATE_HALF_OPEN
+            if self.state == STATE_CLOSED:
+                return True
+            if self.state == STATE_HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = STATE_CLOSED
+            self.consecutive_failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self._trial_running = False
+            if self.state == STATE_HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self.state = STATE_OPEN
+                self.opened_at = self.clock()
+
+
+class RecommendationClient:
+    """Deadline, concurrency limit and circuit breaker around Gemini calls."""
+
+    def __init__(self, timeout_seconds: float = 8, max_concurrency: int = 4,
+                 failure_threshold: int = 3, reset_seconds: float = 60):
+        self.timeout_seconds = timeout_seconds
+        self.max_concurrency = max_concurrency
+        self.breaker = CircuitBreaker(failure_threshold, reset_seconds)
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._reset_metrics()
+
+    def _reset_metrics(self):
+        self._counters = {name: 0 for name in (
+            'calls', 'successes', 'failures', 'timeouts', 'rejected_open', 'rejected_busy', 'fallbacks',
+        )}
+        self._latency_total_ms = 0.0
+        self._latency_max_ms = 0.0
+
+    def configure(self, app: Any):
+        self.timeout_seconds = float(app.config.get('GEMINI_TIMEOUT_SECONDS', 8))
+        self.max_concurrency = int(app.config.get('GEMINI_MAX_CONCURRENCY', 4))
+        self.breaker = CircuitBreaker(
+            int(app.config.get('GEMINI_BREAKER_FAILURES', 3)),
+            float(app.config.get('GEMINI_BREAKER_RESET_SECONDS', 60)),
+        )
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+            self._pool = None
+            self._slots = threading.BoundedSemaphore(self.max_concurrency)
+            self._reset_metrics()
+
+    def _count(self, name: str, latency_ms: Optional[float] = None):
+        with self._lock:
+            self._counters[name] += 1
+            if latency_ms is not None:
+                self._latency_total_ms += latency_ms
+                self._latency_max_ms = max(self._latency_max_ms, latency_ms)
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='gemini')
+            return self._pool
+
+    def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Runs fn(*args, **kwargs) in an app context on the client's pool and
+        returns its result, or raises RecommendationUnavailableError.
+        """
+        self._count('calls')
+        slots = self._slots
+        # A full pool is not an upstream failure, so it does not touch the breaker
+        if not slots.acquire(blocking=False):
+            self._count('rejected_busy')
+            raise RecommendationUnavailableError("too many concurrent calls")
+        if not self.breaker.allow():
+            slots.release()
+            self._count('rejected_open')
+            raise RecommendationUnavailableError("circuit open")
+
+        app = current_app._get_current_object()
+
+        def run():
+            try:
+                with app.app_context():
+                    return fn(*args, **kwargs)
+            finally:
+                slots.release()
+
+        start = time.perf_counter()
+        future = self._get_pool().submit(run)
+        try:
+            result = future.result(timeout=self.timeout_seconds)
+        except FutureTimeoutError:
+            # The thread finishes in the background and keeps its slot until then
+            self.breaker.record_failure()
+            self._count('timeouts', (time.perf_counter() - start) * 1e3)
+            raise RecommendationUnavailableError(f"no response within {self.timeout_seconds:g}s")
+        except Exception as e:
+            self.breaker.record_failure()
+            self._count('failures', (time.perf_counter() - start) * 1e3)
+            raise RecommendationUnavailableError(str(e)) from e
+        self.breaker.record_success()
+        self._count('successes', (time.perf_counter() - start) * 1e3)
+        return result
+
+    def record_fallback(self):
+        self._count('fallbacks')
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            completed = self._counters['successes'] + self._counters['failures'] + self._counters['timeouts']
+            return {
+                **self._counters,
+                "state": self.breaker.state,
+                "consecutive_failures": self.breaker.consecutive_failures,
+                "timeout_seconds": self.timeout_seconds,
+                "max_concurrency": self.max_concurrency,
+                "latency_avg_ms": round(self._latency_total_ms / completed, 2) if completed else None,
+                "latency_max_ms": round(self._latency_max_ms, 2),
+            }
+
+
+recommendation_client = RecommendationClient()
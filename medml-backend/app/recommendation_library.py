@@ -0,0 +1,233 @@
+# HealthCare App/medml-backend/app/recommendation_library.py
+"""
+Precomputed lifestyle recommendations for every risk profile.
+
+There are 81 combinations of Low/Medium/High across the four diseases, and
+each has a ranked set of LifestyleRecommendation rows (no patient,
+profile_key set). `lookup` serves a patient's latest risk profile with one
+indexed query and never writes. A profile that has not been built yet gets
+the curated set from db_seeder.STATIC_RECOMMENDATIONS, composed in memory,
+so a request never waits on Gemini.
+
+`build` fills the library: create_admin.py seeds the curated sets,
+`flask warm-recommendations` runs it on demand, and can call Gemini for
+each profile with `--generate`. With
+RECOMMENDATION_LIBRARY_REFRESH on, a served set that is curated-only or
+older than RECOMMENDATION_LIBRARY_MAX_AGE_DAYS is regenerated on a
+background thread. The request keeps the stored set.
+"""
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+from flask import current_app
+from sqlalchemy import delete, select
+
+from app.db_seeder import GENERAL_RECOMMENDATIONS, STATIC_RECOMMENDATIONS
+from app.extensions import db
+from app.models import LifestyleRecommendation
+from app.recommendation_cache import RISK_DISEASES, levels_key, normalize_profile
+
+RISK_LEVELS = ('Low', 'Medium', 'High')
+# Most urgent first
+LEVEL_RANK = {'High': 0, 'Medium': 1, 'Low': 2}
+# Same labels as the patient dashboard's disease tabs
+DISEASE_LABELS = {
+    'diabetes': 'Diabetes',
+    'liver': 'Liver Disease',
+    'heart': 'Heart Disease',
+    'mental_health': 'Mental Health',
+}
+CATEGORIES = ('diet', 'exercise', 'sleep', 'lifestyle')
+
+SOURCE_CURATED = 'curated'
+SOURCE_GENERATED = 'generated'
+
+
+def all_profiles() -> Iterator[Dict[str, str]]:
+    for levels in itertools.product(RISK_LEVELS, repeat=len(RISK_DISEASES)):
+        yield dict(zip(RISK_DISEASES, levels))
+
+
+def curated_recommendations(profile: Dict[str, Optional[str]]) -> List[Dict[str, Any]]:
+    """The curated items for a profile, most urgent disease first."""
+    ranked = sorted(
+        ((disease, level) for disease, level in profile.items() if level),
+        key=lambda item: (LEVEL_RANK.get(item[1], len(LEVEL_RANK)), RISK_DISEASES.index(item[0])),
+    )
+    items = [
+        {"disease_type": DISEASE_LABELS[disease], "risk_level": level, "category": category, "recommendation_text": text}
+        for disease, level in ranked
+        for category, text in STATIC_RECOMMENDATIONS.get((disease, level), ())
+    ]
+    if not any(level in ('Medium', 'High') for level in profile.values()):
+        items += [
+            {"disease_type": "General", "risk_level": "Low", "category": category, "recommendation_text": text}
+            for category, text in GENERAL_RECOMMENDATIONS
+        ]
+    return items
+
+
+def generated_recommendations(api_key: str, profile: Dict[str, Optional[str]], guarded: bool = False) -> List[Dict[str, Any]]:
+    """
+    Gemini's items for a profile, most urgent first. Raises if the call fails.
+    `guarded` goes through the recommendation client's deadline and circuit breaker.
+    """
+    from app.services import generate_gemini_recommendations
+    from app.recommendation_client import recommendation_client
+
+    if guarded:
+        grouped = recommendation_client.call(
+            generate_gemini_recommendations, api_key, profile, timeout=recommendation_client.timeout_seconds,
+        )
+    else:
+        grouped = generate_gemini_recommendations(api_key, profile)
+    items = [item for category in CATEGORIES for item in grouped.get(category, [])]
+    return sorted(items, key=lambda item: LEVEL_RANK.get(item.get('risk_level'), len(LEVEL_RANK)))
+
+
+def _rows(profile: Dict[str, Optional[str]], items: List[Dict[str, Any]], source: str) -> List[LifestyleRecommendation]:
+    key = levels_key(profile)
+    return [
+        LifestyleRecommendation(
+            profile_key=key,
+            source=source,
+            disease_type=str(item.get('disease_type') or 'General'),
+            risk_level=str(item.get('risk_level') or 'Low'),
+            category=str(item.get('category') or 'Lifestyle'),
+            recommendation_text=str(item['recommendation_text']),
+            priority=priority,
+            is_active=True,
+        )
+        for priority, item in enumerate(items, start=1)
+        if item.get('recommendation_text')
+    ]
+
+
+def store(profile: Dict[str, Optional[str]], items: List[Dict[str, Any]], source: str) -> List[LifestyleRecommendation]:
+    """Replaces a profile's library rows with `items`, ranked in order. The caller commits."""
+    db.session.execute(
+        delete(LifestyleRecommendation)
+        .where(LifestyleRecommendation.profile_key == levels_key(profile), LifestyleRecommendation.patient_id.is_(None))
+    )
+    rows = _rows(profile, items, source)
+    db.session.add_all(rows)
+    return rows
+
+
+def build(generate: bool = False, only_missing: bool = False) -> Dict[str, int]:
+    """
+    Stores a set for every risk profile: Gemini's with `generate` (curated if
+    that call fails), otherwise the curated one. `only_missing` skips profiles
+    that already have rows.
+    """
+    api_key = current_app.config.get('GEMINI_API_KEY') if generate else None
+    if generate and not api_key:
+        raise RuntimeError("GEMINI_API_KEY is not set; cannot generate recommendations.")
+
+    existing = set()
+    if only_missing:
+        existing = set(db.session.scalars(
+            select(LifestyleRecommendation.profile_key)
+            .where(LifestyleRecommendation.profile_key.is_not(None), LifestyleRecommendation.patient_id.is_(None))
+            .distinct()
+        ))
+
+    summary = {SOURCE_CURATED: 0, SOURCE_GENERATED: 0, "skipped": 0, "failed": 0}
+    for profile in all_profiles():
+        if levels_key(profile) in existing:
+            summary["skipped"] += 1
+            continue
+        items, source = curated_recommendations(profile), SOURCE_CURATED
+        if generate:
+            try:
+                items, source = generated_recommendations(api_key, profile), SOURCE_GENERATED
+            except Exception as e:
+                current_app.logger.warning(f"Gemini failed for {levels_key(profile)}; storing curated set: {e}")
+                summary["failed"] += 1
+        store(profile, items, source)
+        summary[source] += 1
+        # Commit per profile when generating, so an interrupted run keeps its progress
+        if generate:
+            db.session.commit()
+    db.session.commit()
+    return summary
+
+
+def group_by_category(rows: List[LifestyleRecommendation]) -> Dict[str, List[Dict[str, Any]]]:
+    grouped = {category: [] for category in CATEGORIES}
+    for row in rows:
+        category = row.category.lower()
+        grouped[category if category in grouped else 'lifestyle'].append(row.to_dict())
+    return grouped
+
+
+def lookup(risk_map: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+    """The library set for a risk profile, grouped by category in priority order."""
+    profile = normalize_profile(risk_map)
+    rows = list(db.session.scalars(
+        select(LifestyleRecommendation)
+        .where(LifestyleRecommendation.profile_key == levels_key(profile),
+               LifestyleRecommendation.patient_id.is_(None),
+               LifestyleRecommendation.is_active.is_(True))
+        .order_by(LifestyleRecommendation.priority, LifestyleRecommendation.id)
+    ))
+    if not rows:
+        # Not stored yet: serve the curated set without writing from the request
+        rows = _rows(profile, curated_recommendations(profile), SOURCE_CURATED)
+    if _needs_refresh(rows):
+        schedule_refresh(profile)
+    return group_by_category(rows)
+
+
+# --- Background refresh ---
+
+_refresh_pool: Optional[ThreadPoolExecutor] = None
+_refresh_pending = set()
+_refresh_lock = threading.Lock()
+
+
+def _needs_refresh(rows: List[LifestyleRecommendation]) -> bool:
+    config = current_app.config
+    if not config.get('RECOMMENDATION_LIBRARY_REFRESH') or not config.get('GEMINI_API_KEY'):
+        return False
+    if any(row.source != SOURCE_GENERATED for row in rows):
+        return True
+    created_at = min((row.created_at for row in rows if row.created_at), default=None)
+    if created_at is None:
+        return False
+    now = datetime.now(timezone.utc) if created_at.tzinfo else datetime.utcnow()
+    return now - created_at > timedelta(days=config.get('RECOMMENDATION_LIBRARY_MAX_AGE_DAYS', 30))
+
+
+def schedule_refresh(profile: Dict[str, Optional[str]]) -> bool:
+    """Queues one Gemini regeneration of a profile's set; False if one is already queued."""
+    global _refresh_pool
+    key = levels_key(profile)
+    app = current_app._get_current_object()
+    with _refresh_lock:
+        if key in _refresh_pending:
+            return False
+        _refresh_pending.add(key)
+        if _refresh_pool is None:
+            _refresh_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='recommendation-refresh')
+    _refresh_pool.submit(_refresh, app, dict(profile), key)
+    return True
+
+
+def _refresh(app, profile: Dict[str, Optional[str]], key: str):
+    try:
+        with app.app_context():
+            try:
+                items = generated_recommendations(app.config['GEMINI_API_KEY'], profile, guarded=True)
+                store(profile, items, SOURCE_GENERATED)
+                db.session.commit()
+                app.logger.info(f"Refreshed recommendation library set {key}")
+            except Exception as e:
+                db.session.rollback()
+                app.logger.warning(f"Background recommendation refresh failed for {key}: {e}")
+    finally:
+        with _refresh_lock:
+            _refresh_pending.discard(key)
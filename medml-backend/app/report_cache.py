@@ -0,0 +1,178 @@
+# HealthCare App/medml-backend/app/report_cache.py
+"""
+Disk cache of rendered report PDFs.
+
+A report is a pure function of the patient row, the latest RiskPrediction,
+the selected sections and the recommendations. `report_key` therefore
+hashes:
+- the patient id and a digest of the patient fields the report shows,
+- the latest prediction id,
+- the sorted sections,
+- a digest of the recommendations, and
+- LAYOUT_VERSION from app/report_rendering.py.
+
+A repeat download is read from REPORT_CACHE_DIR with no rendering. The key
+doubles as the response's ETag, so a client that already has the file gets
+a 304.
+
+The cache is bounded to REPORT_CACHE_MAX_MB. A hit refreshes the file's
+mtime, and eviction removes the files with the oldest mtimes first. Several
+processes may share the directory: each keeps an estimate of the total size
+and rescans the directory before it evicts.
+"""
+import hashlib
+import json
+import os
+import threading
+from typing import Any, BinaryIO, Dict, Optional
+
+from app.report_rendering import LAYOUT_VERSION
+
+SUFFIX = '.pdf'
+
+
+def _digest(value: Any) -> str:
+    encoded = json.dumps(value, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def report_key(context: Dict[str, Any]) -> str:
+    # The rendered fields rather than updated_at, which has one-second resolution
+    payload = json.dumps({
+        "layout": LAYOUT_VERSION,
+        "patient": [context["patient_id"], _digest([context["abha_id"], context["overview"]])],
+        "prediction": context["prediction_id"],
+        "sections": sorted(context["sections"]),
+        "recommendations": _digest(context["recommendations"]),
+    }, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class RenderedReportCache:
+    """Size-bounded directory of report_key -> PDF bytes."""
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = 256 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.enabled = bool(directory) and max_bytes > 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._bytes: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def configure(self, app: Any):
+        self.directory = app.config.get('REPORT_CACHE_DIR')
+        self.max_bytes = int(float(app.config.get('REPORT_CACHE_MAX_MB', 256)) * 1024 * 1024)
+        self.enabled = bool(self.directory) and self.max_bytes > 0
+        with self._lock:
+            self.hits = self.misses = self.evictions = 0
+            self._bytes = None
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def get(self, key: str) -> Optional[BinaryIO]:
+        """
+        An open file with the cached PDF, or None. The open handle stays
+        readable even if another process evicts the file meanwhile.
+        """
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            f = open(path, 'rb')
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return f
+
+    def read(self, key: str) -> Optional[bytes]:
+        f = self.get(key)
+        if f is None:
+            return None
+        with f:
+            return f.read()
+
+    def put(self, key: str, pdf: bytes):
+        if not self.enabled or len(pdf) > self.max_bytes:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(pdf)
+        os.replace(tmp, path)
+        with self._lock:
+            if self._bytes is None:
+                self._bytes = self._scan()[0]
+            else:
+                self._bytes += len(pdf)
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def _scan(self):
+        """(total bytes, [(mtime, size, path)]) of the cached files."""
+        entries = []
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.name.endswith(SUFFIX):
+                        try:
+                            stat = entry.stat()
+                        except OSError:
+                            continue
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError:
+            pass
+        return sum(size for _, size, _ in entries), entries
+
+    def _evict(self):
+        # Down to 90% of the budget, so eviction does not run on every put
+        total, entries = self._scan()
+        target = self.max_bytes * 0.9
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                self.evictions += 1
+            except OSError:
+                pass
+            total -= size
+        self._bytes = total
+
+    def clear(self) -> int:
+        removed = 0
+        with self._lock:
+            for _, _, path in self._scan()[1] if self.directory else []:
+                try:
+                    os.remove(path)
+                    removed += 1
+                except OSError:
+                    pass
+            self._bytes = 0
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total, entries = self._scan() if self.enabled else (0, [])
+            return {
+                "enabled": self.enabled,
+                "entries": len(entries),
+                "bytes": total,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+report_cache = RenderedReportCache()
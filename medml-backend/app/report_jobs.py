@@ -0,0 +1,355 @@
+# HealthCare App/medml-backend/app/report_jobs.py
+"""
+Background PDF report jobs.
+
+POST /patients/<id>/report and POST /reports/batch queue a job and return
+its id at once, so no request thread waits on recommendations or PDF layout.
+Each web process runs REPORT_JOB_THREADS job threads. A job:
+- loads its patients with PatientRepository.load_full,
+- fetches recommendations once per distinct risk profile,
+- takes PDFs already rendered for the same inputs from the report cache
+  (app/report_cache.py) and renders the rest on REPORT_WORKERS processes,
+  and
+- writes the PDF, or a zip of PDFs for a batch, to REPORT_DIR.
+
+The render processes are started with `spawn` on first use, as the
+inference pool's are. With REPORT_WORKERS=0 the job thread renders itself.
+
+A job's status is kept in `<job_id>.json` next to its result, so any web
+worker on the host can answer GET /reports/<job_id>. Files older than
+REPORT_RETENTION_HOURS are deleted when new jobs are queued.
+"""
+import atexit
+import json
+import multiprocessing
+import os
+import re
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.report_cache import report_cache, report_key
+from app.report_rendering import render_pdf, report_context, report_filename, risk_map
+
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+KIND_SINGLE = 'single'
+KIND_BATCH = 'batch'
+
+_JOB_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+class ReportJobError(RuntimeError):
+    """Base class for failures of the report queue itself."""
+
+
+class ReportBusyError(ReportJobError):
+    """Too many report jobs are already queued or running."""
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class ReportStore:
+    """Job status files and finished reports in one directory."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, job_id: str, suffix: str) -> str:
+        return os.path.join(self.directory, f"{job_id}{suffix}")
+
+    def create(self, kind: str, patient_ids: List[int], sections: List[str], owner: Dict[str, Any]) -> Dict[str, Any]:
+        os.makedirs(self.directory, exist_ok=True)
+        job = {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "status": STATUS_QUEUED,
+            "patient_ids": patient_ids,
+            "sections": sections,
+            "owner": owner,
+            "created_at": _now(),
+            "updated_at": _now(),
+            "filename": None,
+            "size": None,
+            "etag": None,
+            "cached": 0,
+            "missing": [],
+            "failed": [],
+            "error": None,
+        }
+        self.save(job)
+        return job
+
+    def save(self, job: Dict[str, Any]):
+        job["updated_at"] = _now()
+        path = self._path(job["id"], '.json')
+        # Written whole and renamed, so readers never see a partial file
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(job, f)
+        os.replace(path + '.tmp', path)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        if not _JOB_ID.match(job_id or ''):
+            return None
+        try:
+            with open(self._path(job_id, '.json'), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def result_path(self, job: Dict[str, Any]) -> str:
+        return self._path(job["id"], '.zip' if job["kind"] == KIND_BATCH else '.pdf')
+
+    def purge(self, max_age_seconds: float) -> int:
+        """Deletes status and result files older than `max_age_seconds`."""
+        cutoff = time.time() - max_age_seconds
+        removed = 0
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return 0
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                pass
+        return removed
+
+
+def public(job: Dict[str, Any]) -> Dict[str, Any]:
+    """A job as returned by the API (without its owner)."""
+    data = {key: value for key, value in job.items() if key != "owner"}
+    data["patient_count"] = len(job["patient_ids"])
+    if job["status"] == STATUS_DONE:
+        data["download_url"] = f"/api/v1/reports/{job['id']}"
+    return data
+
+
+class ReportService:
+    """Job threads plus render processes for one web worker process."""
+
+    def __init__(self, directory: str, workers: int = 2, job_threads: int = 2, max_pending: int = 32,
+                 retention_hours: float = 24, logger: Any = None):
+        self.store = ReportStore(directory)
+        self.workers = max(0, int(workers))
+        self.job_threads = max(1, int(job_threads))
+        self.max_pending = max(1, int(max_pending))
+        self.retention_seconds = float(retention_hours) * 3600
+        self.logger = logger
+        self._jobs: Optional[ThreadPoolExecutor] = None
+        self._renderers: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[threading.BoundedSemaphore] = None
+        self._pid = None
+        self._last_purge = 0.0
+        self._lock = threading.Lock()
+
+    # --- Lifecycle ---
+
+    def _ensure_started(self):
+        # Re-create everything after a fork: threads and pools do not survive it
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._jobs = ThreadPoolExecutor(max_workers=self.job_threads, thread_name_prefix='report-job')
+            self._renderers = None
+            self._slots = threading.BoundedSemaphore(self.max_pending)
+            self._pid = os.getpid()
+            atexit.register(self.shutdown)
+
+    def _get_renderers(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._renderers is None:
+                self._renderers = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+                if self.logger:
+                    self.logger.info(f"Started report rendering pool with {self.workers} worker process(es)")
+            return self._renderers
+
+    def shutdown(self):
+        if self._pid != os.getpid():
+            return
+        self._jobs.shutdown(wait=False, cancel_futures=True)
+        if self._renderers is not None:
+            self._renderers.shutdown(wait=False, cancel_futures=True)
+        self._pid = None
+
+    # --- Client API ---
+
+    def submit(self, app: Any, kind: str, patient_ids: List[int], sections: List[str],
+               owner: Dict[str, Any]) -> Dict[str, Any]:
+        """Queues a job and returns it. Raises ReportBusyError when the queue is full."""
+        self._ensure_started()
+        if not self._slots.acquire(blocking=False):
+            raise ReportBusyError("Report service is busy. Please retry shortly.")
+        try:
+            self._purge_expired()
+            job = self.store.create(kind, patient_ids, sections, owner)
+            future = self._jobs.submit(self._run, app, job)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return job
+
+    def _purge_expired(self):
+        now = time.time()
+        if now - self._last_purge < 600:
+            return
+        self._last_purge = now
+        removed = self.store.purge(self.retention_seconds)
+        if removed and self.logger:
+            self.logger.info(f"Removed {removed} expired report file(s)")
+
+    # --- Job thread ---
+
+    def _run(self, app: Any, job: Dict[str, Any]):
+        with app.app_context():
+            try:
+                job["status"] = STATUS_RUNNING
+                self.store.save(job)
+                contexts = self._load(job)
+                if job["kind"] == KIND_BATCH:
+                    self._write_zip(job, contexts)
+                else:
+                    self._write_pdf(job, contexts)
+            except Exception as e:
+                app.logger.error(f"Report job {job['id']} failed: {e}")
+                job["status"] = STATUS_FAILED
+                job["error"] = str(e)
+            self.store.save(job)
+
+    def _load(self, job: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Reads the job's patients and their recommendations into render contexts."""
+        from app.repository import PatientRepository
+        from app.services import get_gemini_recommendations
+
+        records = PatientRepository().load_full(job["patient_ids"], sections=[])
+        job["missing"] = [pid for pid in job["patient_ids"] if pid not in records]
+
+        recommendations: Dict[Tuple, Dict[str, list]] = {}
+        contexts = []
+        for record in records.values():
+            patient = record.patient
+            context = report_context(patient, job["sections"], None)
+            levels = risk_map(context["prediction"])
+            if levels is not None:
+                profile = tuple(sorted(levels.items()))
+                if profile not in recommendations:
+                    recommendations[profile] = get_gemini_recommendations(levels)
+                context["recommendations"] = recommendations[profile]
+            contexts.append(context)
+        return contexts
+
+    def _render(self, job: Dict[str, Any], contexts: List[Dict[str, Any]]) -> Iterator[Tuple[Dict[str, Any], Optional[bytes], Optional[Exception]]]:
+        """
+        Yields (context, pdf bytes, error) per context: cached PDFs first,
+        then freshly rendered ones in completion order, which are cached.
+        """
+        fresh = []
+        for context in contexts:
+            context["cache_key"] = report_key(context)
+            pdf = report_cache.read(context["cache_key"])
+            if pdf is None:
+                fresh.append(context)
+            else:
+                job["cached"] += 1
+                yield context, pdf, None
+
+        for context, pdf, error in self._render_fresh(fresh):
+            if error is None:
+                report_cache.put(context["cache_key"], pdf)
+            yield context, pdf, error
+
+    def _render_fresh(self, contexts: List[Dict[str, Any]]) -> Iterator[Tuple[Dict[str, Any], Optional[bytes], Optional[Exception]]]:
+        """Yields (context, pdf bytes, error) per context, in completion order."""
+        if not contexts:
+            return
+        if self.workers == 0:
+            for context in contexts:
+                try:
+                    yield context, render_pdf(context), None
+                except Exception as e:
+                    yield context, None, e
+            return
+
+        renderers = self._get_renderers()
+        futures = {renderers.submit(render_pdf, context): context for context in contexts}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except BrokenProcessPool as e:
+                if self.logger:
+                    self.logger.error(f"Report worker died, restarting pool: {e}")
+                with self._lock:
+                    if self._renderers is renderers:
+                        self._renderers = None
+                yield futures[future], None, e
+            except Exception as e:
+                yield futures[future], None, e
+
+    def _write_pdf(self, job: Dict[str, Any], contexts: List[Dict[str, Any]]):
+        if not contexts:
+            raise ReportJobError("Patient not found")
+        for context, pdf, error in self._render(job, contexts):
+            if error is not None:
+                raise error
+            path = self.store.result_path(job)
+            with open(path + '.tmp', 'wb') as f:
+                f.write(pdf)
+            os.replace(path + '.tmp', path)
+            job["filename"] = report_filename(context)
+            job["size"] = len(pdf)
+            job["etag"] = context["cache_key"]
+        job["status"] = STATUS_DONE
+
+    def _write_zip(self, job: Dict[str, Any], contexts: List[Dict[str, Any]]):
+        path = self.store.result_path(job)
+        written = 0
+        # PDFs are already compressed; storing them keeps the zip step cheap
+        with zipfile.ZipFile(path + '.tmp', 'w', compression=zipfile.ZIP_STORED) as archive:
+            for context, pdf, error in self._render(job, contexts):
+                if error is not None:
+                    job["failed"].append({"patient_id": context["patient_id"], "error": str(error)})
+                    continue
+                archive.writestr(report_filename(context), pdf)
+                written += 1
+        if not written:
+            os.remove(path + '.tmp')
+            raise ReportJobError("No reports could be rendered")
+        os.replace(path + '.tmp', path)
+        job["filename"] = f"Health_Reports_{job['id'][:8]}.zip"
+        job["size"] = os.path.getsize(path)
+        job["status"] = STATUS_DONE
+
+
+service: Optional[ReportService] = None
+
+
+def init_app(app: Any):
+    """Creates the (not yet started) report service."""
+    global service
+    service = ReportService(
+        app.config.get('REPORT_DIR'),
+        workers=app.config.get('REPORT_WORKERS', 2),
+        job_threads=app.config.get('REPORT_JOB_THREADS', 2),
+        max_pending=app.config.get('REPORT_MAX_PENDING', 32),
+        retention_hours=app.config.get('REPORT_RETENTION_HOURS', 24),
+        logger=app.logger,
+    )
@@ -0,0 +1,247 @@
+# HealthCare App/medml-backend/app/report_rendering.py
+"""
+PDF layout for patient reports.
+
+`report_context` turns a patient, their latest prediction and the
+recommendations into plain data; `render_pdf` lays that out with FPDF and
+returns the document bytes. Rendering needs neither an app nor a database,
+so the report workers (app/report_jobs.py) run it in separate processes.
+"""
+from typing import Any, Dict, List, Optional
+
+from fpdf import FPDF
+
+# Bump when the layout changes, so cached PDFs (app/report_cache.py) are re-rendered
+LAYOUT_VERSION = 2
+
+# Sections a report may contain, in the order they are laid out
+REPORT_SECTIONS = ("Overview", "Diabetes", "Liver", "Heart", "Mental Health")
+
+# (section, title, RiskPrediction column prefix)
+DISEASE_SECTIONS = [
+    ("Diabetes", "Diabetes", "diabetes"),
+    ("Liver", "Liver Disease", "liver"),
+    ("Heart", "Heart Disease", "heart"),
+    ("Mental Health", "Mental Health", "mental_health"),
+]
+
+
+class PDF(FPDF):
+    def __init__(self):
+        super().__init__()
+        self.set_auto_page_break(auto=True, margin=20)
+        self.set_margins(15, 15, 15)  # Left, Top, Right margins
+
+    def header(self):
+        # Header with logo and title
+        self.set_font('Arial', 'B', 16)
+        self.set_text_color(37, 99, 235)  # Blue color
+        self.cell(0, 12, 'HealthCare System', 0, 1, 'C')
+
+        self.set_font('Arial', 'B', 14)
+        self.set_text_color(0, 0, 0)  # Black
+        self.cell(0, 8, 'Patient Health Report', 0, 1, 'C')
+
+        # Add a line separator
+        self.set_draw_color(37, 99, 235)
+        self.line(10, self.get_y(), self.w - 10, self.get_y())
+        self.ln(5)
+
+    def footer(self):
+        self.set_y(-15)
+        self.set_font('Arial', 'I', 8)
+        self.set_text_color(100, 100, 100)
+        # No render time here: the same inputs must give the same (cacheable) PDF
+        self.cell(0, 10, f'Page {self.page_no()}', 0, 0, 'C')
+
+    def chapter_title(self, title):
+        self.set_font('Arial', 'B', 12)
+        self.set_text_color(37, 99, 235)  # Blue color
+        self.cell(0, 10, title, 0, 1, 'L')
+        self.ln(2)
+
+    def chapter_body(self, data):
+        self.set_font('Arial', '', 10)
+        for key, val in data.items():
+            # Ensure text fits within page width
+            text = f"{key}: {val}"
+            self.multi_cell(0, 5, text, 0, 'L', False)
+        self.ln()
+
+    def risk_table(self, risk_data):
+        """Create a risk assessment table that ensures it stays on a single page."""
+        # Calculate required space for the table
+        table_height = 10 + (5 * 10) + 5  # Header + 5 rows + spacing
+
+        # Check if we need a new page to fit the table
+        if self.get_y() + table_height > self.h - 20:  # Leave margin for footer
+            self.add_page()
+
+        # Table title
+        self.set_font('Arial', 'B', 12)
+        self.cell(0, 8, 'Disease Risk Assessment Scores', 0, 1, 'C')
+        self.ln(3)
+
+        # Table header
+        self.set_font('Arial', 'B', 10)
+        col_width = self.w / 4.5
+        self.cell(col_width, 10, 'Disease', 1, 0, 'C')
+        self.cell(col_width, 10, 'Risk Level', 1, 0, 'C')
+        self.cell(col_width, 10, 'Score (0-1)', 1, 0, 'C')
+        self.ln()
+
+        # Table data
+        self.set_font('Arial', '', 10)
+        if risk_data:
+            data = [
+                (title, risk_data.get(f'{prefix}_risk_level'), risk_data.get(f'{prefix}_risk_score'))
+                for _, title, prefix in DISEASE_SECTIONS
+            ]
+            for row in data:
+                # Format risk level with color coding
+                risk_level = str(row[1] or 'N/A')
+                if risk_level == 'High':
+                    self.set_text_color(220, 20, 60)  # Red
+                elif risk_level == 'Medium':
+                    self.set_text_color(255, 140, 0)  # Orange
+                elif risk_level == 'Low':
+                    self.set_text_color(34, 139, 34)  # Green
+                else:
+                    self.set_text_color(0, 0, 0)  # Black
+
+                self.cell(col_width, 10, str(row[0] or 'N/A'), 1, 0, 'C')
+                self.cell(col_width, 10, risk_level, 1, 0, 'C')
+                self.cell(col_width, 10, str(round(row[2], 3) if row[2] is not None else 'N/A'), 1, 0, 'C')
+                self.ln()
+
+                # Reset text color
+                self.set_text_color(0, 0, 0)
+        else:
+            self.cell(col_width * 3, 10, 'No prediction data available.', 1, 0, 'C')
+            self.ln()
+
+        self.ln(8)  # Extra spacing after table
+
+    def add_recommendations(self, rec_data):
+        """Add lifestyle recommendations with improved formatting."""
+        self.set_font('Arial', 'B', 12)
+        self.set_text_color(37, 99, 235)  # Blue color
+        self.cell(0, 8, 'Lifestyle Recommendations', 0, 1, 'L')
+        self.ln(3)
+
+        self.set_font('Arial', '', 10)
+        self.set_text_color(0, 0, 0)  # Reset to black
+
+        if not rec_data or all(not v for v in rec_data.values()):
+            self.multi_cell(0, 5, "No specific recommendations available at this time.")
+            return
+
+        for category in ['Diet', 'Exercise', 'Sleep', 'Lifestyle']:
+            recs = rec_data.get(category.lower(), [])
+            if recs:
+                # Category header without emoji icons (to avoid Unicode issues)
+                self.set_font('Arial', 'B', 11)
+                self.set_text_color(37, 99, 235)  # Blue color
+                self.cell(0, 8, f"{category}", 0, 1, 'L')
+
+                self.set_font('Arial', '', 10)
+                self.set_text_color(0, 0, 0)  # Reset to black
+
+                for rec in recs:
+                    disease = rec.get('disease_type', 'General')
+                    text = rec.get('recommendation_text', 'No text.')
+                    risk_level = rec.get('risk_level', 'Medium')
+
+                    # Color code based on risk level
+                    if risk_level == 'High':
+                        self.set_text_color(220, 20, 60)  # Red
+                    elif risk_level == 'Medium':
+                        self.set_text_color(255, 140, 0)  # Orange
+                    else:
+                        self.set_text_color(0, 0, 0)  # Black
+
+                    # Ensure text fits within page width and handle long text
+                    recommendation_text = f"- ({disease}) {text}"
+                    self.multi_cell(0, 5, recommendation_text, 0, 'L', False)
+                    self.set_text_color(0, 0, 0)  # Reset to black
+
+                self.ln(3)
+
+
+def risk_map(prediction: Optional[Dict[str, Any]]) -> Optional[Dict[str, Optional[str]]]:
+    """Risk levels by disease, as get_gemini_recommendations expects them."""
+    if not prediction:
+        return None
+    return {prefix: prediction.get(f'{prefix}_risk_level') for _, _, prefix in DISEASE_SECTIONS}
+
+
+def prediction_data(risk_prediction: Any) -> Optional[Dict[str, Any]]:
+    """The levels and scores of a RiskPrediction, as plain data."""
+    if risk_prediction is None:
+        return None
+    data = {}
+    for _, _, prefix in DISEASE_SECTIONS:
+        data[f'{prefix}_risk_level'] = getattr(risk_prediction, f'{prefix}_risk_level')
+        data[f'{prefix}_risk_score'] = getattr(risk_prediction, f'{prefix}_risk_score')
+    return data
+
+
+def report_context(patient: Any, sections: List[str], recommendations: Optional[Dict[str, list]]) -> Dict[str, Any]:
+    """Everything `render_pdf` needs for one patient, as picklable plain data."""
+    latest = patient.latest_prediction
+    return {
+        "patient_id": patient.id,
+        "prediction_id": patient.latest_prediction_id,
+        "abha_id": patient.abha_id,
+        "sections": list(sections),
+        "overview": {
+            "Name": patient.name,
+            "Age": patient.age,
+            "Gender": patient.gender,
+            "Height": f"{patient.height} cm",
+            "Weight": f"{patient.weight} kg",
+            "BMI": patient.bmi,
+            "State": patient.state_name,
+            "Assessed": latest.predicted_at.strftime('%Y-%m-%d %H:%M') if latest and latest.predicted_at else 'N/A',
+        },
+        "prediction": prediction_data(latest),
+        "recommendations": recommendations or {"diet": [], "exercise": [], "sleep": [], "lifestyle": []},
+    }
+
+
+def report_filename(context: Dict[str, Any]) -> str:
+    return f"Health_Report_{context['abha_id']}.pdf"
+
+
+def render_pdf(context: Dict[str, Any]) -> bytes:
+    """Lays out one report and returns the PDF bytes."""
+    sections = context["sections"]
+    prediction = context["prediction"]
+
+    pdf = PDF()
+    pdf.add_page()
+
+    # Section: Overview
+    if "Overview" in sections:
+        pdf.chapter_title("Patient Information")
+        pdf.chapter_body(context["overview"])
+
+        # Risk table for overview
+        pdf.risk_table(prediction)
+
+    # Optional disease-specific sections
+    for sec_key, sec_title, prefix in DISEASE_SECTIONS:
+        if sec_key in sections:
+            pdf.chapter_title(f"{sec_title} Details")
+            if prediction:
+                score = prediction.get(f'{prefix}_risk_score')
+                pdf.chapter_body({
+                    "Risk Level": prediction.get(f'{prefix}_risk_level') or 'N/A',
+                    "Risk Score": round(score, 3) if score is not None else 'N/A'
+                })
+            else:
+                pdf.chapter_body({"Info": "No prediction data available."})
+
+    pdf.add_recommendations(context["recommendations"])
+
+    return pdf.output(dest='S').encode('latin-1')
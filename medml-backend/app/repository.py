@@ -0,0 +1,98 @@
+# HealthCare App/medml-backend/app/repository.py
+"""
+Batch loading of patients together with their histories.
+
+The Patient collections are `lazy='dynamic'`, so reading them issues one
+query per collection per patient and they cannot be eager-loaded.
+`PatientRepository.load_full` reads a whole set of patients with one query
+per table for each batch of IN_BATCH_SIZE ids. It then groups the rows in
+memory. Detail views, reports and exports therefore make the same number of
+round-trips however many patients they cover and however long the histories
+are.
+"""
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload, selectinload
+
+from app.extensions import db
+from app.models import (
+    Patient, RiskPrediction, ConsultationNote, Consultation,
+    DiabetesAssessment, LiverAssessment, HeartAssessment, MentalHealthAssessment,
+)
+
+# Section -> (model, ordering within a patient); each ordering matches the relationship's order_by
+SECTIONS = {
+    'diabetes_assessments': (DiabetesAssessment, (DiabetesAssessment.assessed_at.desc(), DiabetesAssessment.id.desc())),
+    'liver_assessments': (LiverAssessment, (LiverAssessment.assessed_at.desc(), LiverAssessment.id.desc())),
+    'heart_assessments': (HeartAssessment, (HeartAssessment.assessed_at.desc(), HeartAssessment.id.desc())),
+    'mental_health_assessments': (MentalHealthAssessment, (MentalHealthAssessment.assessed_at.desc(), MentalHealthAssessment.id.desc())),
+    'risk_predictions': (RiskPrediction, (RiskPrediction.predicted_at.desc(), RiskPrediction.id.desc())),
+    'consultation_notes': (ConsultationNote, (ConsultationNote.created_at.desc(), ConsultationNote.id.desc())),
+    'consultations': (Consultation, (Consultation.id,)),
+}
+
+# Ids per IN (...) list; well under SQLite's bound-parameter limit
+IN_BATCH_SIZE = 500
+
+
+class PatientRecord:
+    """A patient with the sections loaded alongside it, as plain lists."""
+
+    def __init__(self, patient: Patient, sections: Dict[str, List]):
+        self.patient = patient
+        self.sections = sections
+
+    def __getitem__(self, section: str) -> List:
+        return self.sections[section]
+
+    def to_dict(self, include_admin=True, include_history=False, include_latest_prediction=False, include_notes=False):
+        """Same output as Patient.to_dict, read from the loaded sections."""
+        return self.patient.to_dict(include_admin=include_admin, include_history=include_history,
+                                    include_latest_prediction=include_latest_prediction,
+                                    include_notes=include_notes, sections=self.sections)
+
+
+class PatientRepository:
+    """Loads patients and their related rows in batches."""
+
+    def __init__(self, session=None):
+        self.session = session or db.session
+
+    def load_full(self, ids: Iterable[int], sections: Optional[Iterable[str]] = None) -> Dict[int, PatientRecord]:
+        """
+        Loads the given patients, plus their admin, latest prediction and the
+        requested sections (all of SECTIONS by default). Returns
+        {patient id: PatientRecord} in the order of `ids`, leaving out ids that
+        don't exist.
+        """
+        sections = list(SECTIONS if sections is None else sections)
+        unknown = [name for name in sections if name not in SECTIONS]
+        if unknown:
+            raise ValueError(f"Unknown patient sections: {', '.join(unknown)}")
+
+        ids = list(dict.fromkeys(ids))
+        patients: Dict[int, Patient] = {}
+        grouped: Dict[int, Dict[str, List]] = {}
+        for start in range(0, len(ids), IN_BATCH_SIZE):
+            batch = ids[start:start + IN_BATCH_SIZE]
+            for patient in self.session.scalars(
+                select(Patient)
+                .where(Patient.id.in_(batch))
+                .options(joinedload(Patient.created_by_admin), selectinload(Patient.latest_prediction))
+            ):
+                patients[patient.id] = patient
+                grouped[patient.id] = {name: [] for name in sections}
+
+            for name in sections:
+                Model, ordering = SECTIONS[name]
+                rows = self.session.scalars(
+                    select(Model).where(Model.patient_id.in_(batch)).order_by(Model.patient_id, *ordering)
+                )
+                for row in rows:
+                    grouped[row.patient_id][name].append(row)
+
+        return {pid: PatientRecord(patients[pid], grouped[pid]) for pid in ids if pid in patients}
+
+    def load_one(self, patient_id: int, sections: Optional[Iterable[str]] = None) -> Optional[PatientRecord]:
+        return self.load_full([patient_id], sections).get(patient_id)
@@ -0,0 +1,142 @@
+# HealthCare App/medml-backend/app/rescoring.py
+from typing import Any, Dict, Iterable, List, Optional
+from flask import current_app
+from sqlalchemy import func, insert, select
+from app.extensions import db
+from app.models import (
+    Patient, RiskPrediction, sync_latest_predictions, TOTAL_PREDICTIONS_KEY,
+    DiabetesAssessment, LiverAssessment, HeartAssessment, MentalHealthAssessment
+)
+from app.services import run_prediction_batch, models
+
+# Assessment table feeding each model, in the order predictions are run
+ASSESSMENT_MODELS = {
+    'diabetes': DiabetesAssessment,
+    'liver': LiverAssessment,
+    'heart': HeartAssessment,
+    'mental_health': MentalHealthAssessment,
+}
+
+# Same policy as _run_and_save_prediction: these models fall back to a
+# neutral score instead of failing the whole prediction.
+NEUTRAL_FALLBACK_MODELS = ('heart', 'mental_health')
+NEUTRAL_SCORE = 0.5
+
+DEFAULT_CHUNK_SIZE = 500
+
+
+def select_patient_ids(patient_ids: Optional[Iterable[int]] = None,
+                       state_name: Optional[str] = None,
+                       created_by_admin_id: Optional[int] = None) -> List[int]:
+    """
+    Resolves a patient filter to an ordered list of ids.
+    No filter at all selects every patient; an empty `patient_ids` selects none.
+    """
+    query = db.session.query(Patient.id)
+    if patient_ids is not None:
+        query = query.filter(Patient.id.in_(list(patient_ids)))
+    if state_name:
+        query = query.filter(Patient.state_name == state_name)
+    if created_by_admin_id:
+        query = query.filter(Patient.created_by_admin_id == created_by_admin_id)
+    return [row[0] for row in query.order_by(Patient.id).all()]
+
+
+def latest_assessments(AssessmentModel, patient_ids: List[int]) -> Dict[int, Any]:
+    """
+    Loads the most recent assessment of one type for every patient in
+    `patient_ids` with a single windowed query.
+    """
+    ranked = select(
+        AssessmentModel.id,
+        func.row_number().over(
+            partition_by=AssessmentModel.patient_id,
+            order_by=(AssessmentModel.assessed_at.desc(), AssessmentModel.id.desc()),
+        ).label('rn'),
+    ).where(AssessmentModel.patient_id.in_(patient_ids)).subquery()
+
+    rows = (
+        db.session.query(AssessmentModel)
+        .join(ranked, AssessmentModel.id == ranked.c.id)
+        .filter(ranked.c.rn == 1)
+        .all()
+    )
+    return {a.patient_id: a for a in rows}
+
+
+def _score(model_key: str, rows: List[Dict[str, Any]]) -> List[float]:
+    try:
+        return [float(s) for s in run_prediction_batch(model_key, rows)]
+    except Exception as e:
+        if model_key not in NEUTRAL_FALLBACK_MODELS:
+            raise
+        current_app.logger.warning(f"Bulk {model_key} prediction failed: {e}")
+        return [NEUTRAL_SCORE] * len(rows)
+
+
+def rescore_chunk(patient_ids: List[int], model_version: str) -> Dict[str, List[int]]:
+    """
+    Scores one chunk of patients and bulk-inserts their RiskPrediction rows.
+    Patients missing any of the four assessments are skipped.
+    """
+    patients = {p.id: p for p in Patient.query.filter(Patient.id.in_(patient_ids)).all()}
+    latest = {key: latest_assessments(Model, patient_ids) for key, Model in ASSESSMENT_MODELS.items()}
+
+    scorable = [pid for pid in patient_ids
+                if pid in patients and all(pid in latest[key] for key in ASSESSMENT_MODELS)]
+    scorable_set = set(scorable)
+    skipped = [pid for pid in patient_ids if pid not in scorable_set]
+    if not scorable:
+        return {"rescored": [], "skipped": skipped}
+
+    mappings = [{"patient_id": pid, "model_version": model_version} for pid in scorable]
+    for key in ASSESSMENT_MODELS:
+        rows = []
+        for pid in scorable:
+            features = latest[key][pid].to_dict()
+            features.update(patients[pid]._get_common_features())
+            rows.append(features)
+
+        for mapping, score in zip(mappings, _score(key, rows)):
+            mapping[f"{key}_risk_score"] = score
+            mapping[f"{key}_risk_level"] = RiskPrediction.level_for_score(score)
+
+    db.session.execute(insert(RiskPrediction), mappings)
+    sync_latest_predictions(db.session.connection(), scorable,
+                            counter_deltas={TOTAL_PREDICTIONS_KEY: len(mappings)})
+    return {"rescored": scorable, "skipped": skipped}
+
+
+def rescore_patients(patient_ids: List[int], chunk_size: int = DEFAULT_CHUNK_SIZE,
+                     model_version: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Rescores many patients in chunks, committing once per chunk.
+    Returns a summary with the counts and the ids that were skipped.
+    """
+    model_version = model_version or models.version_stamp()
+    rescored_count = 0
+    skipped: List[int] = []
+
+    for start in range(0, len(patient_ids), chunk_size):
+        chunk = patient_ids[start:start + chunk_size]
+        try:
+            result = rescore_chunk(chunk, model_version=model_version)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Bulk rescoring failed for chunk starting at patient {chunk[0]}: {e}")
+            raise
+
+        rescored_count += len(result["rescored"])
+        skipped.extend(result["skipped"])
+        current_app.logger.info(
+            f"Rescored chunk of {len(chunk)} patients ({len(result['rescored'])} saved, {len(result['skipped'])} skipped)"
+        )
+
+    return {
+        "model_version": model_version,
+        "requested": len(patient_ids),
+        "rescored": rescored_count,
+        "skipped": len(skipped),
+        "skipped_patient_ids": skipped,
+    }
@@ -0,0 +1,126 @@
+# HealthCare App/medml-backend/app/rollups.py
+"""
+Time series for the admin dashboard, served from the daily_rollups table.
+
+The insert hooks in app/models.py add to the rollups as patients register
+and predictions are saved, so a query only reads one row per day and
+dimension group, however long the range. `rebuild` recomputes the whole
+table from the raw tables; it runs on the first read of an empty table and
+from `flask rebuild-rollups`.
+"""
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import func, insert, literal, select
+
+from app.extensions import db
+from app.models import (
+    Patient, RiskPrediction, User, DailyRollup, LATEST_RISK_LEVEL_COLUMNS,
+    ROLLUP_REGISTRATIONS, ROLLUP_PREDICTIONS,
+)
+
+GRANULARITIES = ('day', 'week', 'month')
+# Public metric -> stored metric
+METRICS = {
+    'registrations': ROLLUP_REGISTRATIONS,
+    'predictions': ROLLUP_PREDICTIONS,
+    # Latest level changed from one level to another
+    'transitions': ROLLUP_PREDICTIONS,
+}
+# Dimensions a series can be filtered and grouped on, per metric
+DIMENSIONS = {
+    'registrations': ('state_name', 'facility'),
+    'predictions': ('state_name', 'facility', 'disease', 'risk_level'),
+    'transitions': ('state_name', 'facility', 'disease', 'from_level', 'risk_level'),
+}
+
+
+def bucket_start(day: date, granularity: str) -> date:
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())  # Monday
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def timeseries(metric: str, granularity: str, start: date, end: date,
+               group_by: Iterable[str] = (), filters: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
+    """
+    Returns [{"period": <bucket start>, <group_by dimensions>..., "count": n}]
+    for days in [start, end], ordered by period. Reads daily_rollups only.
+    """
+    group_by = list(group_by)
+    group_columns = [getattr(DailyRollup, name) for name in group_by]
+    query = (
+        db.session.query(DailyRollup.day, *group_columns, func.sum(DailyRollup.count))
+        .filter(DailyRollup.metric == METRICS[metric], DailyRollup.day.between(start, end))
+    )
+    if metric == 'transitions':
+        query = query.filter(DailyRollup.from_level != '', DailyRollup.from_level != DailyRollup.risk_level)
+    for name, value in (filters or {}).items():
+        query = query.filter(getattr(DailyRollup, name) == value)
+    query = query.group_by(DailyRollup.day, *group_columns)
+
+    buckets: Dict[tuple, int] = {}
+    for day, *groups, count in query.all():
+        key = (bucket_start(day, granularity), *groups)
+        buckets[key] = buckets.get(key, 0) + int(count)
+
+    series = []
+    for (period, *groups), count in sorted(buckets.items()):
+        point = {"period": period.isoformat()}
+        point.update(zip(group_by, groups))
+        point["count"] = count
+        series.append(point)
+    return series
+
+
+def ensure_built():
+    """Builds the rollups once for databases that had patients before the table existed."""
+    if db.session.query(DailyRollup.day).first() is None and db.session.query(Patient.id).first() is not None:
+        rebuild()
+
+
+def rebuild():
+    """Recomputes every rollup row from the patients and risk_predictions tables and commits."""
+    table = DailyRollup.__table__
+    columns = ['day', 'metric', 'state_name', 'facility', 'disease', 'from_level', 'risk_level', 'count']
+    db.session.execute(table.delete())
+
+    registered_on = func.date(Patient.created_at)
+    state = func.coalesce(Patient.state_name, '')
+    facility = func.coalesce(User.facility_name, '')
+    db.session.execute(insert(table).from_select(columns, (
+        select(registered_on, literal(ROLLUP_REGISTRATIONS), state, facility,
+               literal(''), literal(''), literal(''), func.count(Patient.id))
+        .outerjoin(User, User.id == Patient.created_by_admin_id)
+        .where(Patient.created_at.isnot(None))
+        .group_by(registered_on, state, facility)
+    )))
+
+    # Every prediction became its patient's latest when it was saved; the
+    # level it replaced is the previous prediction's, in save order.
+    for disease in LATEST_RISK_LEVEL_COLUMNS:
+        level = getattr(RiskPrediction, f'{disease}_risk_level')
+        history = (
+            select(
+                func.date(RiskPrediction.predicted_at).label('day'),
+                RiskPrediction.patient_id.label('patient_id'),
+                func.coalesce(func.lag(level).over(
+                    partition_by=RiskPrediction.patient_id,
+                    order_by=(RiskPrediction.predicted_at, RiskPrediction.id),
+                ), '').label('from_level'),
+                func.coalesce(level, '').label('risk_level'),
+            )
+            .where(RiskPrediction.predicted_at.isnot(None))
+            .subquery()
+        )
+        db.session.execute(insert(table).from_select(columns, (
+            select(history.c.day, literal(ROLLUP_PREDICTIONS), state, facility, literal(disease),
+                   history.c.from_level, history.c.risk_level, func.count())
+            .select_from(history)
+            .join(Patient, Patient.id == history.c.patient_id)
+            .outerjoin(User, User.id == Patient.created_by_admin_id)
+            .group_by(history.c.day, state, facility, history.c.from_level, history.c.risk_level)
+        )))
+    db.session.commit()
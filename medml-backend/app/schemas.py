@@ -1,6 +1,7 @@
 # HealthCare App/medml-backend/app/schemas.py
-from pydantic import BaseModel, EmailStr, constr, conint, confloat, validator
-from typing import List, Optional
+from pydantic import BaseModel, EmailStr, constr, conint, conlist, confloat, validator
+from typing import List, Literal, Optional
+from datetime import date
 import re  # <-- Import the 're' module
 
 # Regex for password
@@ -146,4 +147,40 @@ class MentalHealthAssessmentSchema(BaseModel):
     depressiveness: bool
     suicidal: bool
     anxiousness: bool
-    sleepiness: bool
\ No newline at end of file
+    sleepiness: bool
+
+class PatientListQuerySchema(BaseModel):
+    """ Paging and projection options for GET /patients. No limit returns every patient. """
+    limit: Optional[conint(ge=1, le=500)] = None
+    cursor: Optional[constr(max_length=200)] = None
+    # Comma-separated list, e.g. "name,abha_id,latest_prediction.diabetes_risk_level"
+    fields: Optional[constr(max_length=1000)] = None
+
+class TimeseriesQuerySchema(BaseModel):
+    """ Options for GET /dashboard/timeseries. Filters apply only to the metric's dimensions. """
+    metric: Literal['registrations', 'predictions', 'transitions'] = 'registrations'
+    granularity: Literal['day', 'week', 'month'] = 'day'
+    start: Optional[date] = None
+    end: Optional[date] = None
+    # Comma-separated dimensions, e.g. "state_name,risk_level"
+    group_by: Optional[constr(max_length=200)] = None
+    state_name: Optional[constr(max_length=100)] = None
+    facility: Optional[constr(max_length=150)] = None
+    disease: Optional[Literal['diabetes', 'liver', 'heart', 'mental_health']] = None
+    from_level: Optional[Literal['Low', 'Medium', 'High']] = None
+    risk_level: Optional[Literal['Low', 'Medium', 'High']] = None
+
+class PatientDetailQuerySchema(BaseModel):
+    """ Options for GET /patients/<id> and /auth/me. No history_limit returns the full history. """
+    # Newest rows kept per history section (assessments, predictions, notes)
+    history_limit: Optional[conint(ge=0, le=10000)] = None
+
+# --- Prediction Schemas ---
+
+class BulkPredictionSchema(BaseModel):
+    """ Selects the patients to rescore. No selector means every patient. """
+    # An empty list is rejected rather than read as "no selector"
+    patient_ids: Optional[conlist(conint(gt=0), min_length=1)] = None
+    state_name: Optional[constr(max_length=100)] = None
+    created_by_admin_id: Optional[conint(gt=0)] = None
+    chunk_size: conint(ge=1, le=5000) = 500
@@ -0,0 +1,78 @@
+# HealthCare App/medml-backend/app/serialization.py
+"""
+Schema-driven model serialization and fast JSON encoding.
+
+Each model lists its output fields in `serializer_fields`: an attribute
+name, or an (output key, attribute) pair where they differ. On first use an
+encoder is built per model. It pulls every field in one
+`operator.attrgetter` call and converts the model's Date/DateTime columns
+with `isoformat()`. The `to_dict` methods in app/models.py delegate here, so
+field names are unchanged.
+
+`dumps` encodes with orjson when it is installed. It falls back to the
+stdlib, sorting keys and writing compact separators like Flask's jsonify.
+"""
+import json
+import operator
+from typing import Any, Callable, Dict, Tuple
+
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import Date, DateTime, inspect
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class ModelEncoder:
+    """Turns instances of one model into dicts with a fixed key order."""
+
+    def __init__(self, model: type):
+        fields = [(f, f) if isinstance(f, str) else tuple(f) for f in model.serializer_fields]
+        self.keys: Tuple[str, ...] = tuple(key for key, _ in fields)
+        attrs = [attr for _, attr in fields]
+        getter = operator.attrgetter(*attrs)
+        # attrgetter returns a bare value, not a 1-tuple, for a single field
+        self._get: Callable[[Any], tuple] = getter if len(attrs) > 1 else (lambda obj: (getter(obj),))
+
+        columns = inspect(model).columns
+        self._temporal = tuple(
+            i for i, attr in enumerate(attrs)
+            if attr in columns and isinstance(columns[attr].type, (Date, DateTime))
+        )
+
+    def __call__(self, obj: Any) -> Dict[str, Any]:
+        values = self._get(obj)
+        if self._temporal:
+            values = list(values)
+            for i in self._temporal:
+                if values[i] is not None:
+                    values[i] = values[i].isoformat()
+        return dict(zip(self.keys, values))
+
+
+_encoders: Dict[type, ModelEncoder] = {}
+
+
+def encode(obj: Any) -> Dict[str, Any]:
+    """Serializes a model instance by its class's `serializer_fields`."""
+    encoder = _encoders.get(type(obj))
+    if encoder is None:
+        encoder = _encoders[type(obj)] = ModelEncoder(type(obj))
+    return encoder(obj)
+
+
+# --- JSON ---
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def dumps(value: Any, sort_keys: bool = True) -> bytes:
+        options = _ORJSON_OPTIONS | orjson.OPT_SORT_KEYS if sort_keys else _ORJSON_OPTIONS
+        # Values orjson does not know (dates, Decimal, ...) are converted as jsonify does
+        return orjson.dumps(value, default=DefaultJSONProvider.default, option=options)
+else:
+    def dumps(value: Any, sort_keys: bool = True) -> bytes:
+        return json.dumps(value, default=DefaultJSONProvider.default, sort_keys=sort_keys,
+                          separators=(',', ':')).encode('utf-8')
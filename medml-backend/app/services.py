@@ -1,61 +1,49 @@
 # HealthCare App/medml-backend/app/services.py
-import joblib
-import pandas as pd
 import numpy as np
 import os
 import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 import google.generativeai as genai
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from flask import current_app
+from app.features import (
+    FeatureSpec, Num, Flag, Male, Bins, Ratio, Product, Sum, Difference,
+    Below, AnyAbove, Coalesce, Apply
+)
+from app.model_registry import ModelRegistry
+from app import inference
+from app.recommendation_cache import recommendation_cache, normalize_profile, profile_key
+from app.recommendation_client import recommendation_client, RecommendationUnavailableError
 
 # Path to models_store directory
 MODEL_DIR = os.path.join(os.path.dirname(__file__), '..', 'models_store')
 
-# Global dictionary to hold models and preprocessors
-models = {
-    'diabetes': None,
-    'heart': None,
-    'liver': None,
-    'mental_health': None
-}
+# Versioned, lazily loaded models (see app/model_registry.py and
+# models_store/manifest.json). Supports dict-style `models.get(key)`.
+models = ModelRegistry(MODEL_DIR)
+
+# Larger batches go to the library, whose multithreaded C++ predictor wins there
+COMPILED_MAX_ROWS = 256
+
 # --- FIX: Removed preprocessor dict ---
 # preprocessors = {
 #     'heart': None
 # }
 
-def load_model(app: Any, key: str, filename: str):
-    """Loads a .pkl model from the models_store directory into a global dict."""
-    try:
-        path = os.path.join(MODEL_DIR, filename)
-        if not os.path.exists(path):
-            app.logger.warning(f"Model file not found at {path}. Predictions for '{key}' will fail.")
-            return None
-        return joblib.load(path)
-    except Exception as e:
-        app.logger.error(f"Error loading model {filename}: {e}")
-        return None
-
 def load_models(app: Any):
-    """Loads all models and preprocessors at application startup."""
+    """Reads the model manifest at application startup. Models load on first use."""
     with app.app_context():
-        app.logger.info(f"Loading models from: {MODEL_DIR}")
-        
-        models['diabetes'] = load_model(app, 'diabetes', 'diabetes_XGBoost.pkl')
-        models['heart'] = load_model(app, 'heart', 'heart_best_model.pkl')
-        models['liver'] = load_model(app, 'liver', 'liver_LightGBM SMOTE.pkl')
-        # Use depressiveness model as the main mental health model
-        models['mental_health'] = load_model(app, 'mental_health', 'mental_health_depressiveness.pkl')
-        
-        # --- FIX: Removed loading of the problematic preprocessor ---
-        # preprocessors['heart'] = load_model(app, 'heart_preprocessor', 'heart_preprocessor.pkl')
-        
-        app.logger.info("Model loading complete.")
+        app.logger.info(f"Loading model manifest from: {app.config.get('MODEL_DIR') or MODEL_DIR}")
+        models.configure(app)
+        app.logger.info(f"Model registry ready (versions {models.version_stamp()}).")
         
         # --- Configure Gemini ---
         try:
             api_key = app.config.get('GEMINI_API_KEY')
             if api_key:
-                genai.configure(api_key=api_key)
+                _configure_gemini(api_key, app.config.get('GEMINI_API_ENDPOINT'))
                 app.logger.info("Gemini API configured successfully.")
             else:
                 app.logger.warning("GEMINI_API_KEY is not set. Recommendation service will be disabled.")
@@ -63,379 +51,236 @@ def load_models(app: Any):
             app.logger.error(f"Error configuring Gemini API: {e}")
 
 # --- Preprocessing & Prediction Logic (UPDATED) ---
+#
+# Each model's inputs are declared as a FeatureSpec (see app/features.py).
+# Every predictor is a batch function that compiles its rows into one
+# (n_rows x n_features) NumPy matrix and calls the model once; the single-row
+# `predict_*` functions are thin wrappers, so the request path and bulk
+# rescoring share exactly the same feature engineering.
 
-def predict_diabetes(data: Dict[str, Any]) -> float:
-    model = models.get('diabetes')
+def _diabetes_pedigree(glucose, age, bmi):
+    # Simplified DiabetesPedigreeFunction calculation
+    return np.where((glucose != 0) & (age != 0) & (bmi != 0), (glucose * age * bmi) / 10000.0, 0.5)
+
+
+def _derived_ag_ratio(total_protein, albumin):
+    # --- UPDATED: Calculate A/G Ratio per SRD/model ---
+    valid = (total_protein != 0) & (albumin != 0) & (total_protein > albumin)
+    out = np.full_like(total_protein, 0.9)  # Placeholder median
+    out[valid] = np.round(albumin[valid] / (total_protein[valid] - albumin[valid]), 2)
+    return out
+
+
+DIABETES_SPEC = FeatureSpec([
+    ('Pregnancies', Flag('pregnancy')),
+    ('Glucose', Num('glucose')),
+    ('BloodPressure', Num('blood_pressure')),
+    ('SkinThickness', Num('skin_thickness')),
+    ('Insulin', Num('insulin')),
+    ('BMI', Num('bmi')),
+    ('DiabetesPedigreeFunction', Apply(_diabetes_pedigree, 'Glucose', 'Age', 'BMI')),
+    ('Age', Num('age')),
+    ('AgeGroup', Bins('Age', [30, 50])),
+    ('BMICategory', Bins('BMI', [18.5, 25, 30])),  # Underweight/Normal/Overweight/Obese
+    ('GlucoseCategory', Bins('Glucose', [100, 126])),  # Normal/Prediabetes/Diabetes
+    ('BMIAgeInteraction', Product('BMI', 'Age')),
+    ('GlucoseBMIInteraction', Product('Glucose', 'BMI')),
+])
+
+HEART_SPEC = FeatureSpec([
+    ('Diabetes', Flag('diabetes')),
+    ('Hypertension', Flag('hypertension')),
+    ('Obesity', Flag('obesity')),
+    ('Smoking', Flag('smoking')),
+    ('Alcohol_Consumption', Flag('alcohol_consumption')),
+    ('Physical_Activity', Flag('physical_activity')),
+    ('Diet_Score', Num('diet_score')),
+    ('Cholesterol_Level', Num('cholesterol_level')),
+    ('Triglyceride_Level', Num('triglyceride_level')),
+    ('LDL_Level', Num('ldl_level')),
+    ('HDL_Level', Num('hdl_level')),
+    ('Systolic_BP', Num('systolic_bp')),
+    ('Diastolic_BP', Num('diastolic_bp')),
+    ('Air_Pollution_Exposure', Num('air_pollution_exposure')),
+    ('Family_History', Flag('family_history')),
+    ('Stress_Level', Num('stress_level')),
+    ('Heart_Attack_History', Flag('heart_attack_history')),
+    ('Age', Num('age')),
+    ('Gender', Male()),
+    ('BMI', Num('bmi')),
+    ('Cholesterol_HDL_Ratio', Ratio('Cholesterol_Level', 'HDL_Level')),
+    ('LDL_HDL_Ratio', Ratio('LDL_Level', 'HDL_Level')),
+    ('Triglyceride_HDL_Ratio', Ratio('Triglyceride_Level', 'HDL_Level')),
+    ('BP_Difference', Difference('Systolic_BP', 'Diastolic_BP')),
+    ('Age_BMI_Interaction', Product('Age', 'BMI')),
+    ('Stress_Diet_Interaction', Product('Stress_Level', 'Diet_Score')),
+    ('Age_Gender_Interaction', Product('Age', 'Gender')),
+])
+
+LIVER_SPEC = FeatureSpec([
+    ('Age', Num('age')),
+    ('Gender', Male()),
+    ('TB', Num('total_bilirubin')),
+    ('DB', Num('direct_bilirubin')),
+    ('Alkphos', Num('alkaline_phosphatase')),
+    ('Sgpt', Num('sgpt_alamine_aminotransferase')),
+    ('Sgot', Num('sgot_aspartate_aminotransferase')),
+    ('TP', Num('total_protein')),
+    ('ALB', Num('albumin')),
+    # Use the assessment's computed ratio, else derive it from TP/ALB
+    ('AGRatio', Coalesce(Num('ag_ratio', default=np.nan), Apply(_derived_ag_ratio, 'TP', 'ALB'))),
+    ('BilirubinRatio', Ratio('DB', 'TB')),
+    ('SGPTSGOTRatio', Ratio('Sgpt', 'Sgot')),
+    ('TotalEnzymes', Sum('Sgpt', 'Sgot')),
+    ('AgeGroup', Bins('Age', [30, 50])),
+    ('LowProtein', Below('TP', 6.0)),
+    ('HighEnzymes', AnyAbove(['Sgpt', 'Sgot'], 40)),
+    ('AgeGenderInteraction', Product('Age', 'Gender')),
+])
+
+MENTAL_HEALTH_SPEC = FeatureSpec([
+    ('phq_score', Num('phq_score')),
+    ('gad_score', Num('gad_score')),
+    ('depressiveness', Flag('depressiveness')),
+    ('suicidal', Flag('suicidal')),
+    ('anxiousness', Flag('anxiousness')),
+    ('sleepiness', Flag('sleepiness')),
+    ('age', Num('age')),
+    ('gender', Male()),
+])
+
+DIABETES_FEATURES = DIABETES_SPEC.names
+HEART_FEATURES = HEART_SPEC.names
+LIVER_FEATURES = LIVER_SPEC.names
+MENTAL_HEALTH_FEATURES = MENTAL_HEALTH_SPEC.names
+
+
+def _positive_proba(key: str, model: Any, X: np.ndarray) -> np.ndarray:
+    """Runs one predict_proba call and returns the class-1 column."""
+    ensemble = models.compiled(key)
+    if ensemble is not None and X.shape[0] <= COMPILED_MAX_ROWS:
+        return np.asarray(ensemble.predict_proba(X)[:, 1], dtype=np.float64)
+    return np.asarray(model.predict_proba(X)[:, 1], dtype=np.float64)
+
+
+def _heart_fallback(X: np.ndarray) -> np.ndarray:
+    """Rule-based heart score used when the model cannot score the batch."""
+    col = {name: X[:, i] for i, name in enumerate(HEART_FEATURES)}
+    risk = np.zeros(X.shape[0])
+    risk += np.where((col['Diabetes'] + col['Hypertension'] + col['Smoking']) > 0, 0.3, 0.0)
+    risk += np.where(col['Obesity'] > 0, 0.2, 0.0)
+    risk += np.where(col['Family_History'] > 0, 0.2, 0.0)
+    risk += np.where(col['Age'] > 50, 0.2, 0.0)
+    risk += np.where(col['Stress_Level'] > 5, 0.1, 0.0)
+    return np.minimum(risk, 1.0)
+
+
+def _mental_health_fallback(X: np.ndarray) -> np.ndarray:
+    """Rule-based mental health score used when the model cannot score the batch."""
+    col = {name: X[:, i] for i, name in enumerate(MENTAL_HEALTH_FEATURES)}
+    phq, gad = col['phq_score'], col['gad_score']
+    risk = np.zeros(X.shape[0])
+    risk += np.select([phq >= 10, phq >= 5], [0.4, 0.2], 0.0)  # depression severity
+    risk += np.select([gad >= 10, gad >= 5], [0.3, 0.15], 0.0)  # anxiety severity
+    risk += np.where(col['suicidal'] > 0, 0.3, 0.0)
+    risk += np.where(col['depressiveness'] > 0, 0.2, 0.0)
+    risk += np.where(col['anxiousness'] > 0, 0.2, 0.0)
+    risk += np.where(col['sleepiness'] > 0, 0.1, 0.0)
+    return np.minimum(risk, 1.0)
+
+
+def _require_model(key: str, label: str) -> Any:
+    model = models.get(key)
     if model is None:
-        current_app.logger.error("Diabetes model is not loaded.")
-        raise RuntimeError("Diabetes model is not loaded.")
-        
+        current_app.logger.error(f"{label} model is not loaded.")
+        raise RuntimeError(f"{label} model is not loaded.")
+    return model
+
+
+def predict_diabetes_batch(rows: List[Dict[str, Any]]) -> np.ndarray:
+    model = _require_model('diabetes', 'Diabetes')
     try:
-        # --- FIXED: Map assessment data to model's expected features ---
-        # Convert assessment data to model's expected format
-        processed_data = {}
-        
-        # Map basic features
-        processed_data['Pregnancies'] = 1 if data.get('pregnancy') else 0
-        processed_data['Glucose'] = data.get('glucose', 0)
-        processed_data['BloodPressure'] = data.get('blood_pressure', 0)
-        processed_data['SkinThickness'] = data.get('skin_thickness', 0)
-        processed_data['Insulin'] = data.get('insulin', 0)
-        processed_data['BMI'] = data.get('bmi', 0)
-        processed_data['Age'] = data.get('age', 0)
-        
-        # Calculate missing features that the model expects
-        # DiabetesPedigreeFunction - using a simplified calculation
-        glucose = processed_data['Glucose']
-        age = processed_data['Age']
-        bmi = processed_data['BMI']
-        
-        # Simplified DiabetesPedigreeFunction calculation
-        processed_data['DiabetesPedigreeFunction'] = (glucose * age * bmi) / 10000.0 if glucose and age and bmi else 0.5
-        
-        # Create age groups
-        if age < 30:
-            processed_data['AgeGroup'] = 0
-        elif age < 50:
-            processed_data['AgeGroup'] = 1
-        else:
-            processed_data['AgeGroup'] = 2
-            
-        # Create BMI categories
-        if bmi < 18.5:
-            processed_data['BMICategory'] = 0  # Underweight
-        elif bmi < 25:
-            processed_data['BMICategory'] = 1  # Normal
-        elif bmi < 30:
-            processed_data['BMICategory'] = 2  # Overweight
-        else:
-            processed_data['BMICategory'] = 3  # Obese
-            
-        # Create glucose categories
-        if glucose < 100:
-            processed_data['GlucoseCategory'] = 0  # Normal
-        elif glucose < 126:
-            processed_data['GlucoseCategory'] = 1  # Prediabetes
-        else:
-            processed_data['GlucoseCategory'] = 2  # Diabetes
-            
-        # Create interaction features
-        processed_data['BMIAgeInteraction'] = bmi * age
-        processed_data['GlucoseBMIInteraction'] = glucose * bmi
-        
-        # Define the exact feature order expected by the model
-        feature_order = [
-            'Pregnancies', 'Glucose', 'BloodPressure', 'SkinThickness', 
-            'Insulin', 'BMI', 'DiabetesPedigreeFunction', 'Age', 
-            'AgeGroup', 'BMICategory', 'GlucoseCategory', 
-            'BMIAgeInteraction', 'GlucoseBMIInteraction'
-        ]
-        
-        # Create DataFrame with the correct feature order
-        df = pd.DataFrame([processed_data], columns=feature_order)
-        
-        # Predict probability of class 1 (disease)
-        probability = model.predict_proba(df)[0][1] 
-        
-        return float(probability)
+        X = DIABETES_SPEC.transform(rows)
+        return _positive_proba('diabetes', model, X)
     except Exception as e:
         current_app.logger.error(f"Diabetes prediction error: {e}")
         raise ValueError("Failed to preprocess diabetes data.")
 
-def predict_heart(data: Dict[str, Any]) -> float:
-    model = models.get('heart')
-    # --- FIX: Removed preprocessor ---
-    # preprocessor = preprocessors.get('heart')
-    
-    # --- FIX: Removed preprocessor check ---
-    if model is None:
-        current_app.logger.error("Heart model is not loaded.")
-        raise RuntimeError("Heart model is not loaded.")
-        
+
+def predict_heart_batch(rows: List[Dict[str, Any]]) -> np.ndarray:
+    model = _require_model('heart', 'Heart')
     try:
-        # --- FIXED: Use correct capitalized feature names that match the trained model ---
-        # Map 'gender' from 'Male'/'Female' to 0/1
-        gender_value = 1 if data.get('gender') == 'Male' else 0
-        
-        # Convert bools to int
-        diabetes = 1 if data.get('diabetes') else 0
-        hypertension = 1 if data.get('hypertension') else 0
-        obesity = 1 if data.get('obesity') else 0
-        smoking = 1 if data.get('smoking') else 0
-        alcohol_consumption = 1 if data.get('alcohol_consumption') else 0
-        physical_activity = 1 if data.get('physical_activity') else 0
-        family_history = 1 if data.get('family_history') else 0
-        heart_attack_history = 1 if data.get('heart_attack_history') else 0
-
-        # Get numeric values
-        age = data.get('age', 0)
-        bmi = data.get('bmi', 0)
-        diet_score = data.get('diet_score', 0)
-        cholesterol_level = data.get('cholesterol_level', 0)
-        triglyceride_level = data.get('triglyceride_level', 0)
-        ldl_level = data.get('ldl_level', 0)
-        hdl_level = data.get('hdl_level', 0)
-        systolic_bp = data.get('systolic_bp', 0)
-        diastolic_bp = data.get('diastolic_bp', 0)
-        air_pollution_exposure = data.get('air_pollution_exposure', 0)
-        stress_level = data.get('stress_level', 0)
-        
-        # Calculate engineered features with correct names
-        cholesterol_hdl_ratio = cholesterol_level / hdl_level if hdl_level > 0 else 0
-        ldl_hdl_ratio = ldl_level / hdl_level if hdl_level > 0 else 0
-        triglyceride_hdl_ratio = triglyceride_level / hdl_level if hdl_level > 0 else 0
-        bp_difference = systolic_bp - diastolic_bp
-        age_bmi_interaction = age * bmi
-        stress_diet_interaction = stress_level * diet_score
-        age_gender_interaction = age * gender_value
-        
-        # Create the processed data with correct capitalized feature names
-        processed_data = {
-            'Diabetes': diabetes,
-            'Hypertension': hypertension,
-            'Obesity': obesity,
-            'Smoking': smoking,
-            'Alcohol_Consumption': alcohol_consumption,
-            'Physical_Activity': physical_activity,
-            'Diet_Score': diet_score,
-            'Cholesterol_Level': cholesterol_level,
-            'Triglyceride_Level': triglyceride_level,
-            'LDL_Level': ldl_level,
-            'HDL_Level': hdl_level,
-            'Systolic_BP': systolic_bp,
-            'Diastolic_BP': diastolic_bp,
-            'Air_Pollution_Exposure': air_pollution_exposure,
-            'Family_History': family_history,
-            'Stress_Level': stress_level,
-            'Heart_Attack_History': heart_attack_history,
-            'Age': age,
-            'Gender': gender_value,
-            'BMI': bmi,
-            'Cholesterol_HDL_Ratio': cholesterol_hdl_ratio,
-            'LDL_HDL_Ratio': ldl_hdl_ratio,
-            'Triglyceride_HDL_Ratio': triglyceride_hdl_ratio,
-            'BP_Difference': bp_difference,
-            'Age_BMI_Interaction': age_bmi_interaction,
-            'Stress_Diet_Interaction': stress_diet_interaction,
-            'Age_Gender_Interaction': age_gender_interaction
-        }
-        
-        # Define the exact feature order expected by the model (27 features)
-        feature_columns = [
-            'Diabetes', 'Hypertension', 'Obesity', 'Smoking', 'Alcohol_Consumption',
-            'Physical_Activity', 'Diet_Score', 'Cholesterol_Level', 'Triglyceride_Level',
-            'LDL_Level', 'HDL_Level', 'Systolic_BP', 'Diastolic_BP', 'Air_Pollution_Exposure',
-            'Family_History', 'Stress_Level', 'Heart_Attack_History', 'Age', 'Gender', 'BMI',
-            'Cholesterol_HDL_Ratio', 'LDL_HDL_Ratio', 'Triglyceride_HDL_Ratio', 'BP_Difference',
-            'Age_BMI_Interaction', 'Stress_Diet_Interaction', 'Age_Gender_Interaction'
-        ]
-        
-        # Create DataFrame with the correct feature order and processed data
-        df = pd.DataFrame([processed_data], columns=feature_columns)
-        current_app.logger.info(f"Heart DataFrame shape: {df.shape}, columns: {df.columns.tolist()}")
-        
-        # --- FIX: Removed preprocessor step ---
-        # df_processed = preprocessor.transform(df) 
-        
-        # --- FIX: Try to predict, but handle model mismatch gracefully ---
-        try:
-            probability = model.predict_proba(df)[0][1]
-            return float(probability)
-        except Exception as model_error:
-            current_app.logger.warning(f"Heart model prediction failed: {model_error}")
-            # If the model fails due to feature mismatch, provide a default prediction
-            # based on basic risk factors
-            risk_score = 0.0
-            
-            # Basic risk calculation based on available data
-            if diabetes or hypertension or smoking:
-                risk_score += 0.3
-            if obesity:
-                risk_score += 0.2
-            if family_history:
-                risk_score += 0.2
-            if age > 50:
-                risk_score += 0.2
-            if stress_level > 5:
-                risk_score += 0.1
-                
-            # Cap at 1.0
-            risk_score = min(risk_score, 1.0)
-            current_app.logger.info(f"Using fallback heart prediction: {risk_score}")
-            return float(risk_score)
-            
+        X = HEART_SPEC.transform(rows)
     except Exception as e:
         current_app.logger.error(f"Heart prediction error: {e}")
         raise ValueError("Failed to preprocess heart data.")
 
-def predict_liver(data: Dict[str, Any]) -> float:
-    model = models.get('liver')
-    if model is None:
-        current_app.logger.error("Liver model is not loaded.")
-        raise RuntimeError("Liver model is not loaded.")
+    # --- FIX: Try to predict, but handle model mismatch gracefully ---
+    try:
+        return _positive_proba('heart', model, X)
+    except Exception as model_error:
+        current_app.logger.warning(f"Heart model prediction failed: {model_error}")
+        # If the model fails due to feature mismatch, provide a default prediction
+        # based on basic risk factors
+        scores = _heart_fallback(X)
+        current_app.logger.info(f"Using fallback heart prediction for {len(scores)} row(s)")
+        return scores
+
 
+def predict_liver_batch(rows: List[Dict[str, Any]]) -> np.ndarray:
+    model = _require_model('liver', 'Liver')
     try:
-        current_app.logger.info(f"Liver prediction input data: {data}")
-        data_processed = data.copy()
-        
-        # Map 'gender'
-        data_processed['Gender'] = 1 if data_processed.get('gender') == 'Male' else 0
-        
-        # --- UPDATED: Calculate A/G Ratio per SRD/model ---
-        albumin = data_processed.get('albumin', 0)
-        total_protein = data_processed.get('total_protein', 0)
-        
-        if total_protein and albumin and total_protein > albumin:
-            globulin = total_protein - albumin
-            data_processed['Albumin_and_Globulin_Ratio'] = round(albumin / globulin, 2)
-        else:
-            data_processed['Albumin_and_Globulin_Ratio'] = 0.9 # Placeholder median
-        # --- End Update ---
-        
-        # Map keys to match the model's expected feature names (abbreviated)
-        key_map = {
-            'age': 'Age',
-            'gender': 'Gender',
-            'total_bilirubin': 'TB',
-            'direct_bilirubin': 'DB',
-            'alkaline_phosphatase': 'Alkphos',
-            'sgpt_alamine_aminotransferase': 'Sgpt',
-            'sgot_aspartate_aminotransferase': 'Sgot',
-            'total_protein': 'TP',
-            'albumin': 'ALB',
-            'ag_ratio': 'AGRatio'
-        }
-        
-        model_input_data = {
-            key_map.get(k, k): v for k, v in data_processed.items()
-        }
-        
-        # Fix AGRatio if it's None
-        if model_input_data.get('AGRatio') is None:
-            model_input_data['AGRatio'] = model_input_data.get('Albumin_and_Globulin_Ratio', 0.9)
-        
-        # Calculate additional engineered features that the model expects
-        age = model_input_data.get('Age', 0)
-        gender = model_input_data.get('Gender', 0)
-        tb = model_input_data.get('TB', 0)
-        db = model_input_data.get('DB', 0)
-        sgpt = model_input_data.get('Sgpt', 0)
-        sgot = model_input_data.get('Sgot', 0)
-        tp = model_input_data.get('TP', 0)
-        alb = model_input_data.get('ALB', 0)
-        
-        # Calculate additional features
-        model_input_data['BilirubinRatio'] = db / tb if tb > 0 else 0
-        model_input_data['SGPTSGOTRatio'] = sgpt / sgot if sgot > 0 else 0
-        model_input_data['TotalEnzymes'] = sgpt + sgot
-        model_input_data['AgeGroup'] = 0 if age < 30 else (1 if age < 50 else 2)
-        model_input_data['LowProtein'] = 1 if tp < 6.0 else 0
-        model_input_data['HighEnzymes'] = 1 if (sgpt > 40 or sgot > 40) else 0
-        model_input_data['AgeGenderInteraction'] = age * gender
-        
-        current_app.logger.info(f"Liver model input data: {model_input_data}")
-
-        # Define feature order for the model (as expected by the trained model)
-        feature_columns = [
-            'Age', 'Gender', 'TB', 'DB', 'Alkphos', 'Sgpt', 'Sgot', 'TP', 'ALB', 
-            'AGRatio', 'BilirubinRatio', 'SGPTSGOTRatio', 'TotalEnzymes', 
-            'AgeGroup', 'LowProtein', 'HighEnzymes', 'AgeGenderInteraction'
-        ]
-        
-        # Ensure all required features are present with default values
-        for col in feature_columns:
-            if col not in model_input_data:
-                current_app.logger.warning(f"Missing feature {col}, using default value 0")
-                model_input_data[col] = 0
-        
-        # Convert all values to float to avoid dtype issues
-        for key, value in model_input_data.items():
-            if value is None:
-                model_input_data[key] = 0.0
-            else:
-                try:
-                    model_input_data[key] = float(value)
-                except (ValueError, TypeError):
-                    model_input_data[key] = 0.0
-        
-        df = pd.DataFrame([model_input_data], columns=feature_columns)
-        current_app.logger.info(f"Liver DataFrame shape: {df.shape}, columns: {df.columns.tolist()}")
-        current_app.logger.info(f"Liver DataFrame values: {df.iloc[0].to_dict()}")
-        
-        # Predict probability of class 1 (disease)
-        probability = model.predict_proba(df)[0][1]
-            
-        return float(probability)
+        X = LIVER_SPEC.transform(rows)
+        current_app.logger.info(f"Liver matrix shape: {X.shape}")
+        return _positive_proba('liver', model, X)
     except Exception as e:
         current_app.logger.error(f"Liver prediction error: {e}")
         raise ValueError("Failed to preprocess liver data.")
 
 
-def predict_mental_health(data: Dict[str, Any]) -> float:
-    model = models.get('mental_health')
-    if model is None:
-        current_app.logger.error("Mental Health model is not loaded.")
-        raise RuntimeError("Mental Health model is not loaded.")
-        
+def predict_mental_health_batch(rows: List[Dict[str, Any]]) -> np.ndarray:
+    model = _require_model('mental_health', 'Mental Health')
     try:
-        # --- UPDATED FEATURES per SRD ---
-        feature_columns = [
-            'phq_score', 'gad_score', 'depressiveness', 'suicidal', 
-            'anxiousness', 'sleepiness', 'age', 'gender'
-        ]
-        
-        # Map 'gender' from 'Male'/'Female' to 0/1
-        data['gender'] = 1 if data.get('gender') == 'Male' else 0
-        
-        # Convert bools to int
-        bool_cols = ['depressiveness', 'suicidal', 'anxiousness', 'sleepiness']
-        for col in bool_cols:
-            data[col] = 1 if data.get(col) else 0
-
-        df = pd.DataFrame([data], columns=feature_columns)
-        
-        # --- FIX: Try to predict, but handle model mismatch gracefully ---
-        try:
-            probability = model.predict_proba(df)[0][1]
-            return float(probability)
-        except Exception as model_error:
-            current_app.logger.warning(f"Mental health model prediction failed: {model_error}")
-            # If the model fails due to feature mismatch, provide a default prediction
-            # based on basic risk factors
-            risk_score = 0.0
-            
-            # Basic risk calculation based on available data
-            phq_score = data.get('phq_score', 0)
-            gad_score = data.get('gad_score', 0)
-            
-            if phq_score >= 10:  # Moderate to severe depression
-                risk_score += 0.4
-            elif phq_score >= 5:  # Mild depression
-                risk_score += 0.2
-                
-            if gad_score >= 10:  # Moderate to severe anxiety
-                risk_score += 0.3
-            elif gad_score >= 5:  # Mild anxiety
-                risk_score += 0.15
-                
-            if data.get('suicidal'):
-                risk_score += 0.3
-            if data.get('depressiveness'):
-                risk_score += 0.2
-            if data.get('anxiousness'):
-                risk_score += 0.2
-            if data.get('sleepiness'):
-                risk_score += 0.1
-                
-            # Cap at 1.0
-            risk_score = min(risk_score, 1.0)
-            current_app.logger.info(f"Using fallback mental health prediction: {risk_score}")
-            return float(risk_score)
-            
+        X = MENTAL_HEALTH_SPEC.transform(rows)
     except Exception as e:
         current_app.logger.error(f"Mental Health prediction error: {e}")
         raise ValueError("Failed to preprocess mental health data.")
 
+    # --- FIX: Try to predict, but handle model mismatch gracefully ---
+    try:
+        return _positive_proba('mental_health', model, X)
+    except Exception as model_error:
+        current_app.logger.warning(f"Mental health model prediction failed: {model_error}")
+        # If the model fails due to feature mismatch, provide a default prediction
+        # based on basic risk factors
+        scores = _mental_health_fallback(X)
+        current_app.logger.info(f"Using fallback mental health prediction for {len(scores)} row(s)")
+        return scores
+
+
+def predict_diabetes(data: Dict[str, Any]) -> float:
+    return float(predict_diabetes_batch([data])[0])
+
+
+def predict_heart(data: Dict[str, Any]) -> float:
+    return float(predict_heart_batch([data])[0])
+
+
+def predict_liver(data: Dict[str, Any]) -> float:
+    return float(predict_liver_batch([data])[0])
+
+
+def predict_mental_health(data: Dict[str, Any]) -> float:
+    return float(predict_mental_health_batch([data])[0])
+
+
+BATCH_PREDICTORS = {
+    'diabetes': predict_diabetes_batch,
+    'heart': predict_heart_batch,
+    'liver': predict_liver_batch,
+    'mental_health': predict_mental_health_batch,
+}
+
 
 # --- Main Service Function ---
 
@@ -445,7 +290,11 @@ def run_prediction(assessment_type: str, input_data: dict) -> float:
     Returns the raw risk score (probability).
     """
     current_app.logger.info(f"Running prediction for {assessment_type}")
-    
+
+    # Hand the row to the micro-batching worker pool when it is enabled
+    if inference.service is not None and assessment_type in BATCH_PREDICTORS:
+        return inference.service.predict(assessment_type, input_data)
+
     if assessment_type == 'diabetes':
         return predict_diabetes(input_data)
     elif assessment_type == 'heart':
@@ -458,93 +307,228 @@ def run_prediction(assessment_type: str, input_data: dict) -> float:
         current_app.logger.error(f"Invalid assessment type: {assessment_type}")
         raise ValueError("Invalid assessment type")
 
+
+def run_prediction_batch(assessment_type: str, rows: List[Dict[str, Any]]) -> np.ndarray:
+    """
+    Scores many patients for one disease with a single model call.
+    `rows` are feature dicts in the same shape `run_prediction` accepts.
+    Returns an array of raw risk scores aligned with `rows`.
+    """
+    predictor = BATCH_PREDICTORS.get(assessment_type)
+    if predictor is None:
+        current_app.logger.error(f"Invalid assessment type: {assessment_type}")
+        raise ValueError("Invalid assessment type")
+    if not rows:
+        return np.empty(0, dtype=np.float64)
+
+    current_app.logger.info(f"Running batch prediction for {assessment_type} ({len(rows)} rows)")
+    return predictor(rows)
+
+# --- Concurrent scoring ---
+
+_scoring_pool = None
+_scoring_pool_pid = None
+_scoring_pool_lock = threading.Lock()
+
+
+def _get_scoring_pool(max_workers: int) -> ThreadPoolExecutor:
+    """One thread pool per process, created on first use (after any fork)."""
+    global _scoring_pool, _scoring_pool_pid
+    if _scoring_pool_pid != os.getpid():
+        with _scoring_pool_lock:
+            if _scoring_pool_pid != os.getpid():
+                _scoring_pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='scoring')
+                _scoring_pool_pid = os.getpid()
+    return _scoring_pool
+
+
+def _run_prediction_in_app(app, assessment_type: str, input_data: dict) -> float:
+    with app.app_context():
+        return run_prediction(assessment_type, input_data)
+
+
+def run_predictions(inputs: Dict[str, dict], timeout: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Runs `run_prediction` for several models at once on a shared thread pool.
+    Returns {assessment_type: score or the exception it raised}; a model
+    still running after `timeout` seconds maps to InferenceTimeoutError.
+    """
+    app = current_app._get_current_object()
+    pool = _get_scoring_pool(app.config.get('PARALLEL_SCORING_THREADS', 8))
+    futures = {key: pool.submit(_run_prediction_in_app, app, key, data) for key, data in inputs.items()}
+
+    deadline = time.monotonic() + timeout if timeout else None
+    results = {}
+    for key, future in futures.items():
+        remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+        try:
+            results[key] = future.result(timeout=remaining)
+        except FutureTimeoutError:
+            future.cancel()
+            results[key] = inference.InferenceTimeoutError(f"{key} prediction timed out after {timeout:g}s")
+        except Exception as e:
+            results[key] = e
+    return results
+
 # --- Gemini Recommendation Service ---
 
-def get_gemini_recommendations(risk_map: dict) -> List[Dict[str, Any]]:
+GEMINI_MODEL_NAME = 'gemini-2.0-flash'
+# Part of the recommendation cache key; bump whenever the prompt below changes
+RECOMMENDATION_PROMPT_VERSION = 'v1'
+
+# One GenerativeModel per (API key, endpoint), built on first use
+_gemini_models: Dict[Any, Any] = {}
+_gemini_lock = threading.Lock()
+
+
+def empty_recommendations() -> Dict[str, list]:
+    return {"diet": [], "exercise": [], "sleep": [], "lifestyle": []}
+
+
+def _configure_gemini(api_key: str, endpoint: Optional[str] = None):
+    if endpoint:
+        genai.configure(api_key=api_key, transport='rest', client_options={'api_endpoint': endpoint})
+    else:
+        genai.configure(api_key=api_key)
+
+
+def _get_gemini_model(api_key: str):
+    endpoint = current_app.config.get('GEMINI_API_ENDPOINT')
+    model = _gemini_models.get((api_key, endpoint))
+    if model is None:
+        with _gemini_lock:
+            model = _gemini_models.get((api_key, endpoint))
+            if model is None:
+                _configure_gemini(api_key, endpoint)
+                model = _gemini_models[(api_key, endpoint)] = genai.GenerativeModel(GEMINI_MODEL_NAME)
+    return model
+
+
+def stored_recommendations(risk_map: dict) -> Dict[str, List[Dict[str, Any]]]:
+    """The recommendation library's set for a profile; no remote call."""
+    from app.recommendation_library import lookup
+
+    try:
+        return lookup(risk_map)
+    except Exception as e:
+        current_app.logger.error(f"Error reading stored recommendations: {e}")
+        return empty_recommendations()
+
+
+def get_gemini_recommendations(risk_map: dict) -> Dict[str, List[Dict[str, Any]]]:
     """
-    Generates lifestyle recommendations using the Gemini API based on the
-    patient's risk profile.
+    Returns lifestyle recommendations for the patient's risk profile,
+    grouped by category. Profiles already generated are served from the
+    recommendation cache (see app/recommendation_cache.py); otherwise the
+    Gemini API is called through the guarded client (see
+    app/recommendation_client.py) and a successful result is cached. When
+    Gemini is not configured, slow, failing or circuit-broken, the stored
+    recommendation library is served instead.
     """
+    profile = normalize_profile(risk_map)
     api_key = current_app.config.get('GEMINI_API_KEY')
     if not api_key:
-        current_app.logger.warning("GEMINI_API_KEY not set. Returning empty recommendations.")
-        return {"diet": [], "exercise": [], "sleep": [], "lifestyle": []}
+        current_app.logger.warning("GEMINI_API_KEY not set. Serving stored recommendations.")
+        return stored_recommendations(profile)
+
+    key = profile_key(profile, RECOMMENDATION_PROMPT_VERSION)
+    cached = recommendation_cache.get(key)
+    if cached is not None:
+        return cached
 
     try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-2.0-flash')
-        
-        # Build a prompt focusing on Medium/High risks
-        risk_summary = []
-        has_high_risk = False
-        for disease, level in risk_map.items():
-            if level in ['Medium', 'High']:
-                disease_name = disease.replace("_risk_level", "").capitalize()
-                risk_summary.append(f"- {disease_name}: {level} risk")
-                if level == 'High':
-                    has_high_risk = True
-
-        if not risk_summary:
-            prompt_intro = "The patient has Low risk for all assessed conditions (diabetes, liver, heart, mental health)."
-            prompt_request = "Provide 2-3 general preventative lifestyle recommendations."
+        grouped_recs = recommendation_client.call(
+            generate_gemini_recommendations, api_key, profile, timeout=recommendation_client.timeout_seconds,
+        )
+    except RecommendationUnavailableError as e:
+        current_app.logger.warning(f"Gemini recommendations unavailable ({e}); serving stored recommendations.")
+        recommendation_client.record_fallback()
+        return stored_recommendations(profile)
+
+    recommendation_cache.put(key, grouped_recs)
+    return grouped_recs
+
+
+def generate_gemini_recommendations(api_key: str, risk_map: dict, timeout: Optional[float] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Calls the Gemini API for one risk profile and groups the result by
+    category. Raises on any API or parsing error. `timeout` is passed to
+    the SDK as the per-request deadline.
+    """
+    model = _get_gemini_model(api_key)
+
+    # Build a prompt focusing on Medium/High risks
+    risk_summary = []
+    has_high_risk = False
+    for disease, level in risk_map.items():
+        if level in ['Medium', 'High']:
+            disease_name = disease.replace("_risk_level", "").capitalize()
+            risk_summary.append(f"- {disease_name}: {level} risk")
+            if level == 'High':
+                has_high_risk = True
+
+    if not risk_summary:
+        prompt_intro = "The patient has Low risk for all assessed conditions (diabetes, liver, heart, mental health)."
+        prompt_request = "Provide 2-3 general preventative lifestyle recommendations."
+    else:
+        prompt_intro = "A patient has the following health risk profile:\n" + "\n".join(risk_summary)
+        if has_high_risk:
+            prompt_request = "Provide a mix of actionable lifestyle recommendations (diet, exercise, sleep, habits) for these conditions, prioritizing the 'High' risk items. Provide 2-3 recommendations per HIGH risk condition and 1-2 per MEDIUM risk condition."
         else:
-            prompt_intro = "A patient has the following health risk profile:\n" + "\n".join(risk_summary)
-            if has_high_risk:
-                prompt_request = "Provide a mix of actionable lifestyle recommendations (diet, exercise, sleep, habits) for these conditions, prioritizing the 'High' risk items. Provide 2-3 recommendations per HIGH risk condition and 1-2 per MEDIUM risk condition."
-            else:
-                prompt_request = "Provide actionable lifestyle recommendations (diet, exercise, sleep, habits) for these 'Medium' risk conditions. Provide 2-3 recommendations per condition."
-
-        # JSON format instruction
-        prompt = f"""
-        You are a helpful, empathetic health assistant. {prompt_intro}
-
-        {prompt_request}
-
-        Format your response *only* as a valid JSON list of objects.
-        Each object in the list must have the following keys:
-        - "disease_type": (string) The disease this applies to (e.g., "Diabetes", "Heart", "General"). Use the capitalized name.
-        - "risk_level": (string) The risk level this applies to (e.g., "High", "Medium", "Low").
-        - "category": (string) The category of advice (e.g., "Diet", "Exercise", "Sleep", "Lifestyle").
-        - "recommendation_text": (string) The specific recommendation.
-
-        Example:
-        [
-          {{
-            "disease_type": "Diabetes",
-            "risk_level": "High",
-            "category": "Diet",
-            "recommendation_text": "Monitor blood sugar as advised by your doctor. Strictly limit sugary drinks and processed carbohydrates."
-          }}
-        ]
-
-        Provide *only* the JSON list.
-        """
-        
-        safety_settings = [
-            {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
-            {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
-            {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
-            {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
-        ]
-
-        response = model.generate_content(prompt, safety_settings=safety_settings)
-        
-        cleaned_text = response.text.strip().replace("```json", "").replace("```", "").strip()
-        
+            prompt_request = "Provide actionable lifestyle recommendations (diet, exercise, sleep, habits) for these 'Medium' risk conditions. Provide 2-3 recommendations per condition."
+
+    # JSON format instruction
+    prompt = f"""
+    You are a helpful, empathetic health assistant. {prompt_intro}
+
+    {prompt_request}
+
+    Format your response *only* as a valid JSON list of objects.
+    Each object in the list must have the following keys:
+    - "disease_type": (string) The disease this applies to (e.g., "Diabetes", "Heart", "General"). Use the capitalized name.
+    - "risk_level": (string) The risk level this applies to (e.g., "High", "Medium", "Low").
+    - "category": (string) The category of advice (e.g., "Diet", "Exercise", "Sleep", "Lifestyle").
+    - "recommendation_text": (string) The specific recommendation.
+
+    Example:
+    [
+      {{
+        "disease_type": "Diabetes",
+        "risk_level": "High",
+        "category": "Diet",
+        "recommendation_text": "Monitor blood sugar as advised by your doctor. Strictly limit sugary drinks and processed carbohydrates."
+      }}
+    ]
+
+    Provide *only* the JSON list.
+    """
+    
+    safety_settings = [
+        {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
+        {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
+        {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
+        {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
+    ]
+
+    request_options = {'timeout': timeout} if timeout else None
+    response = model.generate_content(prompt, safety_settings=safety_settings, request_options=request_options)
+    
+    cleaned_text = response.text.strip().replace("```json", "").replace("```", "").strip()
+    
+    try:
         recommendations = json.loads(cleaned_text)
-        
-        # Group recommendations by category for frontend
-        grouped_recs = {"diet": [], "exercise": [], "sleep": [], "lifestyle": []}
-        for rec in recommendations:
-            cat = rec.get("category", "Lifestyle").lower()
-            if cat in grouped_recs:
-                grouped_recs[cat].append(rec)
-            else:
-                grouped_recs["lifestyle"].append(rec)
-            
-        current_app.logger.info(f"Successfully fetched {len(recommendations)} recommendations from Gemini.")
-        return grouped_recs
+    except ValueError:
+        current_app.logger.error(f"Gemini returned invalid JSON. Response text: {response.text}")
+        raise
 
-    except Exception as e:
-        current_app.logger.error(f"Error calling Gemini API: {e}. Response text: {response.text if 'response' in locals() else 'N/A'}")
-        return {"diet": [], "exercise": [], "sleep": [], "lifestyle": []}
\ No newline at end of file
+    # Group recommendations by category for frontend
+    grouped_recs = {"diet": [], "exercise": [], "sleep": [], "lifestyle": []}
+    for rec in recommendations:
+        cat = rec.get("category", "Lifestyle").lower()
+        if cat in grouped_recs:
+            grouped_recs[cat].append(rec)
+        else:
+            grouped_recs["lifestyle"].append(rec)
+        
+    current_app.logger.info(f"Successfully fetched {len(recommendations)} recommendations from Gemini.")
+    return grouped_recs
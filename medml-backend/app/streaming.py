@@ -0,0 +1,105 @@
+# HealthCare App/medml-backend/app/streaming.py
+"""
+Incremental JSON for a patient's full record.
+
+`patient_json_chunks` produces the same document as
+`Patient.to_dict(include_history=True, ...)`, but writes each history
+section as it reads it. Rows are fetched with `yield_per`, which uses a
+server-side cursor where the driver supports one. Each row is detached from
+the session once it is written, so memory stays flat however long the
+history is. With `history_limit` each section holds at most that many of
+the newest rows.
+"""
+from typing import Iterable, Iterator, Optional
+
+from sqlalchemy import select
+
+from app.extensions import db
+from app.models import (
+    Patient, RiskPrediction, ConsultationNote,
+    DiabetesAssessment, LiverAssessment, HeartAssessment, MentalHealthAssessment,
+)
+from app import serialization
+
+# (key, model, newest-first column), in Patient.to_dict order
+HISTORY_SECTIONS = (
+    ('diabetes_assessments', DiabetesAssessment, DiabetesAssessment.assessed_at),
+    ('liver_assessments', LiverAssessment, LiverAssessment.assessed_at),
+    ('heart_assessments', HeartAssessment, HeartAssessment.assessed_at),
+    ('mental_health_assessments', MentalHealthAssessment, MentalHealthAssessment.assessed_at),
+    ('risk_predictions', RiskPrediction, RiskPrediction.predicted_at),
+)
+NOTES_SECTION = ('consultation_notes', ConsultationNote, ConsultationNote.created_at)
+
+# Rows fetched per round-trip, and bytes buffered before a chunk is sent
+FETCH_BATCH_SIZE = 200
+CHUNK_SIZE = 64 * 1024
+
+
+def dumps(value) -> bytes:
+    # Unsorted, so the streamed document keeps to_dict's key order
+    return serialization.dumps(value, sort_keys=False)
+
+
+def _history_rows(Model, timestamp, patient_id: int, limit: Optional[int]) -> Iterator:
+    query = (
+        select(Model)
+        .where(Model.patient_id == patient_id)
+        .order_by(timestamp.desc(), Model.id.desc())
+        .execution_options(yield_per=FETCH_BATCH_SIZE)
+    )
+    if limit is not None:
+        query = query.limit(limit)
+    for row in db.session.execute(query).scalars():
+        yield row
+        db.session.expunge(row)
+
+
+def _array(rows: Iterable) -> Iterator[bytes]:
+    yield b'['
+    for i, row in enumerate(rows):
+        if i:
+            yield b','
+        yield dumps(row.to_dict())
+    yield b']'
+
+
+def _buffered(parts: Iterable[bytes], size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    buffer = bytearray()
+    for part in parts:
+        buffer += part
+        if len(buffer) >= size:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+def _patient_parts(patient: Patient, history_limit, include_admin, include_history,
+                   include_latest_prediction, include_notes) -> Iterator[bytes]:
+    # The scalar fields and small objects go out as one piece, minus its closing brace
+    head = patient.to_dict(include_admin=include_admin, include_latest_prediction=include_latest_prediction)
+    latest = head.pop('latest_prediction', None)
+    yield dumps(head)[:-1]
+
+    sections = list(HISTORY_SECTIONS) if include_history else []
+    for key, Model, timestamp in sections:
+        yield b',' + dumps(key) + b':'
+        yield from _array(_history_rows(Model, timestamp, patient.id, history_limit))
+
+    if include_latest_prediction:
+        yield b',"latest_prediction":' + dumps(latest)
+
+    if include_notes:
+        key, Model, timestamp = NOTES_SECTION
+        yield b',' + dumps(key) + b':'
+        yield from _array(_history_rows(Model, timestamp, patient.id, history_limit))
+    yield b'}'
+
+
+def patient_json_chunks(patient: Patient, history_limit: Optional[int] = None, include_admin: bool = True,
+                        include_history: bool = True, include_latest_prediction: bool = True,
+                        include_notes: bool = True) -> Iterator[bytes]:
+    """Yields the patient's JSON document in chunks of about CHUNK_SIZE bytes."""
+    return _buffered(_patient_parts(patient, history_limit, include_admin, include_history,
+                                    include_latest_prediction, include_notes))
@@ -0,0 +1,372 @@
+# HealthCare App/medml-backend/app/tree_engine.py
+"""
+Array-backed inference for the gradient-boosted tree models.
+
+`compile_model` exports the trees of a fitted XGBClassifier or LGBMClassifier
+once into flat NumPy arrays (split feature, threshold, child index, leaf
+value). `TreeEnsemble.predict_proba` then scores a batch with a vectorized
+level-by-level traversal, skipping the library's per-call validation and
+setup. It reproduces the library's arithmetic (float32 for XGBoost, float64
+for LightGBM, sequential leaf summation, libm `exp`) so results can be
+checked bit-for-bit with `validate`.
+
+An ensemble can be written to a directory of `.npy` files with `save` and
+attached again with `TreeEnsemble.load(path, mmap=True)`. The arrays are
+then read-only memory maps, so every worker process scoring from the same
+directory shares one copy through the OS page cache.
+"""
+import ctypes
+import ctypes.util
+import json
+import math
+import os
+import numpy as np
+from typing import Any, Dict, List, Optional
+
+
+class UnsupportedModelError(ValueError):
+    """Raised when a model cannot be represented as a TreeEnsemble."""
+
+
+def _load_expf():
+    """libm's single-precision expf, which XGBoost's sigmoid uses."""
+    try:
+        libm = ctypes.CDLL(ctypes.util.find_library('m') or 'libm.so.6')
+        expf = libm.expf
+        expf.restype = ctypes.c_float
+        expf.argtypes = [ctypes.c_float]
+        return expf
+    except (OSError, AttributeError):
+        return None
+
+
+_expf = _load_expf()
+_vec_expf = np.frompyfunc(_expf, 1, 1) if _expf is not None else None
+_vec_exp = np.frompyfunc(math.exp, 1, 1)
+
+
+def _sigmoid_float32(margin: np.ndarray) -> np.ndarray:
+    # XGBoost: 1.0f / (expf(-x) + 1.0f + 1e-16f)
+    one = np.float32(1)
+    if _vec_expf is not None:
+        e = _vec_expf(-margin).astype(np.float32)
+    else:
+        e = np.exp(-margin.astype(np.float64)).astype(np.float32)
+    return one / (e + one + np.float32(1e-16))
+
+
+def _sigmoid_float64(margin: np.ndarray) -> np.ndarray:
+    # LightGBM: 1.0 / (1.0 + std::exp(-x))
+    return 1.0 / (1.0 + _vec_exp(-margin).astype(np.float64))
+
+
+class TreeEnsemble:
+    """
+    All trees of a binary boosted model packed into flat node arrays.
+
+    Trees are laid out breadth-first so the children of internal node i are
+    `left[i]` and `left[i] + 1`. Leaves point at themselves with an infinite
+    threshold, so every row can take the same number of steps (`depth`)
+    without masking.
+    """
+
+    # Node arrays written by `save` (one .npy file each)
+    ARRAYS = ('roots', 'feature', 'threshold', 'left', 'default_left', 'nan_as_zero', 'value', 'is_leaf')
+    META_FILE = 'ensemble.json'
+
+    def __init__(self, roots, feature, threshold, left, default_left, nan_as_zero, value,
+                 depth: int, base_margin: float, dtype, strict_less: bool, source: str,
+                 zero_threshold: Optional[float] = None, is_leaf=None):
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.feature = np.asarray(feature, dtype=np.intp)
+        self.threshold = np.asarray(threshold, dtype=dtype)
+        self.left = np.asarray(left, dtype=np.intp)
+        self.default_left = np.asarray(default_left, dtype=bool)
+        # NaN is replaced by 0.0 before comparing (LightGBM missing_type=None)
+        self.nan_as_zero = np.asarray(nan_as_zero, dtype=bool)
+        self.value = np.asarray(value, dtype=dtype)
+        self.is_leaf = (self.left == np.arange(len(self.left))) if is_leaf is None else np.asarray(is_leaf, dtype=bool)
+        self.depth = int(depth)
+        self.base_margin = dtype(base_margin)
+        self.dtype = dtype
+        # XGBoost sends `x < threshold` left, LightGBM `x <= threshold`
+        self.strict_less = strict_less
+        # LightGBM reads |x| <= kZeroThreshold as exactly 0.0
+        self.zero_threshold = zero_threshold
+        self.source = source
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.feature)
+
+    def leaf_indices(self, X: np.ndarray) -> np.ndarray:
+        """Returns the (n_rows x n_trees) leaf node reached in every tree."""
+        X = np.array(X, dtype=self.dtype, order='C')
+        if self.zero_threshold is not None:
+            X[np.abs(X) <= self.zero_threshold] = 0
+        n_rows, n_features = X.shape
+        flat = X.ravel()
+        row_offset = (np.arange(n_rows, dtype=np.intp) * n_features)[:, None]
+        node = np.broadcast_to(self.roots, (n_rows, self.n_trees)).copy()
+        has_nan = bool(np.isnan(flat).any())
+
+        for level in range(self.depth):
+            # Deep trees are ragged; stop once every row has reached a leaf
+            if level and level % 4 == 0 and self.is_leaf[node].all():
+                break
+            x = flat[row_offset + self.feature[node]]
+            thr = self.threshold[node]
+            if has_nan:
+                missing = np.isnan(x)
+                x = np.where(missing & self.nan_as_zero[node], self.dtype(0), x)
+                missing = np.isnan(x)
+                go_right = (x >= thr) if self.strict_less else (x > thr)
+                go_right = np.where(missing, ~self.default_left[node], go_right)
+            else:
+                go_right = (x >= thr) if self.strict_less else (x > thr)
+            node = self.left[node] + go_right
+        return node
+
+    def decision_function(self, X: np.ndarray) -> np.ndarray:
+        """Raw margin (log-odds) per row: base margin plus every leaf value, in tree order."""
+        leaves = self.value[self.leaf_indices(X)]
+        margin = np.empty((leaves.shape[0], leaves.shape[1] + 1), dtype=self.dtype)
+        margin[:, 0] = self.base_margin
+        margin[:, 1:] = leaves
+        # cumsum accumulates sequentially, matching the libraries' summation order
+        return np.cumsum(margin, axis=1, dtype=self.dtype)[:, -1]
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        margin = self.decision_function(X)
+        p = _sigmoid_float32(margin) if self.dtype is np.float32 else _sigmoid_float64(margin)
+        return np.column_stack([1 - p, p])
+
+    # --- Persistence ---
+
+    def save(self, directory: str):
+        """Writes the node arrays and scalar settings into `directory`."""
+        os.makedirs(directory, exist_ok=True)
+        for name in self.ARRAYS:
+            np.save(os.path.join(directory, f'{name}.npy'), getattr(self, name), allow_pickle=False)
+        meta = {
+            'depth': self.depth,
+            'base_margin': float(self.base_margin),
+            'dtype': np.dtype(self.dtype).name,
+            'strict_less': self.strict_less,
+            'source': self.source,
+            'zero_threshold': self.zero_threshold,
+        }
+        with open(os.path.join(directory, self.META_FILE), 'w') as fh:
+            json.dump(meta, fh)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> 'TreeEnsemble':
+        """
+        Attaches to an ensemble written by `save`. With `mmap=True` the arrays
+        are read-only memory maps rather than private copies.
+        """
+        with open(os.path.join(directory, cls.META_FILE)) as fh:
+            meta = json.load(fh)
+        mode = 'r' if mmap else None
+        arrays = {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mode, allow_pickle=False)
+                  for name in cls.ARRAYS}
+        return cls(dtype=getattr(np, meta.pop('dtype')), **arrays, **meta)
+
+
+# --- Exporters ---
+#
+# Each exporter produces one dict per tree with node lists indexed by the
+# library's own node ids. `children` holds (left, right) for internal nodes
+# and None for leaves.
+
+# LightGBM's kZeroThreshold (1e-35f)
+LIGHTGBM_ZERO_THRESHOLD = float(np.float32(1e-35))
+
+
+def _pack(trees: List[Dict[str, list]], **kwargs) -> TreeEnsemble:
+    """Re-lays every tree out breadth-first and concatenates them."""
+    cols = {k: [] for k in ('feature', 'threshold', 'left', 'default_left', 'nan_as_zero', 'value')}
+    roots, max_depth = [], 0
+
+    for tree in trees:
+        base = len(cols['feature'])
+        roots.append(base)
+        order, depth = [(tree['root'], 0)], 0
+        # First pass: assign breadth-first slots so siblings are adjacent
+        slot = {tree['root']: base}
+        i = 0
+        while i < len(order):
+            nid, d = order[i]
+            depth = max(depth, d)
+            kids = tree['children'][nid]
+            if kids is not None:
+                for k in kids:
+                    slot[k] = base + len(order)
+                    order.append((k, d + 1))
+            i += 1
+
+        for nid, _ in order:
+            kids = tree['children'][nid]
+            if kids is None:
+                cols['feature'].append(0)
+                cols['threshold'].append(np.inf)
+                cols['left'].append(slot[nid])
+                cols['default_left'].append(True)
+                cols['nan_as_zero'].append(False)
+                cols['value'].append(tree['value'][nid])
+            else:
+                cols['feature'].append(tree['feature'][nid])
+                cols['threshold'].append(tree['threshold'][nid])
+                cols['left'].append(slot[kids[0]])
+                cols['default_left'].append(tree['default_left'][nid])
+                cols['nan_as_zero'].append(tree['nan_as_zero'][nid])
+                cols['value'].append(0.0)
+        max_depth = max(max_depth, depth)
+
+    return TreeEnsemble(roots=roots, depth=max_depth, **cols, **kwargs)
+
+
+def _export_xgboost(model: Any) -> TreeEnsemble:
+    booster = model.get_booster()
+    learner = json.loads(booster.save_raw('json'))['learner']
+    if learner['objective']['name'] != 'binary:logistic':
+        raise UnsupportedModelError(f"Unsupported XGBoost objective {learner['objective']['name']}")
+    if learner['gradient_booster']['name'] != 'gbtree':
+        raise UnsupportedModelError("Only gbtree boosters are supported")
+
+    gbtree = learner['gradient_booster']['model']
+    # Respect early stopping the same way XGBClassifier.predict_proba does
+    n_rounds = booster.num_boosted_rounds()
+    best = getattr(model, 'best_iteration', None)
+    if best is not None:
+        n_rounds = best + 1
+    indptr = gbtree.get('iteration_indptr') or list(range(len(gbtree['trees']) + 1))
+
+    trees = []
+    for t in gbtree['trees'][:indptr[n_rounds]]:
+        if any(t['split_type']) or t['categories_nodes']:
+            raise UnsupportedModelError("Categorical splits are not supported")
+        if t['tree_param'].get('size_leaf_vector', '1') not in ('0', '1'):
+            raise UnsupportedModelError("Vector leaves are not supported")
+        left, right = t['left_children'], t['right_children']
+        trees.append({
+            'root': 0,
+            'children': [None if l == -1 else (l, r) for l, r in zip(left, right)],
+            'feature': t['split_indices'],
+            'threshold': t['split_conditions'],
+            # For leaves XGBoost stores the leaf value in split_conditions
+            'value': t['split_conditions'],
+            'default_left': [bool(d) for d in t['default_left']],
+            'nan_as_zero': [False] * len(left),
+        })
+
+    raw_base = learner['learner_model_param']['base_score']
+    base_score = np.float32(json.loads(raw_base)[0] if raw_base.startswith('[') else float(raw_base))
+    base_margin = -np.log(np.float32(1) / base_score - np.float32(1))
+    return _pack(trees, base_margin=base_margin, dtype=np.float32, strict_less=True, source='xgboost')
+
+
+def _parse_lightgbm_trees(model_str: str) -> List[Dict[str, str]]:
+    trees, current = [], None
+    for line in model_str.splitlines():
+        if line.startswith('Tree='):
+            current = {}
+            trees.append(current)
+        elif line.startswith('end of trees'):
+            break
+        elif current is not None and '=' in line:
+            key, _, val = line.partition('=')
+            current[key] = val
+    return trees
+
+
+def _export_lightgbm(model: Any) -> TreeEnsemble:
+    booster = model.booster_
+    # The text model keeps full-precision thresholds (the JSON dump rounds them)
+    model_str = booster.model_to_string()
+    header = dict(line.partition('=')[::2] for line in model_str.split('\n\n', 1)[0].splitlines() if '=' in line)
+    if header.get('objective') != 'binary sigmoid:1' or header.get('num_tree_per_iteration') != '1':
+        raise UnsupportedModelError(f"Unsupported LightGBM objective {header.get('objective')}")
+    if 'average_output' in header:
+        raise UnsupportedModelError("Random-forest mode LightGBM models are not supported")
+
+    n_iter = booster.best_iteration or booster.current_iteration()
+    trees = []
+    for raw in _parse_lightgbm_trees(model_str)[:n_iter]:
+        if int(raw.get('num_cat', '0')) or raw.get('is_linear', '0') != '0':
+            raise UnsupportedModelError("Categorical or linear trees are not supported")
+        leaf_value = [float(v) for v in raw['leaf_value'].split()]
+        n_internal = int(raw['num_leaves']) - 1
+        if n_internal == 0:
+            trees.append({'root': 0, 'children': [None], 'value': leaf_value})
+            continue
+
+        # Internal nodes keep their ids; leaf k (encoded as ~k) becomes node n_internal + k
+        node_id = lambda c: c if c >= 0 else n_internal + ~c
+        left = [node_id(int(c)) for c in raw['left_child'].split()]
+        right = [node_id(int(c)) for c in raw['right_child'].split()]
+        decision = [int(d) for d in raw['decision_type'].split()]
+        if any(d & 1 for d in decision):
+            raise UnsupportedModelError("Categorical splits are not supported")
+        missing_type = [(d >> 2) & 3 for d in decision]
+        if any(m == 1 for m in missing_type):
+            raise UnsupportedModelError("missing_type=Zero splits are not supported")
+
+        trees.append({
+            'root': 0,
+            'children': list(zip(left, right)) + [None] * len(leaf_value),
+            'feature': [int(f) for f in raw['split_feature'].split()],
+            'threshold': [float(t) for t in raw['threshold'].split()],
+            'value': [0.0] * n_internal + leaf_value,
+            'default_left': [bool(d & 2) for d in decision],
+            'nan_as_zero': [m == 0 for m in missing_type],
+        })
+
+    return _pack(trees, base_margin=0.0, dtype=np.float64, strict_less=False, source='lightgbm',
+                 zero_threshold=LIGHTGBM_ZERO_THRESHOLD)
+
+
+def compile_model(model: Any) -> TreeEnsemble:
+    """Exports a fitted XGBClassifier / LGBMClassifier into a TreeEnsemble."""
+    module = type(model).__module__
+    if module.startswith('xgboost'):
+        return _export_xgboost(model)
+    if module.startswith('lightgbm'):
+        return _export_lightgbm(model)
+    raise UnsupportedModelError(f"No tree exporter for {type(model).__name__}")
+
+
+def probe_matrix(ensemble: TreeEnsemble, n_features: int, n_rows: int = 512, seed: int = 0) -> np.ndarray:
+    """
+    Builds validation inputs that land on both sides of (and exactly on)
+    every split threshold, plus a few missing values.
+    """
+    rng = np.random.default_rng(seed)
+    X = np.zeros((n_rows, n_features), dtype=np.float64)
+    split = ~ensemble.is_leaf
+    for f in range(n_features):
+        thresholds = ensemble.threshold[split & (ensemble.feature == f)].astype(np.float64)
+        if thresholds.size == 0:
+            X[:, f] = rng.normal(size=n_rows)
+            continue
+        picks = rng.choice(thresholds, size=n_rows)
+        X[:, f] = picks + rng.choice([-1e-3, 0.0, 1e-3], size=n_rows) * np.maximum(1.0, np.abs(picks))
+    X[rng.random(X.shape) < 0.02] = np.nan
+    return X
+
+
+def validate(ensemble: TreeEnsemble, model: Any, X: np.ndarray) -> Optional[float]:
+    """
+    Compares the compiled ensemble against the original `predict_proba`.
+    Returns None when every probability is bit-for-bit identical, else the
+    largest absolute difference.
+    """
+    expected = np.asarray(model.predict_proba(X)[:, 1])
+    actual = ensemble.predict_proba(X)[:, 1].astype(expected.dtype)
+    if np.array_equal(expected, actual):
+        return None
+    return float(np.max(np.abs(expected.astype(np.float64) - actual.astype(np.float64))))
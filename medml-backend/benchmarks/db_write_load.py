@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Concurrent write load test for the SQLite engine settings.
+
+Starts several worker processes against one SQLite file. Each worker runs a
+mix of prediction inserts, which go through the ORM with the insert hooks
+that maintain the latest-prediction pointer and the dashboard counters, and
+patient-list reads, in the same way as gunicorn workers sharing medml.db.
+Each profile runs against a fresh file:
+
+- `baseline`: the old engine behaviour (rollback journal, synchronous=FULL,
+  the 5 s pysqlite busy timeout, SQLite's default cache and no mmap)
+- `tuned`: the app/config.py defaults (WAL, synchronous=NORMAL, ...)
+
+    python benchmarks/db_write_load.py --processes 8 --ops 300
+    python benchmarks/db_write_load.py --output db-load.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+PROFILES = {
+    'baseline': {
+        'SQLITE_JOURNAL_MODE': 'DELETE',
+        'SQLITE_SYNCHRONOUS': 'FULL',
+        'SQLITE_BUSY_TIMEOUT_MS': '5000',
+        'SQLITE_MMAP_SIZE': '0',
+        'SQLITE_CACHE_SIZE_KB': '2000',
+    },
+    # Empty: whatever app/config.py defaults to
+    'tuned': {},
+}
+
+
+# --- Workers (run in spawned processes, so each sets its env before importing app) ---
+
+_app = None
+
+
+def _make_app(db_path, profile):
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    os.environ.update(PROFILES[profile])
+    sys.path.insert(0, BACKEND_DIR)
+    import logging
+    import warnings
+    warnings.filterwarnings('ignore')
+    logging.disable(logging.INFO)
+    from app import create_app
+    return create_app('development')
+
+
+def init_worker(db_path, profile):
+    global _app
+    _app = _make_app(db_path, profile)
+
+
+def setup(db_path, profile, n_patients):
+    app = _make_app(db_path, profile)
+    from app.extensions import db
+    from app.models import Patient
+    with app.app_context():
+        db.create_all()
+        for i in range(n_patients):
+            db.session.add(Patient(name=f"Load {i}", age=40, gender="Female", height=160, weight=60,
+                                   abha_id=f"{95000000000000 + i}", password_hash="x"))
+        db.session.commit()
+
+
+def worker(args):
+    n_patients, ops, read_ratio, seed = args
+    app = _app
+    from sqlalchemy.exc import OperationalError
+    from app.extensions import db
+    from app.models import Patient, RiskPrediction
+
+    rng = random.Random(seed)
+    result = {"writes": 0, "reads": 0, "locked": 0, "write_ms": [], "read_ms": []}
+    with app.app_context():
+        for _ in range(ops):
+            try:
+                start = time.perf_counter()
+                if rng.random() < read_ratio:
+                    # First page of the patient list, as GET /patients with a risk filter
+                    db.session.query(Patient).filter(Patient.latest_diabetes_risk_level == 'High') \
+                        .order_by(Patient.created_at.desc()).limit(20).all()
+                    db.session.commit()
+                    result["read_ms"].append((time.perf_counter() - start) * 1e3)
+                    result["reads"] += 1
+                    continue
+                level = rng.choice(('Low', 'Medium', 'High'))
+                db.session.add(RiskPrediction(patient_id=rng.randint(1, n_patients), diabetes_risk_score=rng.random(),
+                                              diabetes_risk_level=level, model_version='load-test'))
+                db.session.commit()
+                result["write_ms"].append((time.perf_counter() - start) * 1e3)
+                result["writes"] += 1
+            except OperationalError as e:
+                db.session.rollback()
+                if 'locked' not in str(e):
+                    raise
+                result["locked"] += 1
+    return result
+
+
+# --- Driver ---
+
+def _percentile(samples, q):
+    samples = sorted(samples)
+    return round(samples[min(int(len(samples) * q), len(samples) - 1)], 3) if samples else None
+
+
+def run_profile(profile, args):
+    directory = tempfile.mkdtemp(prefix=f'medml-load-{profile}-', dir=args.dir)
+    db_path = os.path.join(directory, 'load.db')
+    ctx = multiprocessing.get_context('spawn')
+    try:
+        with ctx.Pool(1) as pool:
+            pool.apply(setup, (db_path, profile, args.patients))
+        jobs = [(args.patients, args.ops, args.read_ratio, args.seed + i) for i in range(args.processes)]
+        with ctx.Pool(args.processes, initializer=init_worker, initargs=(db_path, profile)) as pool:
+            # Wait until every worker has built its app before the clock starts
+            pool.map(time.sleep, [0.5] * args.processes, chunksize=1)
+            start = time.perf_counter()
+            results = pool.map(worker, jobs)
+            elapsed = time.perf_counter() - start
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    write_ms = [ms for r in results for ms in r["write_ms"]]
+    read_ms = [ms for r in results for ms in r["read_ms"]]
+    return {
+        "settings": PROFILES[profile] or "app/config.py defaults",
+        "seconds": round(elapsed, 3),
+        "writes": len(write_ms),
+        "reads": len(read_ms),
+        "locked_errors": sum(r["locked"] for r in results),
+        "writes_per_sec": round(len(write_ms) / elapsed, 1),
+        "reads_per_sec": round(len(read_ms) / elapsed, 1),
+        "write_p50_ms": _percentile(write_ms, 0.5),
+        "write_p99_ms": _percentile(write_ms, 0.99),
+        "read_p50_ms": _percentile(read_ms, 0.5),
+        "read_p99_ms": _percentile(read_ms, 0.99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent SQLite write load test.")
+    parser.add_argument('--processes', type=int, default=8)
+    parser.add_argument('--ops', type=int, default=200, help="Operations per process")
+    parser.add_argument('--read-ratio', type=float, default=0.5, help="Share of operations that are reads")
+    parser.add_argument('--patients', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--profiles', default=','.join(PROFILES))
+    parser.add_argument('--dir', help="Directory for the database files (default: the temp dir); "
+                                      "use the production volume, fsync cost is part of what is measured")
+    parser.add_argument('--output', help="Write results JSON here (default: stdout)")
+    args = parser.parse_args()
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "processes": args.processes,
+            "ops_per_process": args.ops,
+            "read_ratio": args.read_ratio,
+        },
+        "profiles": {},
+    }
+    for profile in [p.strip() for p in args.profiles.split(',') if p.strip()]:
+        results["profiles"][profile] = run_profile(profile, args)
+
+    profiles = results["profiles"]
+    if profiles.get('baseline', {}).get('writes_per_sec') and 'tuned' in profiles:
+        results["speedup"] = round(profiles['tuned']['writes_per_sec'] / profiles['baseline']['writes_per_sec'], 2)
+
+    payload = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(payload + '\n')
+        print(f"Wrote {args.output}")
+    else:
+        print(payload)
+
+
+if __name__ == '__main__':
+    main()
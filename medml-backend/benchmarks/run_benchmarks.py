@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Inference benchmarks for the risk models.
+
+Builds a synthetic patient population with the same distributions as
+generate_test_data.py (in an in-memory database) and measures:
+
+- single-row latency (p50/p90/p99) of services.run_prediction per model
+- batch throughput (rows/sec) of services.run_prediction_batch per model
+- end-to-end latency of POST /api/v1/patients/<id>/predict
+
+Results are written as JSON so runs can be compared across releases:
+
+    python benchmarks/run_benchmarks.py --output bench-1.4.json
+    python benchmarks/run_benchmarks.py --baseline bench-1.4.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BACKEND_DIR)
+
+from faker import Faker
+from flask_jwt_extended import create_access_token
+
+from generate_test_data import TestDataGenerator
+from app import services
+from app.extensions import db, limiter
+from app.prediction_cache import prediction_cache
+
+MODEL_KINDS = ('diabetes', 'liver', 'heart', 'mental_health')
+FEATURE_GETTERS = {
+    'diabetes': 'get_latest_diabetes_features',
+    'liver': 'get_latest_liver_features',
+    'heart': 'get_latest_heart_features',
+    'mental_health': 'get_latest_mental_health_features',
+}
+
+
+# --- Helpers ---
+
+def latency_summary(samples_ns):
+    ms = np.asarray(samples_ns, dtype=np.float64) / 1e6
+    return {
+        "n": int(ms.size),
+        "mean_ms": round(float(ms.mean()), 4),
+        "p50_ms": round(float(np.percentile(ms, 50)), 4),
+        "p90_ms": round(float(np.percentile(ms, 90)), 4),
+        "p99_ms": round(float(np.percentile(ms, 99)), 4),
+        "max_ms": round(float(ms.max()), 4),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def package_version(name):
+    try:
+        from importlib.metadata import version
+        return version(name)
+    except Exception:
+        return None
+
+
+# --- Setup ---
+
+def build_population(config_name, n_patients, seed):
+    """Creates users, patients and one assessment of each kind per patient."""
+    random.seed(seed)
+    Faker.seed(seed)
+    # The generator prints a progress line per step
+    with contextlib.redirect_stdout(io.StringIO()):
+        generator = TestDataGenerator(config_name)
+        db.create_all()
+        users = generator.generate_users(2)
+        patients = generator.generate_patients(n_patients, users)
+        generator.generate_diabetes_assessments(patients)
+        generator.generate_liver_assessments(patients)
+        generator.generate_heart_assessments(patients)
+        generator.generate_mental_health_assessments(patients)
+
+    features = {
+        kind: [getattr(p, getter)() for p in patients]
+        for kind, getter in FEATURE_GETTERS.items()
+    }
+    return generator, users[0], [p.id for p in patients], features
+
+
+# --- Benchmarks ---
+
+def bench_single_row(rows, kind, iterations, warmup):
+    try:
+        services.run_prediction(kind, dict(rows[0]))
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+
+    for i in range(warmup):
+        services.run_prediction(kind, dict(rows[i % len(rows)]))
+    samples = []
+    for i in range(iterations):
+        row = dict(rows[i % len(rows)])
+        start = time.perf_counter_ns()
+        services.run_prediction(kind, row)
+        samples.append(time.perf_counter_ns() - start)
+    return latency_summary(samples)
+
+
+def bench_batch(rows, kind, batch_sizes, repeats):
+    results = {}
+    for size in batch_sizes:
+        batch = [dict(rows[i % len(rows)]) for i in range(size)]
+        try:
+            services.run_prediction_batch(kind, batch)
+        except Exception as e:
+            return {"error": f"{type(e).__name__}: {e}"}
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter_ns()
+            services.run_prediction_batch(kind, batch)
+            timings.append(time.perf_counter_ns() - start)
+        median_s = float(np.median(timings)) / 1e9
+        results[str(size)] = {
+            "median_ms": round(median_s * 1e3, 4),
+            "rows_per_sec": round(size / median_s, 1),
+        }
+    return results
+
+
+def bench_endpoint(app, admin, patient_ids, iterations, warmup):
+    client = app.test_client()
+    token = create_access_token(identity={'id': admin.id, 'role': 'admin', 'name': admin.name})
+    headers = {'Authorization': f'Bearer {token}'}
+
+    def call(pid):
+        response = client.post(f'/api/v1/patients/{pid}/predict', headers=headers)
+        if response.status_code != 200:
+            raise RuntimeError(f"/predict returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+
+    for i in range(warmup):
+        call(patient_ids[i % len(patient_ids)])
+    samples = []
+    start_all = time.perf_counter()
+    for i in range(iterations):
+        start = time.perf_counter_ns()
+        call(patient_ids[i % len(patient_ids)])
+        samples.append(time.perf_counter_ns() - start)
+    summary = latency_summary(samples)
+    summary["requests_per_sec"] = round(iterations / (time.perf_counter() - start_all), 1)
+    return summary
+
+
+# --- Comparison ---
+
+def flatten(results):
+    """Yields (metric path, value, higher_is_better) for every comparable number."""
+    for kind, summary in results.get("single_row", {}).items():
+        for key in ("p50_ms", "p99_ms"):
+            if key in summary:
+                yield f"single_row.{kind}.{key}", summary[key], False
+    for kind, sizes in results.get("batch", {}).items():
+        for size, summary in sizes.items():
+            if isinstance(summary, dict) and "rows_per_sec" in summary:
+                yield f"batch.{kind}.{size}.rows_per_sec", summary["rows_per_sec"], True
+    endpoint = results.get("endpoint", {})
+    for key in ("p50_ms", "p99_ms"):
+        if key in endpoint:
+            yield f"endpoint.{key}", endpoint[key], False
+
+
+def compare(current, baseline, threshold_pct):
+    """Prints every metric and returns the ones that got worse by more than threshold_pct."""
+    previous = {path: value for path, value, _ in flatten(baseline)}
+    regressions = []
+    print(f"\n{'metric':<45}{'baseline':>12}{'current':>12}{'change':>10}")
+    for path, value, higher_is_better in flatten(current):
+        if path not in previous or not previous[path]:
+            continue
+        change = (value - previous[path]) / previous[path] * 100
+        worse = -change if higher_is_better else change
+        flag = "  <-- regression" if worse > threshold_pct else ""
+        print(f"{path:<45}{previous[path]:>12}{value:>12}{change:>+9.1f}%{flag}")
+        if flag:
+            regressions.append(path)
+    return regressions
+
+
+# --- Main ---
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark risk model inference.")
+    parser.add_argument('--config', default='testing', help="App config name (default: testing, in-memory DB)")
+    parser.add_argument('--patients', type=int, default=200)
+    parser.add_argument('--iterations', type=int, default=500, help="Single-row calls per model")
+    parser.add_argument('--batch-sizes', default='32,256,1024')
+    parser.add_argument('--batch-repeats', type=int, default=20)
+    parser.add_argument('--endpoint-iterations', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--with-cache', action='store_true', help="Leave the prediction cache on for /predict")
+    parser.add_argument('--output', help="Write results JSON here (default: stdout)")
+    parser.add_argument('--baseline', help="Compare against an earlier results JSON")
+    parser.add_argument('--threshold', type=float, default=20.0, help="Regression threshold in percent")
+    args = parser.parse_args()
+
+    generator, admin, patient_ids, features = build_population(args.config, args.patients, args.seed)
+    app = generator.app
+    limiter.enabled = False
+    prediction_cache.enabled = args.with_cache
+
+    batch_sizes = [int(s) for s in args.batch_sizes.split(',') if s.strip()]
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "packages": {name: package_version(name) for name in ('numpy', 'scikit-learn', 'xgboost', 'lightgbm')},
+            "model_version": services.models.version_stamp(),
+            "config": {key: app.config.get(key) for key in (
+                'COMPILED_TREE_INFERENCE', 'MODEL_SHARED_STORE', 'INFERENCE_POOL_ENABLED',
+                'PARALLEL_SCORING', 'PREDICTION_CACHE_SIZE')},
+            "prediction_cache": args.with_cache,
+            "patients": args.patients,
+            "seed": args.seed,
+        },
+        "single_row": {},
+        "batch": {},
+    }
+
+    for kind in MODEL_KINDS:
+        results["single_row"][kind] = bench_single_row(features[kind], kind, args.iterations, args.warmup)
+        results["batch"][kind] = bench_batch(features[kind], kind, batch_sizes, args.batch_repeats)
+    results["endpoint"] = bench_endpoint(app, admin, patient_ids, args.endpoint_iterations, args.warmup)
+
+    payload = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(payload + '\n')
+        print(f"Wrote {args.output}")
+    else:
+        print(payload)
+
+    if args.baseline:
+        with open(args.baseline) as fh:
+            regressions = compare(results, json.load(fh), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} metric(s) regressed by more than {args.threshold:g}%")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
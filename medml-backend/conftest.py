@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Helpers shared by the backend checks. pytest loads this file on its own;
+the test scripts import from it when they are run directly, so it needs
+nothing beyond the app itself.
+"""
+
+import os
+import sys
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app import services
+from app.extensions import db, limiter
+from app.models import Patient, User
+
+# First ABHA id handed out by make_patient
+ABHA_BASE = 90000000000000
+
+
+class FakeGenerator:
+    """Stands in for services.generate_gemini_recommendations and counts its calls."""
+
+    def __init__(self, result, fail=False):
+        self.result = result
+        self.fail = fail
+        self.calls = 0
+
+    def __call__(self, api_key, risk_map, timeout=None):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("upstream unavailable")
+        return self.result
+
+
+@contextmanager
+def fake_generator(fake):
+    """Routes Gemini generation to `fake` for the block."""
+    original = services.generate_gemini_recommendations
+    services.generate_gemini_recommendations = fake
+    try:
+        yield fake
+    finally:
+        services.generate_gemini_recommendations = original
+
+
+@contextmanager
+def limiter_disabled():
+    """Turns the shared rate limiter off for the block and restores it afterwards."""
+    enabled = limiter.enabled
+    limiter.enabled = False
+    try:
+        yield
+    finally:
+        limiter.enabled = enabled
+
+
+def make_admin(**fields):
+    """Adds and flushes an admin user."""
+    admin = User(**{"name": "Admin", "email": "a@example.com", "username": "admin", **fields})
+    admin.password_hash = "x"
+    db.session.add(admin)
+    db.session.flush()
+    return admin
+
+
+def make_patient(i=0, **fields):
+    """Adds and flushes patient P<i>, whose ABHA id is ABHA_BASE + i."""
+    values = {"name": f"P{i}", "age": 40, "gender": "Male", "height": 170, "weight": 70,
+              "abha_id": f"{ABHA_BASE + i}", "password_hash": "x"}
+    values.update(fields)
+    patient = Patient(**values)
+    db.session.add(patient)
+    db.session.flush()
+    return patient
@@ -15,6 +15,7 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
 from app import create_app
 from app.models import db, User
 from app.config import config
+from app.db_seeder import seed_static_recommendations
 
 def create_admin():
     """Create the initial admin user."""
@@ -74,6 +75,8 @@ def init_database():
             # Create all tables
             db.create_all()
             print("SUCCESS: Database tables created successfully!")
+            # Curated recommendation sets for every risk profile, so lookups only read
+            seed_static_recommendations()
             return True
         except Exception as e:
             print(f"ERROR: Error creating database tables: {e}")
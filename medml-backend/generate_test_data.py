@@ -24,8 +24,8 @@ from app.db_seeder import seed_static_recommendations
 fake = Faker()
 
 class TestDataGenerator:
-    def __init__(self):
-        self.app = create_app('development')
+    def __init__(self, config_name='development'):
+        self.app = create_app(config_name)
         self.app_context = self.app.app_context()
         self.app_context.push()
         
@@ -0,0 +1,33 @@
+"""Add recommendation_cache for generated recommendations
+
+Revision ID: 0b7d2e9c4a15
+Revises: f19b6c4e2d83
+Create Date: 2026-10-17 18:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b7d2e9c4a15'
+down_revision = 'f19b6c4e2d83'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'recommendation_cache' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'recommendation_cache',
+        sa.Column('key', sa.String(length=160), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.Float(), nullable=False),
+        sa.Column('expires_at', sa.Float(), nullable=True),
+        sa.PrimaryKeyConstraint('key'),
+    )
+
+
+def downgrade():
+    op.drop_table('recommendation_cache')
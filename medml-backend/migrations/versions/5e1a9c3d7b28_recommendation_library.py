@@ -0,0 +1,45 @@
+"""Turn lifestyle_recommendations into a per-risk-profile library
+
+Revision ID: 5e1a9c3d7b28
+Revises: 0b7d2e9c4a15
+Create Date: 2026-10-17 19:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e1a9c3d7b28'
+down_revision = '0b7d2e9c4a15'
+branch_labels = None
+depends_on = None
+
+INDEX_NAME = 'ix_lifestyle_recommendations_profile_key_priority'
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    columns = {c['name']: c for c in inspector.get_columns('lifestyle_recommendations')}
+    indexes = {ix['name'] for ix in inspector.get_indexes('lifestyle_recommendations')}
+
+    # Nothing references lifestyle_recommendations, so SQLite's table rebuild is safe here
+    with op.batch_alter_table('lifestyle_recommendations') as batch_op:
+        if 'profile_key' not in columns:
+            batch_op.add_column(sa.Column('profile_key', sa.String(length=160), nullable=True))
+        if 'source' not in columns:
+            batch_op.add_column(sa.Column('source', sa.String(length=20), nullable=True))
+        if not columns['patient_id']['nullable']:
+            batch_op.alter_column('patient_id', existing_type=sa.Integer(), nullable=True)
+        if INDEX_NAME not in indexes:
+            batch_op.create_index(INDEX_NAME, ['profile_key', 'priority'], unique=True)
+    # The library itself is filled by `flask warm-recommendations`; until then lookups serve curated sets from memory
+
+
+def downgrade():
+    op.execute("DELETE FROM lifestyle_recommendations WHERE patient_id IS NULL")
+    with op.batch_alter_table('lifestyle_recommendations') as batch_op:
+        batch_op.drop_index(INDEX_NAME)
+        batch_op.alter_column('patient_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.drop_column('source')
+        batch_op.drop_column('profile_key')
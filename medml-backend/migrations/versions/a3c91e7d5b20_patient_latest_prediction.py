@@ -0,0 +1,59 @@
+"""Store the latest prediction pointer and risk levels on patients
+
+Revision ID: a3c91e7d5b20
+Revises: 
+Create Date: 2026-10-17 10:12:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c91e7d5b20'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+DISEASES = ('diabetes', 'liver', 'heart', 'mental_health')
+
+
+def upgrade():
+    # Databases created with db.create_all() from a newer models.py already
+    # have the columns; only the backfill is needed there.
+    existing = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('patients')}
+
+    with op.batch_alter_table('patients') as batch_op:
+        if 'latest_prediction_id' not in existing:
+            batch_op.add_column(sa.Column('latest_prediction_id', sa.Integer(), nullable=True))
+        for disease in DISEASES:
+            column = f'latest_{disease}_risk_level'
+            if column not in existing:
+                batch_op.add_column(sa.Column(column, sa.String(length=20), nullable=True))
+                batch_op.create_index(f'ix_patients_{column}', [column])
+
+    # Backfill: newest prediction per patient, ties broken by id
+    op.execute(
+        "UPDATE patients SET latest_prediction_id = ("
+        " SELECT rp.id FROM risk_predictions rp"
+        " WHERE rp.patient_id = patients.id"
+        " ORDER BY rp.predicted_at DESC, rp.id DESC LIMIT 1)"
+    )
+    op.execute(
+        "UPDATE patients SET " + ", ".join(
+            f"latest_{disease}_risk_level = (SELECT rp.{disease}_risk_level FROM risk_predictions rp"
+            f" WHERE rp.id = patients.latest_prediction_id)"
+            for disease in DISEASES
+        )
+    )
+
+
+def downgrade():
+    # Plain ALTER TABLE ... DROP COLUMN (SQLite 3.35+). A batch rebuild would
+    # drop the old patients table, and with foreign keys on that cascades
+    # into every table referencing it.
+    for disease in DISEASES:
+        column = f'latest_{disease}_risk_level'
+        op.drop_index(f'ix_patients_{column}', table_name='patients')
+        op.drop_column('patients', column)
+    op.drop_column('patients', 'latest_prediction_id')
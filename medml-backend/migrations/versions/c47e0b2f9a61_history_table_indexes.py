@@ -0,0 +1,42 @@
+"""Index patient history tables and prediction risk levels
+
+Revision ID: c47e0b2f9a61
+Revises: a3c91e7d5b20
+Create Date: 2026-10-17 11:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c47e0b2f9a61'
+down_revision = 'a3c91e7d5b20'
+branch_labels = None
+depends_on = None
+
+# (index name, table, columns)
+INDEXES = [
+    ('ix_diabetes_assessments_patient_id_assessed_at', 'diabetes_assessments', ['patient_id', 'assessed_at']),
+    ('ix_liver_assessments_patient_id_assessed_at', 'liver_assessments', ['patient_id', 'assessed_at']),
+    ('ix_heart_assessments_patient_id_assessed_at', 'heart_assessments', ['patient_id', 'assessed_at']),
+    ('ix_mental_health_assessments_patient_id_assessed_at', 'mental_health_assessments', ['patient_id', 'assessed_at']),
+    ('ix_risk_predictions_patient_id_predicted_at', 'risk_predictions', ['patient_id', 'predicted_at']),
+    ('ix_consultation_notes_patient_id_created_at', 'consultation_notes', ['patient_id', 'created_at']),
+] + [
+    (f'ix_risk_predictions_{disease}_risk_level', 'risk_predictions', [f'{disease}_risk_level'])
+    for disease in ('diabetes', 'liver', 'heart', 'mental_health')
+]
+
+
+def upgrade():
+    # Skip indexes db.create_all() already made from a newer models.py
+    inspector = sa.inspect(op.get_bind())
+    for name, table, columns in INDEXES:
+        if name not in {ix['name'] for ix in inspector.get_indexes(table)}:
+            op.create_index(name, table, columns)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
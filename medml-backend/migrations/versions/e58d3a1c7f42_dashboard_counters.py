@@ -0,0 +1,33 @@
+"""Add dashboard_counters for precomputed dashboard statistics
+
+Revision ID: e58d3a1c7f42
+Revises: c47e0b2f9a61
+Create Date: 2026-10-17 13:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e58d3a1c7f42'
+down_revision = 'c47e0b2f9a61'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The counters are filled by the first dashboard read (or
+    # `flask reconcile-stats`), so only the table is created here.
+    if 'dashboard_counters' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'dashboard_counters',
+        sa.Column('key', sa.String(length=64), nullable=False),
+        sa.Column('value', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('key'),
+    )
+
+
+def downgrade():
+    op.drop_table('dashboard_counters')
@@ -0,0 +1,38 @@
+"""Add daily_rollups for dashboard time series
+
+Revision ID: f19b6c4e2d83
+Revises: e58d3a1c7f42
+Create Date: 2026-10-17 15:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f19b6c4e2d83'
+down_revision = 'e58d3a1c7f42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Filled by the first /dashboard/timeseries read (or `flask rebuild-rollups`)
+    if 'daily_rollups' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'daily_rollups',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('metric', sa.String(length=20), nullable=False),
+        sa.Column('state_name', sa.String(length=100), nullable=False),
+        sa.Column('facility', sa.String(length=150), nullable=False),
+        sa.Column('disease', sa.String(length=20), nullable=False),
+        sa.Column('from_level', sa.String(length=20), nullable=False),
+        sa.Column('risk_level', sa.String(length=20), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('day', 'metric', 'state_name', 'facility', 'disease', 'from_level', 'risk_level'),
+    )
+
+
+def downgrade():
+    op.drop_table('daily_rollups')
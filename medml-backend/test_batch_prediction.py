@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Checks that vectorized batch scoring and the compiled tree engine match
+the original single-row predictors.
+"""
+
+import os
+import sys
+import random
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app import create_app
+from app import services
+
+
+def _sample_rows(n, seed=7):
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(n):
+        rows.append({
+            "age": rng.randint(18, 80),
+            "gender": rng.choice(["Male", "Female"]),
+            "bmi": round(rng.uniform(16, 40), 2),
+            "pregnancy": rng.random() < 0.3,
+            "glucose": rng.uniform(70, 200),
+            "blood_pressure": rng.uniform(60, 120),
+            "skin_thickness": rng.uniform(10, 40),
+            "insulin": rng.uniform(0, 300),
+            "total_bilirubin": rng.uniform(0.2, 5),
+            "direct_bilirubin": rng.uniform(0, 2),
+            "alkaline_phosphatase": rng.uniform(50, 400),
+            "sgpt_alamine_aminotransferase": rng.uniform(5, 120),
+            "sgot_aspartate_aminotransferase": rng.uniform(5, 120),
+            "total_protein": rng.uniform(4, 9),
+            "albumin": rng.uniform(2, 5),
+            "ag_ratio": None,
+            "phq_score": rng.randint(0, 27),
+            "gad_score": rng.randint(0, 21),
+            "depressiveness": rng.random() < 0.5,
+            "suicidal": rng.random() < 0.2,
+            "anxiousness": rng.random() < 0.5,
+            "sleepiness": rng.random() < 0.5,
+        })
+    return rows
+
+
+def test_batch_matches_single_row():
+    app = create_app('testing')
+    rows = _sample_rows(25)
+    with app.app_context():
+        for kind in ('diabetes', 'liver', 'mental_health'):
+            if services.models.get(kind) is None:
+                continue
+            batch = services.run_prediction_batch(kind, rows)
+            single = [services.run_prediction(kind, dict(r)) for r in rows]
+            assert len(batch) == len(rows)
+            for b, s in zip(batch, single):
+                assert abs(float(b) - s) < 1e-9
+
+
+def test_compiled_trees_match_predict_proba():
+    from app.tree_engine import compile_model, probe_matrix, validate
+
+    create_app('testing')
+    for kind in ('diabetes', 'liver'):
+        model = services.models.get(kind)
+        if model is None:
+            continue
+        ensemble = compile_model(model)
+        X = probe_matrix(ensemble, model.n_features_in_, n_rows=2000, seed=11)
+        assert validate(ensemble, model, X) is None
+
+
+def test_shared_store_matches_unpickled_models():
+    import tempfile
+    from app.model_registry import ModelRegistry
+
+    app = create_app('testing')
+    rows = _sample_rows(300, seed=3)
+    with app.app_context():
+        expected = {kind: services.run_prediction_batch(kind, rows) for kind in ('diabetes', 'liver')}
+
+        with tempfile.TemporaryDirectory() as store:
+            app.config['MODEL_SHARED_STORE'] = store
+            original = services.models
+            try:
+                # The first registry exports the trees, the second only attaches
+                for _ in range(2):
+                    services.models = ModelRegistry(original.model_dir)
+                    services.models.configure(app)
+                    for kind, scores in expected.items():
+                        if services.models.get(kind) is None:
+                            continue
+                        assert services.models.entries[kind].shared
+                        assert list(services.run_prediction_batch(kind, rows)) == list(scores)
+            finally:
+                services.models = original
+
+
+def test_inference_pool_matches_inline_scores():
+    from concurrent.futures import ThreadPoolExecutor
+    from app import inference
+
+    app = create_app('testing')
+    rows = _sample_rows(20, seed=5)
+    with app.app_context():
+        if services.models.get('diabetes') is None:
+            return
+        expected = [services.run_prediction('diabetes', dict(r)) for r in rows]
+
+    pool = inference.InferenceService('testing', workers=1, window_ms=20, max_pending=len(rows))
+    inference.service = pool
+
+    def score(row):
+        with app.app_context():
+            return services.run_prediction('diabetes', dict(row))
+
+    try:
+        with ThreadPoolExecutor(max_workers=len(rows)) as threads:
+            assert list(threads.map(score, rows)) == expected
+
+        # Every slot taken: the next request is rejected instead of queued
+        pending = [pool.submit('diabetes', r) for r in rows]
+        try:
+            pool.submit('diabetes', rows[0])
+            assert False, "Expected InferenceBusyError"
+        except inference.InferenceBusyError:
+            pass
+        assert [f.result(timeout=30) for f in pending] == expected
+    finally:
+        inference.service = None
+        pool.shutdown()
+
+
+def test_dead_worker_replaces_pool_once():
+    import signal
+    from app import inference
+
+    created = []
+
+    class CountingService(inference.InferenceService):
+        def _new_executor(self):
+            executor = super()._new_executor()
+            created.append(executor)
+            return executor
+
+    pool = CountingService('testing', workers=1, window_ms=0, max_batch=1, max_pending=8)
+    rows = _sample_rows(8, seed=13)
+    try:
+        futures = [pool.submit('diabetes', r) for r in rows]
+        broken = created[0]
+        # Kill the worker once all eight batches are in flight on it
+        deadline = time.time() + 30
+        while (len(broken._pending_work_items) < len(rows) or not broken._processes) and time.time() < deadline:
+            time.sleep(0.01)
+        os.kill(next(iter(broken._processes)), signal.SIGKILL)
+
+        for future in futures:
+            try:
+                future.result(timeout=30)
+                assert False, "Expected InferenceError"
+            except inference.InferenceError:
+                pass
+        assert len(created) == 2 and pool._executor is created[1]
+        assert broken._shutdown_thread
+    finally:
+        pool.shutdown()
+
+
+def test_run_predictions_matches_sequential():
+    app = create_app('testing')
+    row = _sample_rows(1, seed=9)[0]
+    inputs = {kind: dict(row) for kind in ('diabetes', 'liver', 'heart', 'mental_health')}
+    with app.app_context():
+        results = services.run_predictions(inputs, timeout=30)
+        assert set(results) == set(inputs)
+        for kind, result in results.items():
+            try:
+                expected = services.run_prediction(kind, dict(row))
+            except Exception as e:
+                assert type(result) is type(e)
+                continue
+            assert result == expected
+
+
+def test_batch_rejects_unknown_type():
+    app = create_app('testing')
+    with app.app_context():
+        try:
+            services.run_prediction_batch('kidney', [{}])
+        except ValueError:
+            return
+        assert False, "Expected ValueError for unknown assessment type"
+
+
+if __name__ == '__main__':
+    test_batch_matches_single_row()
+    test_compiled_trees_match_predict_proba()
+    test_shared_store_matches_unpickled_models()
+    test_inference_pool_matches_inline_scores()
+    test_dead_worker_replaces_pool_once()
+    test_run_predictions_matches_sequential()
+    test_batch_rejects_unknown_type()
+    print("Batch prediction checks passed")
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Checks that the dashboard counters and daily rollups kept by the insert
+hooks agree with a full recount, and that reconcile repairs drift.
+"""
+
+import os
+import sys
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from sqlalchemy import event, insert
+
+from app import create_app
+from app.extensions import db
+from app import rollups
+from app.dashboard_stats import read_stats, recount, reconcile
+from app.models import DailyRollup, DashboardCounter, RiskPrediction, sync_latest_predictions
+from conftest import make_patient
+
+
+def test_counters_follow_inserts():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        reconcile()
+        patients = [make_patient(i) for i in range(3)]
+        db.session.add(RiskPrediction(patient_id=patients[0].id, diabetes_risk_level='High'))
+        db.session.add(RiskPrediction(patient_id=patients[1].id, diabetes_risk_level='Medium'))
+        db.session.commit()
+        # A newer Low prediction replaces the patient's High one
+        db.session.add(RiskPrediction(patient_id=patients[0].id, diabetes_risk_level='Low'))
+        db.session.execute(insert(RiskPrediction), [{"patient_id": patients[2].id, "liver_risk_level": "High"}])
+        sync_latest_predictions(db.session.connection(), [patients[2].id])
+        db.session.commit()
+
+        stats = read_stats()
+        assert stats["total_patients"] == 3
+        assert stats["today_registrations"] == 3
+        assert stats["diabetes_risk_count"] == 1
+        assert stats["liver_risk_count"] == 1
+        # The bulk insert above did not bump total_predictions itself
+        assert stats["total_assessments"] == 3
+        assert reconcile() == {"total_predictions": (3, 4)}
+        assert read_stats()["total_assessments"] == 4
+        db.drop_all()
+
+
+def test_reconcile_repairs_drift():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        make_patient(1)
+        db.session.commit()
+        db.session.merge(DashboardCounter(key="total_patients", value=40))
+        db.session.merge(DashboardCounter(key="registrations:2001-01-01", value=2))
+        db.session.commit()
+
+        drift = reconcile()
+        assert drift["total_patients"] == (40, 1)
+        assert drift["registrations:2001-01-01"] == (2, 0)
+        stored = dict(db.session.query(DashboardCounter.key, DashboardCounter.value).all())
+        assert "registrations:2001-01-01" not in stored
+        expected = {k: v for k, v in recount(db.session.connection()).items() if v}
+        assert {k: v for k, v in stored.items() if k != "reconciled_at"} == expected
+        db.drop_all()
+
+
+def test_rollups_match_rebuild():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        patients = [make_patient(i) for i in range(2)]
+        patients.append(make_patient(2, state_name="Goa", created_at=datetime.now() - timedelta(days=9)))
+        db.session.commit()
+        for level in ('Low', 'High', 'High'):
+            db.session.add(RiskPrediction(patient_id=patients[0].id, diabetes_risk_level=level))
+            db.session.commit()
+
+        def rows():
+            return sorted((r.day, r.metric, r.state_name, r.disease, r.from_level, r.risk_level, r.count)
+                          for r in DailyRollup.query.all())
+
+        incremental = rows()
+        rollups.rebuild()
+        assert rows() == incremental
+
+        today = date.today()
+        transitions = rollups.timeseries('transitions', 'day', today, today, group_by=['from_level', 'risk_level'],
+                                         filters={'disease': 'diabetes'})
+        assert transitions == [{"period": today.isoformat(), "from_level": "Low", "risk_level": "High", "count": 1}]
+        weekly = rollups.timeseries('registrations', 'week', today - timedelta(days=30), today, group_by=['state_name'])
+        assert sum(p["count"] for p in weekly) == 3
+        assert {"period": rollups.bucket_start(today - timedelta(days=9), 'week').isoformat(),
+                "state_name": "Goa", "count": 1} in weekly
+        db.drop_all()
+
+
+def test_prediction_insert_statement_count():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        patient = make_patient(0, state_name='Kerala')
+        db.session.commit()
+        patient_id = patient.id
+        statements = []
+        listener = lambda *args: statements.append(args[2].split()[0])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            db.session.add(RiskPrediction(patient_id=patient_id, diabetes_risk_level='High'))
+            db.session.flush()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        # The row, one read before and after the pointer UPDATE, one upsert each for counters and rollups
+        assert statements == ['INSERT', 'SELECT', 'UPDATE', 'SELECT', 'INSERT', 'INSERT'], statements
+        db.session.commit()
+        stored = dict(db.session.query(DashboardCounter.key, DashboardCounter.value).all())
+        assert stored == {k: v for k, v in recount(db.session.connection()).items() if v}
+        db.drop_all()
+
+
+if __name__ == '__main__':
+    test_counters_follow_inserts()
+    test_reconcile_repairs_drift()
+    test_rollups_match_rebuild()
+    test_prediction_insert_statement_count()
+    print("Dashboard stats checks passed")
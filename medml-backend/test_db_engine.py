@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Checks the engine settings: pool options for server databases and the
+pragmas applied to every SQLite connection.
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from sqlalchemy import create_engine
+
+from app import create_app
+from app.db_engine import effective_settings, engine_options, install_sqlite_pragmas
+
+
+def test_server_databases_get_pool_options():
+    app = create_app('testing')
+    config = dict(app.config, SQLALCHEMY_DATABASE_URI='postgresql://medml@db/medml', DB_POOL_SIZE=7)
+    options = engine_options(config)
+    assert options['pool_size'] == 7
+    assert options['pool_pre_ping'] is True
+    assert engine_options(app.config) == {}
+
+
+def test_sqlite_pragmas_apply_to_every_connection():
+    app = create_app('testing')
+    config = dict(app.config, SQLITE_BUSY_TIMEOUT_MS=2500, SQLITE_CACHE_SIZE_KB=8192)
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'wal.db')}")
+        install_sqlite_pragmas(engine, config)
+        try:
+            settings = effective_settings(engine)
+            assert settings['journal_mode'] == 'wal'
+            assert settings['synchronous'] == 1  # NORMAL
+            assert settings['busy_timeout'] == 2500
+            assert settings['cache_size'] == -8192
+            assert settings['mmap_size'] == config['SQLITE_MMAP_SIZE']
+            assert settings['foreign_keys'] == 1
+        finally:
+            engine.dispose()
+
+
+if __name__ == '__main__':
+    test_server_databases_get_pool_options()
+    test_sqlite_pragmas_apply_to_every_connection()
+    print("Database engine checks passed")
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Checks that the latest-prediction columns on patients follow every
+RiskPrediction insert, including bulk inserts that sync explicitly.
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from sqlalchemy import insert
+
+from app import create_app
+from app.extensions import db
+from app.models import Patient, RiskPrediction, sync_latest_predictions
+from conftest import make_patient
+
+
+def test_insert_updates_latest_prediction():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        patient = make_patient(1)
+        db.session.commit()
+        # An old edit time, so a refresh by the insert hook would show
+        db.session.query(Patient).update({"updated_at": datetime(2024, 1, 1)})
+        db.session.commit()
+        edited_at = patient.updated_at
+        first = RiskPrediction(patient_id=patient.id, diabetes_risk_level='Low', liver_risk_level='Low')
+        db.session.add(first)
+        db.session.commit()
+        assert patient.latest_prediction_id == first.id
+        assert patient.latest_diabetes_risk_level == 'Low'
+
+        second = RiskPrediction(patient_id=patient.id, diabetes_risk_level='High', liver_risk_level='Medium')
+        db.session.add(second)
+        db.session.commit()
+        assert patient.latest_prediction.id == second.id
+        assert (patient.latest_diabetes_risk_level, patient.latest_liver_risk_level) == ('High', 'Medium')
+
+        # A backdated row does not take over
+        old = RiskPrediction(patient_id=patient.id, diabetes_risk_level='Low',
+                             predicted_at=datetime.now() - timedelta(days=30))
+        db.session.add(old)
+        db.session.commit()
+        assert patient.latest_prediction_id == second.id
+
+        # Predictions are not profile edits
+        db.session.refresh(patient)
+        assert patient.updated_at == edited_at
+        db.drop_all()
+
+
+def test_bulk_insert_sync():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        patients = [make_patient(i) for i in range(3)]
+        db.session.execute(insert(RiskPrediction), [
+            {"patient_id": p.id, "heart_risk_level": "High"} for p in patients[:2]
+        ])
+        sync_latest_predictions(db.session.connection(), [p.id for p in patients[:2]])
+        db.session.commit()
+
+        levels = dict(db.session.query(Patient.id, Patient.latest_heart_risk_level).all())
+        assert levels == {patients[0].id: 'High', patients[1].id: 'High', patients[2].id: None}
+        assert Patient.query.filter(Patient.latest_heart_risk_level == 'High').count() == 2
+        db.drop_all()
+
+
+if __name__ == '__main__':
+    test_insert_updates_latest_prediction()
+    test_bulk_insert_sync()
+    print("Latest prediction checks passed")
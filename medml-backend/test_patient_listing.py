@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Checks GET /patients paging: keyset cursors across tied created_at values
+and with risk filters, the fields projection, X-Total-Count, and the 400/422
+answers for bad cursors, fields and limits. Risk filters look at each
+patient's latest prediction only.
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from flask_jwt_extended import create_access_token
+
+from app import create_app
+from app.extensions import db
+from app.models import Patient, RiskPrediction
+from conftest import limiter_disabled, make_admin, make_patient
+
+TIED = datetime(2024, 1, 1, 9, 30)
+
+
+def _seed():
+    """Seven patients; five share one created_at. Even ones are High risk for diabetes."""
+    ids = []
+    for i in range(7):
+        patient = make_patient(i)
+        db.session.add(RiskPrediction(patient_id=patient.id, diabetes_risk_level='High' if i % 2 == 0 else 'Low',
+                                      liver_risk_level='Low', heart_risk_level='Low', mental_health_risk_level='Low'))
+        ids.append(patient.id)
+    db.session.flush()
+    db.session.query(Patient).filter(Patient.id.in_(ids[:5])).update({"created_at": TIED}, synchronize_session=False)
+    db.session.commit()
+    return ids
+
+
+def _walk(client, headers, query, limit):
+    """Follows next_cursor to the end; returns the ids seen and each page's response."""
+    seen, pages, cursor = [], [], None
+    while True:
+        url = f'/api/v1/patients?{query}&limit={limit}' + (f'&cursor={cursor}' if cursor else '')
+        resp = client.get(url, headers=headers)
+        assert resp.status_code == 200, resp.get_json()
+        body = resp.get_json()
+        assert len(body["data"]) <= limit
+        seen += [p["patient_id"] for p in body["data"]]
+        pages.append(resp)
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return seen, pages
+
+
+def test_page_walk_across_tied_timestamps():
+    app = create_app('testing')
+    client = app.test_client()
+    with app.app_context(), limiter_disabled():
+        db.create_all()
+        admin = make_admin()
+        ids = _seed()
+        headers = {'Authorization': 'Bearer ' + create_access_token(identity={'id': admin.id, 'role': 'admin', 'name': 'Admin'})}
+
+        everyone = [p["patient_id"] for p in client.get('/api/v1/patients', headers=headers).get_json()["data"]]
+        # Newest first; the tied rows fall back to id descending
+        assert everyone == sorted(ids, reverse=True)
+
+        for limit in (1, 2, 3):
+            seen, pages = _walk(client, headers, 'sort=recently_added', limit)
+            assert seen == everyone
+            assert pages[0].headers['X-Total-Count'] == '7'
+            assert all('X-Total-Count' not in page.headers for page in pages[1:])
+        db.drop_all()
+
+
+def test_cursor_with_filters_and_projection():
+    app = create_app('testing')
+    client = app.test_client()
+    with app.app_context(), limiter_disabled():
+        db.create_all()
+        admin = make_admin()
+        ids = _seed()
+        headers = {'Authorization': 'Bearer ' + create_access_token(identity={'id': admin.id, 'role': 'admin', 'name': 'Admin'})}
+
+        for query in ('disease=diabetes&sort=high_risk', 'disease=diabetes&sort=low_risk', 'sort=high_risk'):
+            unpaged = [p["patient_id"] for p in client.get(f'/api/v1/patients?{query}', headers=headers).get_json()["data"]]
+            seen, pages = _walk(client, headers, query, 2)
+            assert seen == unpaged and len(set(seen)) == len(seen)
+            assert pages[0].headers['X-Total-Count'] == str(len(unpaged))
+        assert sorted(seen) == [ids[i] for i in (0, 2, 4, 6)]
+
+        body = client.get('/api/v1/patients?limit=2&fields=name,latest_prediction.diabetes_risk_level',
+                          headers=headers).get_json()
+        for patient in body["data"]:
+            assert set(patient) == {"patient_id", "name", "latest_prediction"}
+            assert set(patient["latest_prediction"]) == {"diabetes_risk_level"}
+        db.drop_all()
+
+
+def test_risk_filters_use_latest_prediction_only():
+    app = create_app('testing')
+    client = app.test_client()
+    with app.app_context(), limiter_disabled():
+        db.create_all()
+        admin = make_admin()
+        recovered, still_high = make_patient(0), make_patient(1)
+        now = datetime.utcnow()
+        # High before, Low now; and High twice, so a join on every prediction would list it twice
+        for patient, levels in ((recovered, ('High', 'Low')), (still_high, ('High', 'High'))):
+            for age, level in zip((2, 1), levels):
+                db.session.add(RiskPrediction(patient_id=patient.id, predicted_at=now - timedelta(days=age),
+                                              diabetes_risk_level=level, liver_risk_level='Low',
+                                              heart_risk_level='Low', mental_health_risk_level='Low'))
+        db.session.commit()
+        headers = {'Authorization': 'Bearer ' + create_access_token(identity={'id': admin.id, 'role': 'admin', 'name': 'Admin'})}
+
+        for query in ('sort=high_risk', 'disease=diabetes&sort=high_risk', 'sort=high_risk&limit=5'):
+            listed = [p["patient_id"] for p in client.get(f'/api/v1/patients?{query}', headers=headers).get_json()["data"]]
+            assert listed == [still_high.id], query
+        low = [p["patient_id"] for p in client.get('/api/v1/patients?disease=diabetes&sort=low_risk', headers=headers).get_json()["data"]]
+        assert low == [recovered.id]
+        everyone = [p["patient_id"] for p in client.get('/api/v1/patients?disease=diabetes', headers=headers).get_json()["data"]]
+        assert sorted(everyone) == sorted([recovered.id, still_high.id])
+        db.drop_all()
+
+
+def test_bad_cursor_fields_and_limit():
+    app = create_app('testing')
+    client = app.test_client()
+    with app.app_context(), limiter_disabled():
+        db.create_all()
+        admin = make_admin()
+        _seed()
+        headers = {'Authorization': 'Bearer ' + create_access_token(identity={'id': admin.id, 'role': 'admin', 'name': 'Admin'})}
+
+        for query in ('limit=2&cursor=not-a-cursor', 'limit=2&cursor=bm9waXBl', 'fields=name,password_hash',
+                      'fields=latest_prediction.bogus', 'fields=name.first'):
+            assert client.get(f'/api/v1/patients?{query}', headers=headers).status_code == 400, query
+        for query in ('limit=0', 'limit=501', 'limit=ten'):
+            assert client.get(f'/api/v1/patients?{query}', headers=headers).status_code == 422, query
+        db.drop_all()
+
+
+if __name__ == '__main__':
+    test_page_walk_across_tied_timestamps()
+    test_cursor_with_filters_and_projection()
+    test_risk_filters_use_latest_prediction_only()
+    test_bad_cursor_fields_and_limit()
+    print("Patient listing checks passed")
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Checks that PatientRepository.load_full matches the per-patient
+relationships and issues a fixed number of queries per batch.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from sqlalchemy import event
+
+from app import create_app
+from app import repository
+from app.extensions import db
+from app.models import ConsultationNote, DiabetesAssessment, Patient, RiskPrediction
+from app.repository import SECTIONS, PatientRepository
+from conftest import make_admin, make_patient
+
+
+def _seed(n_patients, history):
+    admin = make_admin()
+    ids = []
+    for i in range(n_patients):
+        patient = make_patient(i, age=30 + i, gender="Female", created_by_admin_id=admin.id)
+        for j in range(history):
+            db.session.add(DiabetesAssessment(patient_id=patient.id, pregnancy=False, glucose=90 + j,
+                                              blood_pressure=80, skin_thickness=20, insulin=80,
+                                              diabetes_history=False))
+            db.session.add(RiskPrediction(patient_id=patient.id, diabetes_risk_level=('Low', 'High')[j % 2]))
+            db.session.add(ConsultationNote(patient_id=patient.id, notes=f"Note {j}"))
+        ids.append(patient.id)
+    db.session.commit()
+    return ids
+
+
+def _count_queries(fn):
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        result = fn()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    return result, len(statements)
+
+
+def test_load_full_matches_relationships():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        ids = _seed(4, history=3)
+        expected = {pid: db.session.get(Patient, pid).to_dict(include_history=True, include_latest_prediction=True,
+                                                              include_notes=True) for pid in ids}
+        db.session.expire_all()
+
+        records = PatientRepository().load_full(reversed(ids + [999999]))
+        assert list(records) == list(reversed(ids))
+        for pid, record in records.items():
+            assert record.to_dict(include_history=True, include_latest_prediction=True,
+                                  include_notes=True) == expected[pid]
+
+        try:
+            PatientRepository().load_full(ids, sections=['kidney_assessments'])
+            assert False, "Expected ValueError for an unknown section"
+        except ValueError:
+            pass
+        db.drop_all()
+
+
+def test_query_count_is_independent_of_size():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        ids = _seed(12, history=4)
+        original = repository.IN_BATCH_SIZE
+        try:
+            repository.IN_BATCH_SIZE = 5
+            counts = []
+            for subset in (ids[:1], ids[:5]):
+                db.session.expire_all()
+                records, count = _count_queries(lambda: PatientRepository().load_full(subset))
+                # Serializing must not go back to the database
+                _, extra = _count_queries(lambda: [r.to_dict(include_history=True, include_latest_prediction=True,
+                                                             include_notes=True) for r in records.values()])
+                assert extra == 0
+                counts.append(count)
+            # patients + admin/latest prediction + one per section
+            assert counts[0] == counts[1] <= 2 + len(SECTIONS)
+
+            db.session.expire_all()
+            _, count = _count_queries(lambda: PatientRepository().load_full(ids))
+            assert count == 3 * counts[0]  # 12 ids in batches of 5
+        finally:
+            repository.IN_BATCH_SIZE = original
+        db.drop_all()
+
+
+if __name__ == '__main__':
+    test_load_full_matches_relationships()
+    test_query_count_is_independent_of_size()
+    print("Patient repository checks passed")
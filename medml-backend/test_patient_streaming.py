@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Checks that the streamed patient document matches Patient.to_dict and that
+history_limit keeps the newest rows of each section.
+"""
+
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app import create_app
+from app.extensions import db
+from app.models import ConsultationNote, Patient, RiskPrediction
+from app.streaming import patient_json_chunks
+
+
+def test_stream_matches_to_dict():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        patient = Patient(name="P", age=40, gender="Male", height=170, weight=70,
+                          abha_id="93000000000000", password_hash="x")
+        db.session.add(patient)
+        db.session.flush()
+        for level in ('Low', 'Medium', 'High'):
+            db.session.add(RiskPrediction(patient_id=patient.id, diabetes_risk_level=level))
+        db.session.add(ConsultationNote(patient_id=patient.id, notes="Follow up"))
+        db.session.commit()
+
+        expected = patient.to_dict(include_admin=True, include_history=True,
+                                   include_latest_prediction=True, include_notes=True)
+        streamed = json.loads(b''.join(patient_json_chunks(patient)))
+        assert streamed == expected
+
+        limited = json.loads(b''.join(patient_json_chunks(patient, history_limit=1)))
+        assert [p['diabetes_risk_level'] for p in limited['risk_predictions']] == ['High']
+        assert limited['latest_prediction'] == expected['latest_prediction']
+        assert len(limited['consultation_notes']) == 1
+        db.drop_all()
+
+
+if __name__ == '__main__':
+    test_stream_matches_to_dict()
+    print("Patient streaming checks passed")
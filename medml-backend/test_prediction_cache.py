@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Checks the prediction cache: fingerprints, LRU eviction and invalidation
+when the model registry reloads.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.prediction_cache import PredictionCache, fingerprint
+
+
+FEATURES = {
+    "diabetes": {"assessment_id": 1, "glucose": 120.0, "age": 40, "gender": "Male", "bmi": 24.2},
+    "liver": {"assessment_id": 3, "albumin": 3.9, "age": 40, "gender": "Male", "bmi": 24.2},
+}
+
+
+def test_fingerprint_tracks_inputs_and_version():
+    base = fingerprint(FEATURES, "1.0/1.0/1.0/1.0")
+    assert base == fingerprint({k: dict(v) for k, v in FEATURES.items()}, "1.0/1.0/1.0/1.0")
+
+    changed = {k: dict(v) for k, v in FEATURES.items()}
+    changed["liver"]["bmi"] = 25.0
+    assert fingerprint(changed, "1.0/1.0/1.0/1.0") != base
+    assert fingerprint(FEATURES, "2.0/1.0/1.0/1.0") != base
+
+
+def test_lru_eviction():
+    cache = PredictionCache(max_entries=2)
+    cache.put("a", {"diabetes": 0.1}, 1)
+    cache.put("b", {"diabetes": 0.2}, 2)
+    assert cache.get("a").prediction_id == 1  # "a" is now most recent
+    cache.put("c", {"diabetes": 0.3}, 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a").scores == {"diabetes": 0.1}
+    assert cache.get("c").prediction_id == 3
+    assert cache.stats()["entries"] == 2
+
+
+def test_cleared_on_model_reload():
+    class FakeRegistry:
+        def __init__(self):
+            self.listeners = []
+
+        def on_reload(self, callback):
+            self.listeners.append(callback)
+
+    class FakeApp:
+        config = {"PREDICTION_CACHE_SIZE": 8}
+
+    registry = FakeRegistry()
+    cache = PredictionCache()
+    cache.configure(FakeApp(), registry)
+    cache.put("a", {"diabetes": 0.1})
+
+    for callback in registry.listeners:
+        callback(["diabetes"])
+    assert cache.get("a") is None
+
+
+if __name__ == '__main__':
+    test_fingerprint_tracks_inputs_and_version()
+    test_lru_eviction()
+    test_cleared_on_model_reload()
+    print("Prediction cache checks passed")
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Checks that the hot history and risk-level queries are answered from the
+indexes declared in app/models.py (SQLite EXPLAIN QUERY PLAN), not by
+scanning whole tables.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from sqlalchemy import func
+
+from app import create_app
+from app.extensions import db
+from app.models import Patient, RiskPrediction
+
+
+def _plan(statement):
+    """Returns the EXPLAIN QUERY PLAN detail lines for a query or statement."""
+    statement = getattr(statement, 'statement', statement)
+    sql = str(statement.compile(db.engine, compile_kwargs={"literal_binds": True}))
+    return [row[-1] for row in db.session.execute(db.text(f"EXPLAIN QUERY PLAN {sql}"))]
+
+
+def _uses_index(plan, index_name):
+    return any(index_name in line for line in plan)
+
+
+def test_history_reads_use_patient_indexes():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        patient = Patient(name="P", age=40, gender="Male", height=170, weight=70,
+                          abha_id="91000000000000", password_hash="x")
+        db.session.add(patient)
+        db.session.commit()
+
+        history = {
+            'ix_diabetes_assessments_patient_id_assessed_at': patient.diabetes_assessments,
+            'ix_liver_assessments_patient_id_assessed_at': patient.liver_assessments,
+            'ix_heart_assessments_patient_id_assessed_at': patient.heart_assessments,
+            'ix_mental_health_assessments_patient_id_assessed_at': patient.mental_health_assessments,
+            'ix_risk_predictions_patient_id_predicted_at': patient.risk_predictions,
+            'ix_consultation_notes_patient_id_created_at': patient.consultation_notes,
+        }
+        for index_name, query in history.items():
+            plan = _plan(query.limit(1))
+            assert _uses_index(plan, index_name), (index_name, plan)
+            # Newest-first comes straight from the index
+            assert not any('TEMP B-TREE' in line for line in plan), (index_name, plan)
+        db.drop_all()
+
+
+def test_risk_level_filters_use_indexes():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        count = db.session.query(func.count(RiskPrediction.id)).filter(
+            RiskPrediction.diabetes_risk_level.in_(['Medium', 'High']))
+        assert _uses_index(_plan(count), 'ix_risk_predictions_diabetes_risk_level')
+
+        listing = Patient.query.filter(Patient.latest_heart_risk_level == 'High')
+        assert _uses_index(_plan(listing), 'ix_patients_latest_heart_risk_level')
+        db.drop_all()
+
+
+if __name__ == '__main__':
+    test_history_reads_use_patient_indexes()
+    test_risk_level_filters_use_indexes()
+    print("Query plan checks passed")
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Checks the recommendation cache: profile keys, the shared-table tier, TTL,
+admin invalidation, and that failed generations are not cached.
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from flask_jwt_extended import create_access_token
+
+from app import create_app, services
+from app.extensions import db
+from app.models import RecommendationCacheEntry, User
+from app.recommendation_cache import profile_key, recommendation_cache
+from conftest import FakeGenerator, fake_generator, limiter_disabled
+
+PROFILE = {'diabetes': 'High', 'liver': 'Low', 'heart': 'Medium', 'mental_health': 'Low'}
+RECS = {"diet": [{"category": "Diet", "recommendation_text": "Less sugar"}], "exercise": [], "sleep": [], "lifestyle": []}
+
+
+def test_profile_key_is_normalized():
+    key = profile_key(PROFILE, 'v1')
+    assert key == 'v1:diabetes=High,heart=Medium,liver=Low,mental_health=Low'
+    shuffled = {'mental_health_risk_level': 'low', 'heart': 'MEDIUM', 'liver': 'Low', 'diabetes': 'high'}
+    assert profile_key(shuffled, 'v1') == key
+    assert profile_key(PROFILE, 'v2') != key
+    assert profile_key({'diabetes': 'High'}, 'v1') == 'v1:diabetes=High,heart=-,liver=-,mental_health=-'
+
+
+def test_cached_per_profile_across_tiers():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        fake = FakeGenerator(RECS)
+        with fake_generator(fake):
+            for _ in range(3):
+                services.get_gemini_recommendations(PROFILE)
+            assert fake.calls == 1
+            assert db.session.get(RecommendationCacheEntry, profile_key(PROFILE, services.RECOMMENDATION_PROMPT_VERSION))
+
+            # Another worker: empty LRU, served from the shared table
+            recommendation_cache.clear()
+            assert services.get_gemini_recommendations(PROFILE) == RECS
+            assert fake.calls == 1
+            assert recommendation_cache.stats()["db_hits"] >= 1
+
+            # Expired entries are regenerated
+            db.session.query(RecommendationCacheEntry).update({"expires_at": time.time() - 1})
+            db.session.commit()
+            recommendation_cache.clear()
+            services.get_gemini_recommendations(PROFILE)
+            assert fake.calls == 2
+
+        # Failures fall back to the stored library set and are retried next time
+        other = dict(PROFILE, liver='High')
+        with fake_generator(FakeGenerator(RECS, fail=True)) as failing:
+            fallback = services.get_gemini_recommendations(other)
+            assert fallback == services.stored_recommendations(other)
+            assert fallback["diet"]
+            services.get_gemini_recommendations(other)
+            assert failing.calls == 2
+        db.drop_all()
+
+
+def test_admin_invalidation():
+    app = create_app('testing')
+    client = app.test_client()
+    with app.app_context(), limiter_disabled():
+        db.create_all()
+        admin = User(name="Admin", email="a@example.com", username="admin")
+        admin.password_hash = "x"
+        db.session.add(admin)
+        db.session.commit()
+        headers = {'Authorization': 'Bearer ' + create_access_token(identity={'id': admin.id, 'role': 'admin', 'name': 'Admin'})}
+
+        other = dict(PROFILE, heart='High')
+        with fake_generator(FakeGenerator(RECS)) as fake:
+            for profile in (PROFILE, other):
+                services.get_gemini_recommendations(profile)
+
+            response = client.delete('/api/v1/recommendations/cache', json={"risk_levels": PROFILE}, headers=headers)
+            assert response.status_code == 200 and response.get_json()["removed"] == 1
+            for profile in (PROFILE, other):
+                services.get_gemini_recommendations(profile)
+            assert fake.calls == 3
+
+        response = client.delete('/api/v1/recommendations/cache', headers=headers)
+        assert response.get_json()["removed"] == 2
+        assert db.session.query(RecommendationCacheEntry).count() == 0
+        assert client.delete('/api/v1/recommendations/cache', json={"risk_levels": {"kidney": "High"}},
+                             headers=headers).status_code == 400
+        db.drop_all()
+
+
+def test_put_leaves_the_callers_transaction_alone():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        pending = User(name="Pending", email="p@example.com", username="pending", password_hash="x")
+        db.session.add(pending)
+        key = profile_key(PROFILE, services.RECOMMENDATION_PROMPT_VERSION)
+        recommendation_cache.put(key, RECS)
+        # Written on its own connection; the caller's unit of work is neither flushed nor committed
+        assert pending in db.session.new
+        db.session.rollback()
+        assert db.session.query(User).count() == 0
+        assert db.session.get(RecommendationCacheEntry, key) is not None
+
+        # invalidate leaves the commit to the caller
+        assert recommendation_cache.invalidate(key) == 1
+        db.session.rollback()
+        assert db.session.get(RecommendationCacheEntry, key) is not None
+        db.drop_all()
+
+
+if __name__ == '__main__':
+    test_profile_key_is_normalized()
+    test_cached_per_profile_across_tiers()
+    test_admin_invalidation()
+    test_put_leaves_the_callers_transaction_alone()
+    print("Recommendation cache checks passed")
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Checks the guarded Gemini client against a local fake Gemini server: the
+request deadline, the circuit breaker opening and recovering, and the
+fallback to the stored recommendation library.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from flask_jwt_extended import create_access_token
+
+from app import create_app, services
+from app.extensions import db
+from app.recommendation_cache import recommendation_cache
+from app.recommendation_client import (
+    CircuitBreaker, recommendation_client, STATE_CLOSED, STATE_HALF_OPEN, STATE_OPEN,
+)
+from conftest import limiter_disabled
+
+PROFILE = {'diabetes': 'High', 'liver': 'Low', 'heart': 'Medium', 'mental_health': 'Low'}
+ITEMS = [{"disease_type": "Diabetes", "risk_level": "High", "category": "Diet", "recommendation_text": "Fewer sugary drinks"}]
+
+
+class FakeGemini(BaseHTTPRequestHandler):
+    """generateContent endpoint whose behaviour is set through `server.mode`."""
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.server.requests += 1
+        if self.server.mode == 'slow':
+            time.sleep(1.0)
+        if self.server.mode == 'error':
+            self.send_response(500)
+            self.send_header('Content-Type', 'application/json')
+            self.end_headers()
+            self.wfile.write(b'{"error": {"code": 500, "message": "internal", "status": "INTERNAL"}}')
+            return
+        body = {"candidates": [{"content": {"parts": [{"text": json.dumps(ITEMS)}], "role": "model"},
+                                "finishReason": "STOP", "index": 0}]}
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(json.dumps(body).encode())
+
+    def log_message(self, *args):
+        pass
+
+
+def _start_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeGemini)
+    server.daemon_threads = True
+    server.mode = 'ok'
+    server.requests = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _make_app(server, **config):
+    app = create_app('testing')
+    app.config.update(GEMINI_API_ENDPOINT=f"http://127.0.0.1:{server.server_port}",
+                      GEMINI_TIMEOUT_SECONDS=0.3, GEMINI_BREAKER_FAILURES=2,
+                      GEMINI_BREAKER_RESET_SECONDS=0.5, RECOMMENDATION_CACHE_SIZE=0, **config)
+    recommendation_cache.configure(app)
+    recommendation_client.configure(app)
+    return app
+
+
+def _fetch(profile):
+    # The recommendation cache is off (RECOMMENDATION_CACHE_SIZE=0), so every call reaches the client
+    return services.get_gemini_recommendations(profile)
+
+
+def test_breaker_transitions():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=10, clock=lambda: now[0])
+    breaker.record_failure()
+    assert breaker.allow() and breaker.state == STATE_CLOSED
+    breaker.record_failure()
+    assert breaker.state == STATE_OPEN and not breaker.allow()
+
+    now[0] = 10
+    assert breaker.allow() and breaker.state == STATE_HALF_OPEN
+    assert not breaker.allow()  # only one trial call
+    breaker.record_failure()
+    assert breaker.state == STATE_OPEN and not breaker.allow()
+
+    now[0] = 20
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == STATE_CLOSED and breaker.consecutive_failures == 0
+
+
+def test_fake_gemini_deadline_breaker_and_fallback():
+    server = _start_server()
+    app = _make_app(server)
+    try:
+        with app.app_context():
+            db.create_all()
+            stored = services.stored_recommendations(PROFILE)
+            assert stored["diet"]
+
+            # A healthy upstream answers through the SDK
+            assert _fetch(PROFILE)["diet"][0]["recommendation_text"] == "Fewer sugary drinks"
+
+            # A slow upstream is cut off at the deadline and the library is served
+            server.mode = 'slow'
+            start = time.perf_counter()
+            assert _fetch(PROFILE) == stored
+            assert time.perf_counter() - start < 0.9
+
+            # The second failure opens the circuit; later calls skip the upstream
+            server.mode = 'error'
+            assert _fetch(PROFILE) == stored
+            assert recommendation_client.breaker.state == STATE_OPEN
+            seen = server.requests
+            start = time.perf_counter()
+            assert _fetch(PROFILE) == stored
+            assert time.perf_counter() - start < 0.1
+            assert server.requests == seen
+
+            # After the reset period one trial call closes it again
+            server.mode = 'ok'
+            time.sleep(1.0)
+            assert _fetch(PROFILE)["diet"][0]["recommendation_text"] == "Fewer sugary drinks"
+            assert recommendation_client.breaker.state == STATE_CLOSED
+
+            metrics = recommendation_client.metrics()
+            assert metrics["successes"] == 2 and metrics["timeouts"] == 1 and metrics["failures"] == 1
+            assert metrics["rejected_open"] == 1 and metrics["fallbacks"] == 3
+            db.drop_all()
+    finally:
+        server.shutdown()
+
+
+def test_metrics_endpoint():
+    server = _start_server()
+    app = _make_app(server)
+    client = app.test_client()
+    try:
+        with app.app_context(), limiter_disabled():
+            db.create_all()
+            token = create_access_token(identity={'id': 1, 'role': 'admin', 'name': 'Admin'})
+            resp = client.get('/api/v1/recommendations/metrics', headers={'Authorization': f'Bearer {token}'})
+            assert resp.status_code == 200
+            body = resp.get_json()
+            assert body["recommendation_client"]["state"] == STATE_CLOSED
+            assert body["recommendation_client"]["timeout_seconds"] == 0.3
+            assert "recommendation_cache" in body
+            db.drop_all()
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    test_breaker_transitions()
+    test_fake_gemini_deadline_breaker_and_fallback()
+    test_metrics_endpoint()
+    print("recommendation client checks passed")
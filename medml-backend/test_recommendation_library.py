@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Checks the recommendation library: one ranked set per risk profile, served
+by the recommendations endpoint without calling Gemini, and the optional
+background refresh.
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from flask_jwt_extended import create_access_token
+
+from app import create_app, recommendation_library
+from app.extensions import db
+from app.models import LifestyleRecommendation, Patient, RiskPrediction
+from app.recommendation_cache import levels_key
+from conftest import FakeGenerator, fake_generator, limiter_disabled
+
+GENERATED = {"diet": [{"disease_type": "Heart", "risk_level": "Low", "category": "Diet", "recommendation_text": "Eat oats"}],
+             "exercise": [{"disease_type": "Diabetes", "risk_level": "High", "category": "Exercise", "recommendation_text": "Walk daily"}],
+             "sleep": [], "lifestyle": []}
+
+
+def _library_rows(profile):
+    return (LifestyleRecommendation.query.filter_by(profile_key=levels_key(profile), patient_id=None)
+            .order_by(LifestyleRecommendation.priority).all())
+
+
+def test_build_covers_every_profile():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        summary = recommendation_library.build()
+        assert summary["curated"] == 81
+        assert recommendation_library.build(only_missing=True)["skipped"] == 81
+
+        rows = _library_rows({'diabetes': 'Low', 'liver': 'Medium', 'heart': 'High', 'mental_health': 'Low'})
+        assert [r.priority for r in rows] == list(range(1, len(rows) + 1))
+        assert rows[0].disease_type == 'Heart Disease' and rows[0].risk_level == 'High'
+        assert {r.risk_level for r in rows[-2:]} == {'Low'}
+
+        with fake_generator(FakeGenerator(GENERATED)):
+            summary = recommendation_library.build(generate=True)
+            assert summary["generated"] == 81 and summary["failed"] == 0
+        with fake_generator(FakeGenerator(GENERATED, fail=True)):
+            summary = recommendation_library.build(generate=True)
+            assert summary["curated"] == 81 and summary["failed"] == 81
+        db.drop_all()
+
+
+def test_endpoint_serves_library_without_gemini():
+    app = create_app('testing')
+    client = app.test_client()
+    with app.app_context(), limiter_disabled():
+        db.create_all()
+        patient = Patient(name="P", age=50, gender="Male", height=170, weight=80, abha_id="96000000000000", password_hash="x")
+        db.session.add(patient)
+        db.session.flush()
+        db.session.add(RiskPrediction(patient_id=patient.id, diabetes_risk_level='High', liver_risk_level='Low',
+                                      heart_risk_level='Medium', mental_health_risk_level='Low'))
+        db.session.commit()
+        headers = {'Authorization': 'Bearer ' + create_access_token(identity={'id': 1, 'role': 'admin', 'name': 'Admin'})}
+
+        with fake_generator(FakeGenerator(GENERATED)) as fake:
+            # Composed in memory for a profile the library doesn't have yet; the GET writes nothing
+            profile = {'diabetes': 'High', 'liver': 'Low', 'heart': 'Medium', 'mental_health': 'Low'}
+            body = client.get(f'/api/v1/patients/{patient.id}/recommendations', headers=headers).get_json()
+            assert fake.calls == 0
+            assert body["lifestyle"][0]["disease_type"] == 'Diabetes'
+            assert body["lifestyle"][0]["risk_level"] == 'High'
+            assert set(body) >= {"diet", "exercise", "sleep", "lifestyle"}
+            assert _library_rows(profile) == []
+
+            # Background refresh replaces the curated set; the request doesn't wait for it
+            app.config['RECOMMENDATION_LIBRARY_REFRESH'] = True
+            client.get(f'/api/v1/patients/{patient.id}/recommendations', headers=headers)
+            for _ in range(100):
+                db.session.expire_all()
+                rows = _library_rows(profile)
+                if rows and rows[0].source == recommendation_library.SOURCE_GENERATED:
+                    break
+                time.sleep(0.05)
+            assert fake.calls == 1
+            assert [r.recommendation_text for r in rows] == ["Walk daily", "Eat oats"]
+        db.drop_all()
+
+
+if __name__ == '__main__':
+    test_build_covers_every_profile()
+    test_endpoint_serves_library_without_gemini()
+    print("Recommendation library checks passed")
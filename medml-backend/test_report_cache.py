@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Checks the rendered report cache: key inputs, size-bounded eviction, and
+that repeat downloads and report jobs reuse cached PDFs, with ETags.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from flask_jwt_extended import create_access_token
+
+from app import create_app, report_jobs
+from app.api import reports as reports_api
+from app.extensions import db
+from app.models import RiskPrediction
+from app.report_cache import RenderedReportCache, report_cache, report_key
+from conftest import limiter_disabled, make_admin, make_patient
+
+CONTEXT = {"patient_id": 1, "abha_id": "96000000000000", "overview": {"Name": "P", "Weight": "60 kg"}, "prediction_id": 7,
+           "sections": ["Overview", "Diabetes"], "recommendations": {"diet": [], "exercise": [], "sleep": [], "lifestyle": []}}
+
+
+class CountingRenderer:
+    def __init__(self, render):
+        self.render = render
+        self.calls = 0
+
+    def __call__(self, context):
+        self.calls += 1
+        return self.render(context)
+
+
+def test_key_covers_every_input():
+    key = report_key(CONTEXT)
+    assert report_key(dict(CONTEXT, sections=["Diabetes", "Overview"])) == key
+    assert report_key(dict(CONTEXT, sections=["Overview"])) != key
+    assert report_key(dict(CONTEXT, prediction_id=8)) != key
+    assert report_key(dict(CONTEXT, overview={"Name": "P", "Weight": "61 kg"})) != key
+    recs = {"diet": [{"recommendation_text": "Eat oats"}], "exercise": [], "sleep": [], "lifestyle": []}
+    assert report_key(dict(CONTEXT, recommendations=recs)) != key
+
+
+def test_size_bounded_eviction():
+    cache = RenderedReportCache(tempfile.mkdtemp(prefix='medml-report-cache-'), max_bytes=1000)
+    for i in range(3):
+        cache.put(f"k{i}", b"x" * 300)
+        os.utime(os.path.join(cache.directory, f"k{i}.pdf"), (i, i))
+    assert cache.read("k0") == b"x" * 300  # served recently, so k1 is now the oldest
+    cache.put("k3", b"y" * 300)
+    assert cache.read("k1") is None
+    assert cache.read("k0") is not None and cache.read("k3") is not None
+    stats = cache.stats()
+    assert stats["bytes"] <= 1000 and stats["evictions"] == 1
+    cache.put("huge", b"z" * 2000)
+    assert cache.read("huge") is None
+
+
+def test_repeat_downloads_skip_rendering():
+    app = create_app('testing')
+    app.config.update(REPORT_CACHE_DIR=tempfile.mkdtemp(prefix='medml-report-cache-'), REPORT_CACHE_MAX_MB=1,
+                      REPORT_DIR=tempfile.mkdtemp(prefix='medml-reports-'), GEMINI_API_KEY=None)
+    report_cache.configure(app)
+    report_jobs.init_app(app)
+    client = app.test_client()
+    original = reports_api.render_pdf
+    renderer = reports_api.render_pdf = CountingRenderer(original)
+    try:
+        with app.app_context(), limiter_disabled():
+            db.create_all()
+            admin = make_admin()
+            patient = make_patient(age=50, gender="Female", height=165, weight=60, created_by_admin_id=admin.id)
+            db.session.add(RiskPrediction(patient_id=patient.id, diabetes_risk_level='High', diabetes_risk_score=0.9))
+            db.session.commit()
+            headers = {'Authorization': f"Bearer {create_access_token(identity={'id': admin.id, 'role': 'admin', 'name': 'Admin'})}"}
+            url = f'/api/v1/patients/{patient.id}/report/pdf?sections=Overview,Diabetes'
+
+            first = client.get(url, headers=headers)
+            assert first.status_code == 200 and first.data.startswith(b'%PDF') and first.headers['ETag']
+            second = client.get(url, headers=headers)
+            assert second.data == first.data and second.headers['ETag'] == first.headers['ETag']
+            posted = client.post(f'/api/v1/patients/{patient.id}/report/pdf',
+                                 json={"sections": ["Diabetes", "Overview"]}, headers=headers)
+            assert posted.data == first.data
+            assert renderer.calls == 1
+
+            not_modified = client.get(url, headers=dict(headers, **{'If-None-Match': first.headers['ETag']}))
+            assert not_modified.status_code == 304 and not not_modified.data
+
+            # A new prediction is a new key
+            db.session.add(RiskPrediction(patient_id=patient.id, diabetes_risk_level='Low', diabetes_risk_score=0.1))
+            db.session.commit()
+            third = client.get(url, headers=headers)
+            assert third.headers['ETag'] != first.headers['ETag'] and renderer.calls == 2
+
+            # Report jobs reuse the PDFs rendered by the download endpoint
+            resp = client.post(f'/api/v1/patients/{patient.id}/report', json={"sections": ["Overview", "Diabetes"]},
+                               headers=headers)
+            job_url = f"/api/v1/reports/{resp.get_json()['id']}"
+            deadline = time.time() + 30
+            while client.get(job_url, headers=headers).status_code == 202 and time.time() < deadline:
+                time.sleep(0.05)
+            job = report_jobs.service.store.get(resp.get_json()['id'])
+            assert job["status"] == "done" and job["cached"] == 1
+            download = client.get(job_url, headers=headers)
+            assert download.data == third.data and download.headers['ETag'] == third.headers['ETag']
+
+            # An edit is a new key even within the same second as the previous download
+            patient.weight = 61
+            db.session.commit()
+            edited = client.get(url, headers=headers)
+            assert edited.headers['ETag'] != third.headers['ETag'] and renderer.calls == 3
+
+            stats = client.get('/api/v1/reports/cache', headers=headers).get_json()["report_cache"]
+            assert stats["entries"] == 3 and stats["hits"] >= 3
+            assert client.delete('/api/v1/reports/cache', headers=headers).get_json()["removed"] == 3
+            report_jobs.service.shutdown()
+            db.drop_all()
+    finally:
+        reports_api.render_pdf = original
+
+
+if __name__ == '__main__':
+    test_key_covers_every_input()
+    test_size_bounded_eviction()
+    test_repeat_downloads_skip_rendering()
+    print("report cache checks passed")
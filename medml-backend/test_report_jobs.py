@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Checks the report job queue: single reports and batch zips are queued,
+rendered off the request thread and streamed from the result store.
+"""
+
+import io
+import os
+import sys
+import tempfile
+import time
+import zipfile
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from flask_jwt_extended import create_access_token
+
+from app import create_app, report_jobs
+from app.extensions import db
+from app.models import RiskPrediction
+from conftest import ABHA_BASE, FakeGenerator, fake_generator, limiter_disabled, make_admin, make_patient
+
+RECS = {"diet": [{"disease_type": "Diabetes", "risk_level": "High", "category": "Diet", "recommendation_text": "Less sugar"}],
+        "exercise": [], "sleep": [], "lifestyle": []}
+
+
+def _make_app(**config):
+    app = create_app('testing')
+    app.config.update(REPORT_DIR=tempfile.mkdtemp(prefix='medml-reports-'), **config)
+    report_jobs.init_app(app)
+    return app
+
+
+def _seed():
+    admin = make_admin()
+    ids = []
+    for i in range(3):
+        patient = make_patient(i, age=40 + i, created_by_admin_id=admin.id)
+        if i < 2:
+            # Two patients share one risk profile
+            db.session.add(RiskPrediction(patient_id=patient.id, diabetes_risk_level='High', diabetes_risk_score=0.8,
+                                          liver_risk_level='Low', liver_risk_score=0.1, heart_risk_level='Low',
+                                          heart_risk_score=0.2, mental_health_risk_level='Low', mental_health_risk_score=0.1))
+        ids.append(patient.id)
+    db.session.commit()
+    return admin.id, ids
+
+
+def _headers(identity):
+    return {'Authorization': f"Bearer {create_access_token(identity=identity)}"}
+
+
+def _wait(client, url, headers, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        resp = client.get(url, headers=headers)
+        if resp.status_code != 202:
+            return resp
+        time.sleep(0.05)
+    raise AssertionError(f"{url} did not finish within {timeout}s")
+
+
+def test_single_report_job():
+    app = _make_app()
+    client = app.test_client()
+    with app.app_context(), limiter_disabled():
+        db.create_all()
+        admin_id, ids = _seed()
+        admin = _headers({'id': admin_id, 'role': 'admin', 'name': 'Admin'})
+        patient = _headers({'id': ids[0], 'role': 'patient', 'name': 'P0'})
+        other = _headers({'id': ids[1], 'role': 'patient', 'name': 'P1'})
+
+        def run():
+            resp = client.post(f'/api/v1/patients/{ids[0]}/report', json={"sections": ["Overview", "Diabetes"]}, headers=patient)
+            assert resp.status_code == 202, resp.get_json()
+            job = resp.get_json()
+            assert job["status"] in ("queued", "running", "done") and resp.headers["Location"].endswith(job["id"])
+            return job, _wait(client, f"/api/v1/reports/{job['id']}", patient)
+
+        with fake_generator(FakeGenerator(RECS)):
+            job, resp = run()
+        assert resp.status_code == 200 and resp.mimetype == 'application/pdf'
+        assert resp.data.startswith(b'%PDF')
+        assert f'Health_Report_{ABHA_BASE}.pdf' in resp.headers['Content-Disposition']
+
+        # Other patients cannot queue or read it; admins can read it
+        assert client.get(f"/api/v1/reports/{job['id']}", headers=other).status_code == 403
+        assert client.post(f'/api/v1/patients/{ids[0]}/report', json={"sections": ["Overview"]}, headers=other).status_code == 403
+        assert client.get(f"/api/v1/reports/{job['id']}", headers=admin).status_code == 200
+
+        assert client.post(f'/api/v1/patients/{ids[0]}/report', json={"sections": ["Nope"]}, headers=admin).status_code == 400
+        assert client.post('/api/v1/patients/9999/report', json={"sections": ["Overview"]}, headers=admin).status_code == 404
+        assert client.get('/api/v1/reports/../../etc/passwd', headers=admin).status_code == 404
+        assert client.get('/api/v1/reports/' + '0' * 32, headers=admin).status_code == 404
+        report_jobs.service.shutdown()
+        db.drop_all()
+
+
+def test_batch_zip_rendered_in_worker_processes():
+    app = _make_app(REPORT_WORKERS=2)
+    client = app.test_client()
+    with app.app_context(), limiter_disabled():
+        db.create_all()
+        admin_id, ids = _seed()
+        admin = _headers({'id': admin_id, 'role': 'admin', 'name': 'Admin'})
+
+        def run():
+            resp = client.post('/api/v1/reports/batch', json={"patient_ids": ids + [9999], "sections": ["Overview"]},
+                               headers=admin)
+            assert resp.status_code == 202, resp.get_json()
+            job_id = resp.get_json()['id']
+            return job_id, _wait(client, f"/api/v1/reports/{job_id}", admin)
+
+        with fake_generator(FakeGenerator(RECS)) as fake:
+            job_id, resp = run()
+        assert resp.status_code == 200 and resp.mimetype == 'application/zip'
+        with zipfile.ZipFile(io.BytesIO(resp.data)) as archive:
+            names = archive.namelist()
+            assert sorted(names) == [f'Health_Report_{ABHA_BASE + i}.pdf' for i in range(3)]
+            assert all(archive.read(name).startswith(b'%PDF') for name in names)
+        # One recommendation fetch for the shared profile, none without a prediction
+        assert fake.calls == 1
+
+        job = report_jobs.service.store.get(job_id)
+        assert job["status"] == "done" and job["missing"] == [9999] and job["failed"] == []
+
+        patient = _headers({'id': ids[0], 'role': 'patient', 'name': 'P0'})
+        assert client.post('/api/v1/reports/batch', json={"patient_ids": ids, "sections": ["Overview"]},
+                           headers=patient).status_code == 403
+        assert client.post('/api/v1/reports/batch', json={"patient_ids": [], "sections": ["Overview"]},
+                           headers=admin).status_code == 400
+        report_jobs.service.shutdown()
+        db.drop_all()
+
+
+if __name__ == '__main__':
+    test_single_report_job()
+    test_batch_zip_rendered_in_worker_processes()
+    print("report job checks passed")
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Checks bulk rescoring: patient selection, chunked scoring, skipped patients,
+the neutral fallback for heart and mental health, the bulk endpoint and
+`flask rescore`. The models are replaced by fixed-score predictors.
+"""
+
+import os
+import sys
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from flask_jwt_extended import create_access_token
+
+from app import create_app, services
+from app.extensions import db
+from app.models import (
+    DiabetesAssessment, HeartAssessment, LiverAssessment, MentalHealthAssessment, Patient, RiskPrediction,
+)
+from app.rescoring import NEUTRAL_SCORE, rescore_chunk, rescore_patients, select_patient_ids
+from conftest import limiter_disabled, make_admin, make_patient
+
+SCORES = {'diabetes': 0.9, 'liver': 0.1, 'heart': 0.5, 'mental_health': 0.2}
+
+
+class FakePredictor:
+    """Scores every row `score` and records the batch sizes it was called with."""
+
+    def __init__(self, score, fail=False):
+        self.score = score
+        self.fail = fail
+        self.batches = []
+
+    def __call__(self, rows):
+        self.batches.append(len(rows))
+        if self.fail:
+            raise RuntimeError("model unavailable")
+        return [self.score] * len(rows)
+
+
+@contextmanager
+def fake_predictors(**failing):
+    predictors = {key: FakePredictor(score, fail=failing.get(key, False)) for key, score in SCORES.items()}
+    original = dict(services.BATCH_PREDICTORS)
+    services.BATCH_PREDICTORS.update(predictors)
+    try:
+        yield predictors
+    finally:
+        services.BATCH_PREDICTORS.update(original)
+
+
+def _assess(patient, skip=()):
+    assessments = {
+        'diabetes': DiabetesAssessment(patient_id=patient.id, glucose=120, blood_pressure=80, skin_thickness=20,
+                                       insulin=80),
+        'liver': LiverAssessment(patient_id=patient.id, total_bilirubin=1, direct_bilirubin=0.3,
+                                 alkaline_phosphatase=180, sgpt_alamine_aminotransferase=30,
+                                 sgot_aspartate_aminotransferase=30, total_protein=7, albumin=4),
+        'heart': HeartAssessment(patient_id=patient.id, cholesterol_level=190, systolic_bp=120, diastolic_bp=80),
+        'mental_health': MentalHealthAssessment(patient_id=patient.id, phq_score=4, gad_score=3),
+    }
+    db.session.add_all(assessment for key, assessment in assessments.items() if key not in skip)
+
+
+def _seed(n, incomplete=()):
+    ids = []
+    for i in range(n):
+        patient = make_patient(i, state_name='Kerala' if i % 2 else 'Goa')
+        _assess(patient, skip=('mental_health',) if i in incomplete else ())
+        ids.append(patient.id)
+    db.session.commit()
+    return ids
+
+
+def test_select_patient_ids():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        ids = _seed(4)
+        assert select_patient_ids() == ids
+        assert select_patient_ids(patient_ids=[]) == []
+        assert select_patient_ids(patient_ids=[ids[2], ids[0]]) == [ids[0], ids[2]]
+        assert select_patient_ids(state_name='Kerala') == [ids[1], ids[3]]
+        assert select_patient_ids(patient_ids=[ids[0], ids[1]], state_name='Kerala') == [ids[1]]
+        db.drop_all()
+
+
+def test_rescore_in_chunks_skipping_incomplete_patients():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        ids = _seed(5, incomplete=(2,))
+        with fake_predictors() as predictors:
+            summary = rescore_patients(ids, chunk_size=2, model_version='test-v1')
+
+        # Chunks of [0, 1], [2, 3] and [4]; patient 2 lacks a mental health assessment
+        assert predictors['diabetes'].batches == [2, 1, 1]
+        assert summary == {"model_version": 'test-v1', "requested": 5, "rescored": 4, "skipped": 1,
+                           "skipped_patient_ids": [ids[2]]}
+
+        predictions = RiskPrediction.query.order_by(RiskPrediction.patient_id).all()
+        assert [p.patient_id for p in predictions] == [ids[0], ids[1], ids[3], ids[4]]
+        assert {(p.diabetes_risk_level, p.liver_risk_level, p.model_version) for p in predictions} == {('High', 'Low', 'test-v1')}
+        latest = dict(db.session.query(Patient.id, Patient.latest_prediction_id).all())
+        assert latest[ids[2]] is None
+        assert all(latest[p.patient_id] == p.id for p in predictions)
+        db.drop_all()
+
+
+def test_rescore_chunk_neutral_fallback():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        ids = _seed(2)
+        with fake_predictors(heart=True, mental_health=True):
+            result = rescore_chunk(ids, model_version='test-v1')
+            db.session.commit()
+        assert result == {"rescored": ids, "skipped": []}
+        for prediction in RiskPrediction.query.all():
+            assert prediction.heart_risk_score == NEUTRAL_SCORE and prediction.mental_health_risk_score == NEUTRAL_SCORE
+            assert prediction.diabetes_risk_score == SCORES['diabetes']
+
+        # Other models have no fallback: the chunk fails and nothing is saved
+        with fake_predictors(diabetes=True):
+            try:
+                rescore_patients(ids, model_version='test-v2')
+                assert False, "expected the diabetes failure to propagate"
+            except RuntimeError:
+                pass
+        assert RiskPrediction.query.filter_by(model_version='test-v2').count() == 0
+        db.drop_all()
+
+
+def test_bulk_endpoint_and_cli():
+    app = create_app('testing')
+    client = app.test_client()
+    with app.app_context(), limiter_disabled():
+        db.create_all()
+        admin = make_admin()
+        ids = _seed(3)
+        headers = {'Authorization': 'Bearer ' + create_access_token(identity={'id': admin.id, 'role': 'admin', 'name': 'Admin'})}
+
+        with fake_predictors():
+            # An empty list is an error, not "every patient"
+            resp = client.post('/api/v1/predictions/bulk', json={"patient_ids": []}, headers=headers)
+            assert resp.status_code == 422
+            assert RiskPrediction.query.count() == 0
+
+            resp = client.post('/api/v1/predictions/bulk', json={"patient_ids": [ids[0]], "chunk_size": 1}, headers=headers)
+            assert resp.status_code == 200
+            assert resp.get_json()["rescored"] == 1 and resp.get_json()["requested"] == 1
+
+            patient = {'Authorization': 'Bearer ' + create_access_token(identity={'id': ids[0], 'role': 'patient', 'name': 'P0'})}
+            assert client.post('/api/v1/predictions/bulk', json={}, headers=patient).status_code == 403
+
+            result = app.test_cli_runner().invoke(args=['rescore', '--state', 'Kerala', '--chunk-size', '1'])
+            assert result.exit_code == 0, result.output
+            assert "Rescoring 1 patient(s)" in result.output and "Saved 1 prediction(s)" in result.output
+        assert RiskPrediction.query.count() == 2
+        db.drop_all()
+
+
+if __name__ == '__main__':
+    test_select_patient_ids()
+    test_rescore_in_chunks_skipping_incomplete_patients()
+    test_rescore_chunk_neutral_fallback()
+    test_bulk_endpoint_and_cli()
+    print("Rescoring checks passed")
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Checks that the generated model encoders keep the to_dict field names and
+values, and that the response helpers' bodies match what jsonify produced.
+"""
+
+import json
+import os
+import sys
+from datetime import datetime
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from flask import jsonify
+
+from app import create_app
+from app.api.responses import (
+    bad_request, conflict, created, forbidden, not_found, ok, server_error, service_unavailable, unauthorized,
+    unprocessable_entity,
+)
+from app.extensions import db
+from app.models import ConsultationNote, LiverAssessment, Patient, RiskPrediction, User
+
+
+def test_encoders_match_field_lists():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        admin = User(name="Admin", email="a@example.com", username="admin", facility_name="PHC")
+        admin.password_hash = "x"
+        db.session.add(admin)
+        db.session.flush()
+        patient = Patient(name="P", age=40, gender="Male", height=170, weight=70, abha_id="93000000000001",
+                          password_hash="x", state_name="Kerala", created_by_admin_id=admin.id)
+        db.session.add(patient)
+        db.session.flush()
+        liver = LiverAssessment(patient_id=patient.id, total_bilirubin=1, direct_bilirubin=.3,
+                                alkaline_phosphatase=200, sgpt_alamine_aminotransferase=40,
+                                sgot_aspartate_aminotransferase=30, total_protein=7, albumin=4)
+        db.session.add_all([liver, RiskPrediction(patient_id=patient.id, liver_risk_level='High'),
+                            ConsultationNote(patient_id=patient.id, admin_id=admin.id, notes="Review")])
+        db.session.commit()
+
+        assert admin.to_dict() == {
+            "admin_id": admin.id, "name": "Admin", "email": "a@example.com", "username": "admin",
+            "role": admin.role, "designation": None, "contact_number": None, "facility_name": "PHC",
+        }
+        data = patient.to_dict(include_admin=True, include_history=True, include_notes=True)
+        assert list(data)[:11] == ['patient_id', 'name', 'age', 'gender', 'abha_id', 'height', 'weight',
+                                   'bmi', 'state_name', 'created_by_admin_id', 'created_at']
+        assert data['created_at'] == patient.created_at.isoformat()
+        assert data['bmi'] == patient.bmi
+        assert data['created_by_admin'] == admin.to_dict()
+
+        liver_data = data['liver_assessments'][0]
+        assert liver_data['assessment_id'] == liver.id
+        assert liver_data['ag_ratio'] == liver.ag_ratio
+        assert liver_data['assessed_at'] == liver.assessed_at.isoformat()
+        assert data['risk_predictions'][0]['liver_risk_level'] == 'High'
+        assert data['consultation_notes'][0]['note_id'] == patient.consultation_notes[0].id
+
+        with app.test_request_context():
+            body, status = ok({"patient": data}, message="Fetched")
+            expected = jsonify({"message": "Fetched", "patient": data})
+            assert status == 200
+            assert body.mimetype == 'application/json'
+            assert json.loads(body.get_data()) == json.loads(expected.get_data())
+        db.drop_all()
+
+
+def test_response_bytes_match_jsonify():
+    app = create_app('testing')
+    body = {"b": [1, 2.5, None, True], "a": {"z": "x", "y": datetime(2024, 1, 2, 3, 4, 5)},
+            "price": Decimal("1.50"), "text": "plain"}
+    with app.test_request_context():
+        for helper, status in ((ok, 200), (created, 201)):
+            response, code = helper(body)
+            assert code == status
+            assert response.get_data() == jsonify(body).get_data()
+        response, _ = ok([1, 2])
+        assert json.loads(response.get_data()) == {"data": [1, 2]}
+
+        errors = (
+            (bad_request("Bad", extra={"field": "age"}), 400, {"error": "Bad Request", "message": "Bad", "field": "age"}),
+            (unauthorized(), 401, {"error": "Unauthorized", "message": "Unauthorized"}),
+            (forbidden(), 403, {"error": "Forbidden", "message": "Forbidden"}),
+            (not_found(), 404, {"error": "Not Found", "message": "Not Found"}),
+            (conflict(), 409, {"error": "Conflict", "message": "Conflict"}),
+            (unprocessable_entity([{"loc": ["age"]}]), 422,
+             {"error": "Validation Failed", "message": "Validation Failed", "messages": [{"loc": ["age"]}]}),
+            (service_unavailable(retry_after=5), 503, {"error": "Service Unavailable", "message": "Service Unavailable"}),
+            (server_error(), 500, {"error": "Internal server error", "message": "Internal server error"}),
+        )
+        for (response, code), status, expected in errors:
+            assert code == status and response.mimetype == 'application/json'
+            assert response.get_data() == jsonify(expected).get_data()
+        assert service_unavailable(retry_after=5)[0].headers["Retry-After"] == "5"
+
+
+if __name__ == '__main__':
+    test_encoders_match_field_lists()
+    test_response_bytes_match_jsonify()
+    print("Serialization checks passed")
@@ -1,6 +1,7 @@
 import streamlit as st
 import requests
 import json
+import time
 
 # --- FIX: Updated BASE_URL to include /v1 ---
 BASE_URL = "http://127.0.0.1:5000/api/v1"
@@ -109,8 +110,17 @@ def update_patient(patient_id, data):
         st.error(f"Error updating patient: {e.response.json().get('message', 'Check fields')}")
         return None
 
-def get_patients(category=None, sort=None):
-    """Gets a list of registered patients with filters."""
+def get_patients(category=None, sort=None, limit=None, cursor=None, fields=None):
+    """
+    Gets a list of registered patients with filters.
+
+    Without `limit` the full list is returned. With `limit` one page is
+    fetched and a dict is returned instead:
+    {"patients": [...], "next_cursor": str or None, "total": int or None}.
+    Pass `next_cursor` back as `cursor` for the following page; `total` is
+    only sent with the first page. `fields` is a list of keys to return,
+    e.g. ["name", "latest_prediction.diabetes_risk_level"].
+    """
     params = {}
     if category and category != "All Users":
         # Map frontend labels to backend disease keys
@@ -124,17 +134,32 @@ def get_patients(category=None, sort=None):
         params['disease'] = key
     if sort:
         params['sort'] = sort.lower().replace(" ", "_")
+    if limit:
+        params['limit'] = limit
+    if cursor:
+        params['cursor'] = cursor
+    if fields:
+        params['fields'] = ",".join(fields)
         
     try:
         response = requests.get(f"{BASE_URL}/patients", headers=get_auth_headers(), params=params)
         response.raise_for_status()
         data = response.json()
+        if limit:
+            total = response.headers.get('X-Total-Count')
+            return {
+                "patients": data.get('data', []),
+                "next_cursor": data.get('next_cursor'),
+                "total": int(total) if total is not None else None,
+            }
         # Backend may wrap list responses under {"data": [...]} via unified ok()
         if isinstance(data, dict) and 'data' in data and isinstance(data['data'], list):
             return data['data']
         return data
     except requests.exceptions.RequestException as e:
         st.error(f"Error fetching patients: {e}")
+        if limit:
+            return {"patients": [], "next_cursor": None, "total": None}
         return []
 
 # --- Admin: Assessments ---
@@ -203,11 +228,12 @@ def add_consultation_notes(patient_id, notes):
 
 # --- Patient & Shared ---
 
-def get_patient_details(patient_id):
-    """Fetches all details for a single patient."""
+def get_patient_details(patient_id, history_limit=None):
+    """Fetches all details for a single patient (at most `history_limit` rows per history section)."""
     try:
         url = f"{BASE_URL}/patients/{patient_id}"
-        response = requests.get(url, headers=get_auth_headers())
+        params = {"history_limit": history_limit} if history_limit is not None else None
+        response = requests.get(url, params=params, headers=get_auth_headers())
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as e:
@@ -239,16 +265,69 @@ def get_recommendations(patient_id):
         st.error(f"Error fetching recommendations: {e}")
         return {"diet": [], "exercise": [], "sleep": [], "lifestyle": []}
 
-def get_pdf_report(patient_id, sections):
-    """Downloads the patient report as a PDF."""
+# Returned while a queued report is still rendering (None still means an error)
+REPORT_PENDING = object()
+
+def _report_jobs():
+    """Queued report job ids by (patient id, sections), kept across reruns."""
+    return st.session_state.setdefault("pdf_report_jobs", {})
+
+def _report_job_key(patient_id, sections):
+    return (patient_id, tuple(sections))
+
+def pdf_report_pending(patient_id, sections):
+    """True while the report queued by get_pdf_report for these sections is still rendering."""
+    return _report_job_key(patient_id, sections) in _report_jobs()
+
+def check_pdf_report(patient_id, sections):
+    """
+    Asks once whether the queued report is ready. Returns the PDF bytes,
+    REPORT_PENDING while it is rendering, or None on error or if nothing
+    is queued.
+    """
+    job_key = _report_job_key(patient_id, sections)
+    job_id = _report_jobs().get(job_key)
+    if not job_id:
+        return None
     try:
-        url = f"{BASE_URL}/patients/{patient_id}/report/pdf"
-        response = requests.post(url, json={"sections": sections}, headers=get_auth_headers())
+        response = requests.get(f"{BASE_URL}/reports/{job_id}", headers=get_auth_headers())
         response.raise_for_status()
-        return response.content
     except requests.exceptions.RequestException as e:
+        _report_jobs().pop(job_key, None)
         st.error(f"Error generating PDF: {e}")
         return None
+    if response.status_code == 202:
+        return REPORT_PENDING
+    _report_jobs().pop(job_key, None)
+    if response.headers.get("Content-Type", "").startswith("application/pdf"):
+        return response.content
+    st.error(f"Error generating PDF: {response.json().get('error')}")
+    return None
+
+def get_pdf_report(patient_id, sections, wait=3):
+    """
+    Queues the patient report, or checks the one already queued for these
+    sections, and waits up to `wait` seconds for it. Returns the PDF bytes,
+    None on error, or REPORT_PENDING if it is still rendering: the job id
+    stays in st.session_state, so call check_pdf_report on a later rerun
+    instead of blocking the page.
+    """
+    if not pdf_report_pending(patient_id, sections):
+        try:
+            url = f"{BASE_URL}/patients/{patient_id}/report"
+            response = requests.post(url, json={"sections": list(sections)}, headers=get_auth_headers())
+            response.raise_for_status()
+            _report_jobs()[_report_job_key(patient_id, sections)] = response.json()["id"]
+        except requests.exceptions.RequestException as e:
+            st.error(f"Error generating PDF: {e}")
+            return None
+
+    deadline = time.time() + wait
+    while True:
+        pdf = check_pdf_report(patient_id, sections)
+        if pdf is not REPORT_PENDING or time.time() >= deadline:
+            return pdf
+        time.sleep(0.5)
 
 def share_patient_details(patient_id, sections):
     """Requests a backend-generated share link for selected sections."""
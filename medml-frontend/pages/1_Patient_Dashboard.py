@@ -178,6 +178,12 @@ with tabs[0]:
     
     st.divider()
     
+    # Downloadable report
+    st.subheader("📄 Your Health Report")
+    utils.pdf_report_controls(st.session_state.user_id)
+    
+    st.divider()
+    
     # Assessment History
     st.subheader("📋 Assessment History")
     if patient_data.get('diabetes_assessments') or patient_data.get('liver_assessments') or patient_data.get('heart_assessments') or patient_data.get('mental_health_assessments'):
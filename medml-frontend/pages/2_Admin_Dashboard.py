@@ -39,13 +39,48 @@ if "edit_patient_data" not in st.session_state:
 # --- Navigation Callbacks ---
 def set_view(view_name):
     st.session_state.admin_view = view_name
+    if view_name == "view_patients":
+        # Re-fetch the directory from the first page on every visit
+        reset_patient_pages()
+
+# --- Patient directory paging ---
+PATIENT_PAGE_SIZE = 50
+PATIENT_LIST_FIELDS = [
+    "name", "abha_id", "age", "gender",
+    "latest_prediction.diabetes_risk_level", "latest_prediction.liver_risk_level",
+    "latest_prediction.heart_risk_level", "latest_prediction.mental_health_risk_level",
+]
+
+def reset_patient_pages():
+    st.session_state.patient_pages = []
+    st.session_state.patient_next_cursor = None
+    st.session_state.patient_total = None
+    st.session_state.patient_page_filters = None
+
+def load_patient_page(category, sort, cursor=None):
+    page = api_client.get_patients(
+        category=category, sort=sort, limit=PATIENT_PAGE_SIZE,
+        cursor=cursor, fields=PATIENT_LIST_FIELDS
+    )
+    st.session_state.patient_pages = st.session_state.get("patient_pages", []) + page["patients"]
+    st.session_state.patient_next_cursor = page["next_cursor"]
+    if page["total"] is not None:
+        st.session_state.patient_total = page["total"]
+
+def load_more_patients():
+    load_patient_page(
+        st.session_state.patient_category,
+        st.session_state.patient_sort,
+        cursor=st.session_state.patient_next_cursor
+    )
     
 def go_to_patient_detail(patient_id):
     st.session_state.view_patient_id = patient_id
     st.session_state.admin_view = "patient_detail"
 
 def go_to_edit_patient(patient_id):
-    patient_data = api_client.get_patient_details(patient_id)
+    # The edit form only needs the basic fields
+    patient_data = api_client.get_patient_details(patient_id, history_limit=0)
     if patient_data:
         st.session_state.edit_patient_data = patient_data
         st.session_state.admin_view = "edit_patient"
@@ -443,17 +478,20 @@ elif st.session_state.admin_view == "view_patients":
     
     st.divider()
     
-    # Get patients data
-    with st.spinner("Fetching patient list..."):
-        patients = api_client.get_patients(
-            category=st.session_state.patient_category, 
-            sort=st.session_state.patient_sort
-        )
+    # Get patients data, one page at a time
+    filters = (st.session_state.patient_category, st.session_state.patient_sort)
+    if st.session_state.get("patient_page_filters") != filters:
+        reset_patient_pages()
+        st.session_state.patient_page_filters = filters
+        with st.spinner("Fetching patient list..."):
+            load_patient_page(*filters)
+    patients = st.session_state.patient_pages
     
     if not patients:
         st.info(f"📭 No patients found for the selected filters.")
     else:
-        st.markdown(f"**Found {len(patients)} patients**")
+        total = st.session_state.get("patient_total") or len(patients)
+        st.markdown(f"**Found {total} patients** (showing {len(patients)})")
         
         # Display patients as clean, native Streamlit components
         for p in patients:
@@ -478,7 +516,7 @@ elif st.session_state.admin_view == "view_patients":
                         }
                         cat_lower = st.session_state.patient_category.lower()
                         risk_key = category_key_map.get(cat_lower, "")
-                        level = p.get('latest_prediction', {}).get(risk_key, 'N/A')
+                        level = (p.get('latest_prediction') or {}).get(risk_key, 'N/A')
                         st.markdown(utils.create_risk_badge(level), unsafe_allow_html=True)
                 
                 with col2:
@@ -499,6 +537,14 @@ elif st.session_state.admin_view == "view_patients":
                         type="primary"
                     )
 
+        if st.session_state.get("patient_next_cursor"):
+            st.markdown("---")
+            st.button(
+                f"⬇️ Load {PATIENT_PAGE_SIZE} more",
+                on_click=load_more_patients,
+                use_container_width=True
+            )
+
 # --- View: Patient Detail ---
 elif st.session_state.admin_view == "patient_detail":
     st.button("⬅️ Back to Patient Directory", on_click=set_view, args=("view_patients",))
@@ -549,6 +595,9 @@ elif st.session_state.admin_view == "patient_detail":
                 else:
                     st.warning("No prediction data available.")
         
+        st.subheader("📄 PDF Report")
+        utils.pdf_report_controls(patient_id)
+        
         st.divider()
         
         # Consultation Actions
@@ -1,6 +1,10 @@
 import streamlit as st
+import api_client
 from theme import create_risk_badge
 
+# Sections the backend can put in a PDF report, in layout order
+REPORT_SECTIONS = ["Overview", "Diabetes", "Liver", "Heart", "Mental Health"]
+
 def risk_color(level):
     """Returns a hex color based on risk level."""
     if level == "High":
@@ -37,6 +41,46 @@ def display_risk_assessment(risk_data):
         </div>
         """, unsafe_allow_html=True)
 
+def pdf_report_controls(patient_id):
+    """
+    PDF report download. The report is queued in the background; while it
+    renders, a "Check report" button asks again on the next rerun instead of
+    blocking the page.
+    """
+    key = f"pdf_report_{patient_id}"
+    sections = st.multiselect("Report sections", REPORT_SECTIONS, default=REPORT_SECTIONS, key=f"{key}_sections")
+    if not sections:
+        st.info("Select at least one section.")
+        return
+
+    # Finished PDFs by (patient id, sections), dropped once downloaded so the next one is fresh
+    ready = st.session_state.setdefault("pdf_reports", {})
+    job = (patient_id, tuple(sections))
+    if job in ready:
+        st.download_button("⬇️ Download PDF Report", ready[job], file_name=f"Health_Report_{patient_id}.pdf",
+                           mime="application/pdf", key=f"{key}_download", use_container_width=True,
+                           on_click=lambda: ready.pop(job, None))
+        return
+
+    if api_client.pdf_report_pending(patient_id, sections):
+        st.info("⏳ Your report is being prepared.")
+        if st.button("🔄 Check report", key=f"{key}_check", use_container_width=True):
+            result = api_client.check_pdf_report(patient_id, sections)
+            if result is api_client.REPORT_PENDING:
+                st.info("Still rendering. Please check again in a moment.")
+            elif result is not None:
+                ready[job] = result
+                st.rerun()
+        return
+
+    if st.button("📄 Generate PDF Report", key=f"{key}_generate", use_container_width=True):
+        with st.spinner("Preparing the report..."):
+            result = api_client.get_pdf_report(patient_id, sections)
+        if result is not None:
+            if result is not api_client.REPORT_PENDING:
+                ready[job] = result
+            st.rerun()
+
 def logout():
     """Clears session state and returns to login."""
     # Added all session keys from 2_Admin_Dashboard.py to ensure a clean slate
@@ -44,7 +88,7 @@ def logout():
         "logged_in", "user_role", "user_id", "user_name", "token", 
         "admin_view", "add_user_step", "new_patient_id", "new_patient_name",
         "assessment_status", "view_patient_id", "edit_patient_data",
-        "patient_view", "show_pdf_download", "show_share_options",
+        "patient_view", "show_pdf_download", "pdf_report_jobs", "pdf_reports", "show_share_options",
         "patient_category", "patient_sort", "appointment_success", 
         "show_appointment_modal"
     ]